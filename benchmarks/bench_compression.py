@@ -0,0 +1,85 @@
+"""Measure the compression stage on compressible and incompressible data.
+
+Encrypts a JSON-lines buffer and a random buffer through the container
+segment pipeline with each compression setting and reports throughput and
+output size relative to the input.
+
+Usage:
+    python benchmarks/bench_compression.py [--size-mb 64] [--segment-kb 64]
+"""
+
+import argparse
+import io
+import json
+import os
+import time
+
+from cryptography.fernet import Fernet
+
+from encryptocli.encryption.aes import compression, container
+
+SETTINGS = [None, ("zlib", 1), ("zlib", 6), ("lzma", 1), ("lzma", 6)]
+
+
+def json_lines(size: int) -> bytes:
+    """Build roughly ``size`` bytes of log-like JSON lines."""
+    lines = []
+    total = 0
+    index = 0
+    while total < size:
+        line = json.dumps(
+            {"id": index, "level": "info", "path": f"/api/items/{index % 977}"}
+        ).encode()
+        lines.append(line + b"\n")
+        total += len(line) + 1
+        index += 1
+    return b"".join(lines)[:size]
+
+
+def bench(setting: tuple[str, int] | None, data: bytes, segment_size: int) -> tuple:
+    """Encrypt ``data`` with a compression setting.
+
+    Args:
+        setting: Compression algorithm and level, or None for no compression.
+        data: Plaintext to process.
+        segment_size: Plaintext bytes per segment.
+
+    Returns:
+        tuple[float, int]: Encrypt seconds and ciphertext size in bytes.
+    """
+    header = container.new_cipher_params("aes-256-gcm")
+    header["segment_size"] = segment_size
+    if setting is not None:
+        header["compression"] = compression.new_compression_params(*setting)
+    cipher = container.segment_cipher(header, Fernet.generate_key())
+
+    sealed = io.BytesIO()
+    start = time.perf_counter()
+    container.encrypt_segments(cipher, io.BytesIO(data), sealed, segment_size)
+    return time.perf_counter() - start, len(sealed.getvalue())
+
+
+def main() -> None:
+    """Run the benchmark and print a table of results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--segment-kb", type=int, default=64)
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    segment_size = args.segment_kb * 1024
+    inputs = {"json": json_lines(size), "random": os.urandom(size)}
+    print(f"{'input':<8}{'compression':<14}{'encrypt MB/s':>14}{'size ratio':>12}")
+    for name, data in inputs.items():
+        for setting in SETTINGS:
+            label = "none" if setting is None else f"{setting[0]}-{setting[1]}"
+            seconds, output_size = bench(setting, data, segment_size)
+            print(
+                f"{name:<8}{label:<14}"
+                f"{args.size_mb / seconds:>14.1f}"
+                f"{output_size / len(data):>12.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Compare full and incremental re-encryption of a slightly modified file.
+
+Encrypts a hex-text file, changes a fraction of it in a few places, then
+times encrypting it again from scratch and incrementally (reusing unchanged
+chunks), for each engine and compression setting.
+
+Usage:
+    python benchmarks/bench_incremental.py [--size-mb 256] [--change-pct 2]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from encryptocli.encryption.aes import AESCipher, container
+from encryptocli.util.key_gen import KeyCache
+
+SETTINGS = [
+    (container.FERNET, None),
+    ("aes-256-gcm", None),
+    ("aes-256-gcm", "zlib"),
+    ("aes-256-gcm", "lzma"),
+]
+
+
+def modify(data: bytes, change_pct: float, edits: int = 8) -> bytes:
+    """Overwrite ``change_pct`` percent of ``data`` in ``edits`` places."""
+    edit_size = int(len(data) * change_pct / 100 / edits)
+    modified = bytearray(data)
+    for edit in range(edits):
+        start = (edit * 2 + 1) * len(data) // (edits * 2)
+        modified[start : start + edit_size] = os.urandom(edit_size)
+    return bytes(modified)
+
+
+def timed(fn) -> float:
+    """Return how long ``fn()`` takes in seconds."""
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """Run the benchmark and print a table of results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--change-pct", type=float, default=2.0)
+    args = parser.parse_args()
+
+    # A shared key cache keeps scrypt out of the timings
+    cipher = AESCipher(KeyCache())
+    data = os.urandom(args.size_mb * 512 * 1024).hex().encode()
+    modified = modify(data, args.change_pct)
+    print(f"{'setting':<24}{'full s':>10}{'incremental s':>16}{'speedup':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "dump.txt")
+        for engine, compression in SETTINGS:
+            options = {"engine": engine, "compression": compression}
+            with open(path, "wb") as file:
+                file.write(data)
+            cipher.encrypt_file(path, "password", incremental=True, **options)
+            with open(path, "wb") as file:
+                file.write(modified)
+
+            full = timed(lambda: cipher.encrypt_file(path, "password", **options))
+            os.remove(f"{path}.encrypto")
+            cipher.encrypt_file(path, "password", incremental=True, **options)
+            with open(path, "wb") as file:
+                file.write(data)
+            incremental = timed(
+                lambda: cipher.encrypt_file(
+                    path, "password", incremental=True, **options
+                )
+            )
+            name = f"{engine}+{compression}" if compression else engine
+            print(
+                f"{name:<24}{full:>10.2f}{incremental:>16.2f}{full / incremental:>10.1f}"
+            )
+            os.remove(f"{path}.encrypto")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+"""Content-defined chunking for incremental AES file encryption.
+
+Fixed-size segments shift when bytes are inserted or removed, so every
+segment after an edit changes. Here the plaintext is instead cut where a
+rolling hash of the last 16 bytes falls below a threshold, so chunk
+boundaries follow the content and an edit only changes the chunks around it.
+
+Chunks are sealed independently of their position and identified by a keyed
+hash of their plaintext. A manifest next to the output lists each chunk id
+with its size and sealed bytes, so re-encrypting a modified file copies the
+chunks it already holds and only encrypts the new ones.
+
+Where a cut falls depends only on the bytes since the start of its chunk, so
+when the next bytes of a file hash to the next chunk of the previous version
+they would also be cut there. Re-chunking therefore checks the previous
+chunks in order and only runs the content-defined chunker over the parts
+that changed, until it produces a chunk the previous version had again.
+"""
+
+import hmac
+import math
+import os
+import struct
+from base64 import urlsafe_b64decode
+from hashlib import sha256
+from typing import BinaryIO, Iterator
+
+import numpy as np
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+
+from encryptocli.util.exceptions import FatalError
+from encryptocli.util.output import DEFAULT_FSYNC_POLICY, AtomicWriter
+
+WINDOW_HASH = "window16"
+DEFAULT_AVERAGE_SIZE = 64 * 1024
+MANIFEST_SUFFIX = ".manifest"
+
+_READ_SIZE = 1024 * 1024
+_ID_SIZE = 32
+_NONCE_SIZE = 12
+# Version 2 stores offsets from the first segment; version 1 manifests held
+# absolute offsets, which go stale when the header grows, and are rejected
+_MANIFEST_MAGIC = b"ENCRYPM2"
+_MANIFEST_ENTRY = struct.Struct(f">{_ID_SIZE}sIQI")
+_MANIFEST_COUNT = struct.Struct(">Q")
+_TAG_SIZE = 32
+
+# Odd 64-bit constant for multiplicative hashing of 8-byte words (2**64 / phi).
+# Chunk boundaries depend on it, so it must never change.
+_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+# Chunk id, plaintext size, offset from the first segment and framed length
+# of each chunk
+ManifestEntries = list[tuple[bytes, int, int, int]]
+
+
+def new_chunking_params(average_size: int = DEFAULT_AVERAGE_SIZE) -> dict:
+    """Create the header field describing how a file is chunked.
+
+    Chunks are at least a quarter and at most four times ``average_size``.
+
+    Args:
+        average_size: Typical chunk size in bytes, a power of two.
+
+    Returns:
+        dict: JSON-serializable chunking parameters.
+
+    Raises:
+        ValueError: If the average size is not a power of two of at least 1 KiB.
+    """
+    if average_size < 1024 or average_size & (average_size - 1):
+        raise ValueError("Chunk size must be a power of two of at least 1024")
+    return {
+        "algorithm": WINDOW_HASH,
+        "minimum": average_size // 4,
+        "average": average_size,
+        "maximum": average_size * 4,
+    }
+
+
+def iter_chunks(
+    src: BinaryIO,
+    params: dict,
+    id_key: bytes,
+    previous: list[tuple[bytes, int]] | None = None,
+) -> Iterator[tuple[bytes, bytes]]:
+    """Split a plaintext stream into content-defined chunks.
+
+    The hash of the 16 bytes ending at every position is computed for whole
+    read blocks at once with numpy rather than rolled byte by byte. A chunk
+    ends at the first position past the minimum size whose hash is below
+    the threshold, or at the maximum size.
+
+    With ``previous``, the chunks of an earlier version are tried first and
+    kept while the data still matches them, which gives the same chunks as
+    chunking from scratch for a fraction of the cost.
+
+    Args:
+        src: Binary stream to read plaintext from.
+        params: Chunking parameters from ``new_chunking_params``.
+        id_key: Key from ``chunk_id_key``.
+        previous: Chunk ids and sizes of the earlier version, in order.
+
+    Yields:
+        tuple[bytes, bytes]: Chunk id and data of consecutive chunks; none
+            for an empty stream.
+
+    Raises:
+        FatalError: If the parameters are not supported.
+    """
+    minimum, maximum, threshold = _chunk_limits(params)
+    previous = previous or []
+    positions = {chunk: number for number, (chunk, _) in enumerate(previous)}
+    reader = _Lookahead(src)
+    expected = 0
+    while True:
+        if expected < len(previous):
+            chunk, size = previous[expected]
+            # The last chunk was cut by the end of the file, so it only
+            # still holds if the file still ends there.
+            data = reader.peek(size + (expected == len(previous) - 1))
+            if len(data) == size and chunk_id(id_key, data) == chunk:
+                reader.consume(size)
+                expected += 1
+                yield chunk, data
+                continue
+            expected = len(previous)
+
+        request = max(_READ_SIZE, maximum)
+        data = reader.peek(request)
+        if not data:
+            return
+        cuts = _cut_points(data, minimum, maximum, threshold)
+        if len(data) < request and (not cuts or cuts[-1] != len(data)):
+            cuts.append(len(data))
+        start = 0
+        for cut in cuts:
+            chunk_data = data[start:cut]
+            chunk = chunk_id(id_key, chunk_data)
+            start = cut
+            yield chunk, chunk_data
+            if chunk in positions:
+                expected = positions[chunk] + 1
+                break
+        reader.consume(start)
+
+
+def chunk_id_key(key: bytes) -> bytes:
+    """Derive the key used to identify chunks by their plaintext.
+
+    Args:
+        key: The base64-encoded payload key.
+
+    Returns:
+        bytes: A 32-byte HMAC key.
+    """
+    return hmac.new(urlsafe_b64decode(key), b"encrypto-chunk-id", sha256).digest()
+
+
+def chunk_id(id_key: bytes, data: bytes) -> bytes:
+    """Identify a chunk by a keyed hash of its plaintext.
+
+    Args:
+        id_key: Key from ``chunk_id_key``.
+        data: The chunk plaintext.
+
+    Returns:
+        bytes: A 32-byte chunk id.
+    """
+    return hmac.new(id_key, data, sha256).digest()
+
+
+class ChunkSegments:
+    """Seal chunks independently of their position in the file.
+
+    Positional segment ciphers bind every token to its index, so one
+    inserted chunk would change every token after it. Chunk tokens carry no
+    position; the order of the chunks is authenticated instead by a digest
+    of their ids in the container trailer. ``seal`` and ``open`` accept and
+    ignore the index and final flag so the class fits wherever a segment
+    cipher does, including behind a compression stage.
+    """
+
+    def __init__(
+        self, key: bytes, primitive: AESGCM | ChaCha20Poly1305 | None = None
+    ) -> None:
+        """Set up chunk sealing for a payload.
+
+        Args:
+            key: The base64-encoded payload key.
+            primitive: AEAD primitive keyed for the payload, or None to seal
+                chunks as Fernet tokens.
+
+        Returns:
+            None
+        """
+        self._fernet = Fernet(key) if primitive is None else None
+        self._aead = primitive
+        self._nonce_key = hmac.new(
+            urlsafe_b64decode(key), b"encrypto-chunk-nonce", sha256
+        ).digest()
+
+    def seal(self, index: int, data: bytes, final: bool) -> bytes:
+        """Encrypt a chunk.
+
+        AEAD nonces are derived from the chunk contents, so equal chunks
+        seal to equal tokens and distinct chunks never share a nonce.
+
+        Args:
+            index: Ignored; chunk tokens are position independent.
+            data: Plaintext chunk data.
+            final: Ignored.
+
+        Returns:
+            bytes: The chunk token.
+        """
+        if self._aead is None:
+            assert self._fernet is not None
+            return self._fernet.encrypt(data)
+        nonce = hmac.new(self._nonce_key, data, sha256).digest()[:_NONCE_SIZE]
+        return nonce + self._aead.encrypt(nonce, data, None)
+
+    def open(self, index: int, token: bytes) -> tuple[bytes, bool]:
+        """Authenticate and decrypt a chunk token.
+
+        Args:
+            index: Ignored; chunk tokens are position independent.
+            token: The chunk token.
+
+        Returns:
+            tuple[bytes, bool]: The plaintext data, and False since chunks do
+                not record which one is last.
+
+        Raises:
+            FatalError: If authentication fails.
+        """
+        try:
+            if self._aead is None:
+                assert self._fernet is not None
+                return self._fernet.decrypt(token), False
+            nonce = token[:_NONCE_SIZE]
+            return self._aead.decrypt(nonce, token[_NONCE_SIZE:], None), False
+        except (InvalidTag, InvalidToken, ValueError) as exc:
+            raise FatalError("Either the key or the input data is wrong.") from exc
+
+
+def write_manifest(
+    path: str,
+    key: bytes,
+    trailer_tag: bytes,
+    entries: ManifestEntries,
+    fsync_policy: str = DEFAULT_FSYNC_POLICY,
+) -> None:
+    """Write the manifest of an incrementally encrypted container.
+
+    The manifest is authenticated and bound to the container's trailer tag,
+    so it is only ever used with the exact container it describes. It
+    replaces any previous manifest atomically.
+
+    Args:
+        path: Where to write the manifest.
+        key: The base64-encoded payload key.
+        trailer_tag: The tag returned by ``container.write_trailer``.
+        entries: Chunk id, plaintext size, offset from the first segment
+            and framed length of each chunk, in order.
+        fsync_policy: How the manifest is synced to disk.
+
+    Returns:
+        None
+    """
+    body = b"".join(
+        [
+            _MANIFEST_MAGIC,
+            trailer_tag,
+            _MANIFEST_COUNT.pack(len(entries)),
+            *(_MANIFEST_ENTRY.pack(*entry) for entry in entries),
+        ]
+    )
+    with AtomicWriter(path, fsync_policy) as manifest_file:
+        manifest_file.write(body)
+        manifest_file.write(_manifest_tag(key, body))
+
+
+def read_manifest(path: str, key: bytes, trailer_tag: bytes) -> ManifestEntries | None:
+    """Read the manifest of an existing container, if it is still valid.
+
+    Args:
+        path: Where the manifest is stored.
+        key: The base64-encoded payload key.
+        trailer_tag: The trailer tag of the container on disk.
+
+    Returns:
+        ManifestEntries | None: The chunks in order, or None if the manifest
+            is missing, corrupted or belongs to a different container.
+    """
+    try:
+        with open(path, "rb") as manifest_file:
+            data = manifest_file.read()
+    except OSError:
+        return None
+
+    prefix = len(_MANIFEST_MAGIC) + _TAG_SIZE + _MANIFEST_COUNT.size
+    if len(data) < prefix + _TAG_SIZE:
+        return None
+    body, tag = data[:-_TAG_SIZE], data[-_TAG_SIZE:]
+    if not hmac.compare_digest(_manifest_tag(key, body), tag):
+        return None
+    if not body.startswith(_MANIFEST_MAGIC):
+        return None
+    if not hmac.compare_digest(
+        body[len(_MANIFEST_MAGIC) : len(_MANIFEST_MAGIC) + _TAG_SIZE], trailer_tag
+    ):
+        return None
+    (count,) = _MANIFEST_COUNT.unpack_from(body, prefix - _MANIFEST_COUNT.size)
+    if prefix + count * _MANIFEST_ENTRY.size != len(body):
+        return None
+    return list(_MANIFEST_ENTRY.iter_unpack(body[prefix:]))
+
+
+def remove_manifest(path: str) -> None:
+    """Delete a manifest that no longer matches its container.
+
+    Args:
+        path: Where the manifest is stored.
+
+    Returns:
+        None
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class _Lookahead:
+    """Read ahead on a stream without copying the unread part on every step."""
+
+    def __init__(self, src: BinaryIO) -> None:
+        """Wrap a binary stream.
+
+        Args:
+            src: Binary stream to read from.
+
+        Returns:
+            None
+        """
+        self._src = src
+        self._buffer = b""
+        self._start = 0
+        self._eof = False
+
+    def peek(self, size: int) -> bytes:
+        """Return up to ``size`` unread bytes, fewer only at the end."""
+        while len(self._buffer) - self._start < size and not self._eof:
+            missing = size - (len(self._buffer) - self._start)
+            block = self._src.read(max(_READ_SIZE, missing))
+            if not block:
+                self._eof = True
+            self._buffer = self._buffer[self._start :] + block
+            self._start = 0
+        return self._buffer[self._start : self._start + size]
+
+    def consume(self, size: int) -> None:
+        """Mark ``size`` bytes as read."""
+        self._start += size
+
+
+def _manifest_tag(key: bytes, body: bytes) -> bytes:
+    """Compute the authentication tag protecting a manifest."""
+    subkey = hmac.new(urlsafe_b64decode(key), b"encrypto-manifest", sha256).digest()
+    return hmac.new(subkey, body, sha256).digest()
+
+
+def _chunk_limits(params: dict) -> tuple[int, int, int]:
+    """Read the minimum and maximum chunk size and the boundary threshold."""
+    try:
+        if params.get("algorithm") != WINDOW_HASH:
+            raise ValueError(params.get("algorithm"))
+        minimum, average = int(params["minimum"]), int(params["average"])
+        maximum = int(params["maximum"])
+    except (AttributeError, KeyError, TypeError, ValueError) as exc:
+        raise FatalError("Unsupported chunking parameters") from exc
+    if not 0 < minimum < average < maximum:
+        raise FatalError("Unsupported chunking parameters")
+    # Boundaries occur about once per 2**bits bytes once past the minimum
+    bits = min(round(math.log2(average - minimum)), 63)
+    return minimum, maximum, 1 << (64 - bits)
+
+
+def _cut_points(data: bytes, minimum: int, maximum: int, threshold: int) -> list[int]:
+    """Find the chunk boundaries within ``data``, which starts a chunk.
+
+    The trailing bytes after the last boundary are left for the next call,
+    which sees them again with more data appended.
+    """
+    if len(data) < max(minimum, 16):
+        return []
+    # Every (overlapping, unaligned) 8-byte word, hashed, then combined with
+    # the word before it to cover 16 bytes: hashes[i] covers data[i:i + 16].
+    words = np.ndarray((len(data) - 7,), dtype="<u8", buffer=data, strides=(1,))
+    hashes = words * _MULTIPLIER
+    hashes[8:] ^= hashes[:-8] >> np.uint64(1)
+    candidates = np.flatnonzero(hashes[8:] < np.uint64(threshold)) + 16
+
+    cuts = []
+    start = 0
+    while True:
+        position = int(np.searchsorted(candidates, start + minimum))
+        if position < len(candidates) and candidates[position] <= start + maximum:
+            start = int(candidates[position])
+        elif start + maximum <= len(data):
+            start += maximum
+        else:
+            return cuts
+        cuts.append(start)
@@ -1,35 +1,135 @@
-"""AES (Fernet) encryption/decryption utilities using a class-based API."""
+"""AES (Fernet and AEAD) encryption/decryption utilities using a class-based API."""
 
-from typing import BinaryIO
+import os
+from typing import BinaryIO, Callable, Iterable, Iterator
 
 from cryptography.fernet import Fernet
 
+from encryptocli.encryption.aes import (
+    chunking,
+    container,
+    digest,
+    envelope,
+    journal,
+    pipeline,
+)
+from encryptocli.encryption.aes.compression import new_compression_params
 from encryptocli.util.exceptions import FatalError, MildError
-from encryptocli.util.file_handling import get_file
-from encryptocli.util.key_gen import key_gen
+from encryptocli.util.file_handling import open_input
+from encryptocli.util.key_gen import (
+    DEFAULT_KDF_PROFILE,
+    KEYFILE_KDF,
+    KeyCache,
+    derive_key,
+    derive_keyfile_key,
+    key_gen,
+    new_kdf_params,
+    new_keyfile_params,
+    read_keyfile,
+)
+from encryptocli.util.output import (
+    DEFAULT_FSYNC_POLICY,
+    FSYNC_END,
+    AtomicWriter,
+    parse_fsync_policy,
+)
+
+# Text ciphertexts carry their KDF parameters in a PHC-style prefix:
+# $encrypto$scrypt$n=16384,r=8,p=1$<salt>$<fernet token>
+# Keyfile ciphertexts have no cost: $encrypto$hkdf-sha256$$<salt>$<token>
+TEXT_PREFIX = "$encrypto$"
+
+# Distinct salts whose ciphers are kept while decrypting a batch of texts
+_BATCH_CIPHERS = 16
 
 
 class AESCipher:
     """Provide Fernet-based encryption and decryption for text and files."""
 
-    def encrypt_text(self, secret: str, password: str) -> str:
+    def __init__(
+        self,
+        key_cache: KeyCache | None = None,
+        key_material: bytes | None = None,
+        fsync_policy: str = DEFAULT_FSYNC_POLICY,
+    ) -> None:
+        """Initialize the cipher.
+
+        Args:
+            key_cache: Optional derived-key cache. When given, repeated calls
+                with the same password skip the scrypt derivation.
+            key_material: Optional high-entropy key material, such as the
+                contents of a keyfile. When given, keys are derived from it
+                with HKDF instead of from passwords with scrypt, and password
+                arguments are ignored.
+            fsync_policy: How output files are synced to disk: ``none``,
+                ``end`` or a size in MiB such as ``64MB`` (see
+                ``encryptocli.util.output``).
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the fsync policy is not recognized.
+        """
+        parse_fsync_policy(fsync_policy)
+        self.key_cache = key_cache
+        self.key_material = key_material
+        self.fsync_policy = fsync_policy
+        # Timings of the last file operation that overlapped key derivation
+        # with reading its input, or None
+        self.timings: pipeline.Timings | None = None
+        # Algorithm and plaintext digest of the last file encrypted or
+        # decrypted, if its container has one, or None
+        self.plaintext_digest: tuple[str, str] | None = None
+
+    @classmethod
+    def from_keyfile(
+        cls,
+        keyfile_path: str,
+        key_cache: KeyCache | None = None,
+        fsync_policy: str = DEFAULT_FSYNC_POLICY,
+    ) -> "AESCipher":
+        """Create a cipher that derives its keys from a keyfile.
+
+        Args:
+            keyfile_path: Path to a file holding at least 32 random bytes.
+            key_cache: Optional derived-key cache for password-protected data.
+            fsync_policy: How output files are synced to disk.
+
+        Returns:
+            AESCipher: A cipher using the keyfile in place of passwords.
+
+        Raises:
+            FatalError: If the keyfile can not be read or is too short.
+            ValueError: If the fsync policy is not recognized.
+        """
+        return cls(key_cache, read_keyfile(keyfile_path), fsync_policy)
+
+    def encrypt_text(
+        self, secret: str, password: str, kdf_profile: str = DEFAULT_KDF_PROFILE
+    ) -> str:
         """Encrypt plain text with the supplied password and return the cipher text.
 
+        The salt and KDF cost are prefixed to the returned text so it can be
+        decrypted with the parameters it was written with.
+
         Args:
             secret: Plain text to encrypt.
             password: Password for encryption.
+            kdf_profile: Name of the KDF cost profile to derive the key with.
 
         Returns:
             str: Encrypted ciphertext as a string.
 
         Raises:
             FatalError: If password is empty.
+            ValueError: If the KDF profile is unknown.
         """
-        if password == "":
-            raise FatalError("Please enter a password")
+        self._require_password(password)
 
-        cipher = self._cipher(password)
-        return cipher.encrypt(secret.encode()).decode()
+        kdf = self._new_text_kdf_params(password, kdf_profile)
+        cipher = self._cipher(password, kdf)
+        return _format_text(kdf, cipher.encrypt(secret.encode()).decode())
 
     def decrypt_text(self, encrypted_secret: str, password: str) -> str:
         """Decrypt cipher text with the supplied password and return plain text.
@@ -44,57 +144,933 @@ class AESCipher:
         Raises:
             FatalError: If password is empty or decryption fails (invalid key/data).
         """
-        if password == "":
-            raise FatalError("Please enter a password")
+        self._require_password(password)
 
-        cipher = self._cipher(password)
+        kdf, token = _parse_text(encrypted_secret)
+        cipher = self._cipher(password, kdf)
         try:
-            return cipher.decrypt(encrypted_secret.encode()).decode()
+            return cipher.decrypt(token.encode()).decode()
         except Exception as exc:
             raise FatalError("Either the key or the input data is wrong.") from exc
 
-    def encrypt_file(self, file_path: str, password: str) -> str:
-        """Encrypt a file using Fernet encryption with a password-derived key.
+    def encrypt_texts(
+        self,
+        secrets: Iterable[str],
+        password: str,
+        kdf_profile: str = DEFAULT_KDF_PROFILE,
+    ) -> Iterator[str]:
+        """Encrypt many texts under one password with a single key derivation.
+
+        All outputs share one salt, so decrypting them back with
+        ``decrypt_texts`` also derives the key only once. Results are
+        produced lazily, one per input.
+
+        Args:
+            secrets: Plain texts to encrypt.
+            password: Password for encryption.
+            kdf_profile: Name of the KDF cost profile to derive the key with.
+
+        Returns:
+            Iterator[str]: Encrypted ciphertexts in input order.
+
+        Raises:
+            FatalError: If password is empty.
+            ValueError: If the KDF profile is unknown.
+        """
+        self._require_password(password)
+
+        kdf = self._new_text_kdf_params(password, kdf_profile)
+        cipher = self._cipher(password, kdf)
+        return (
+            _format_text(kdf, cipher.encrypt(secret.encode()).decode())
+            for secret in secrets
+        )
+
+    def decrypt_texts(
+        self, encrypted_secrets: Iterable[str], password: str
+    ) -> Iterator[str]:
+        """Decrypt many texts under one password, deriving each key only once.
+
+        Ciphers are kept per distinct salt and KDF cost, so a batch written by
+        ``encrypt_texts`` costs one derivation however long it is.
+
+        Args:
+            encrypted_secrets: Encrypted ciphertexts to decrypt.
+            password: Password used during encryption.
+
+        Returns:
+            Iterator[str]: Decrypted plaintexts in input order.
+
+        Raises:
+            FatalError: If password is empty or any decryption fails.
+        """
+        self._require_password(password)
+        return self._decrypt_texts(encrypted_secrets, password)
+
+    def _decrypt_texts(
+        self, encrypted_secrets: Iterable[str], password: str
+    ) -> Iterator[str]:
+        """Generator behind ``decrypt_texts``."""
+        ciphers: dict[str, Fernet] = {}
+        for encrypted_secret in encrypted_secrets:
+            kdf, token = _parse_text(encrypted_secret)
+            prefix = encrypted_secret[: len(encrypted_secret) - len(token)]
+            cipher = ciphers.get(prefix)
+            if cipher is None:
+                if len(ciphers) >= _BATCH_CIPHERS:
+                    ciphers.clear()
+                cipher = ciphers[prefix] = self._cipher(password, kdf)
+            try:
+                yield cipher.decrypt(token.encode()).decode()
+            except Exception as exc:
+                raise FatalError("Either the key or the input data is wrong.") from exc
+
+    def encrypt_file(
+        self,
+        file_path: str,
+        password: str,
+        segment_size: int = container.DEFAULT_SEGMENT_SIZE,
+        kdf_profile: str = DEFAULT_KDF_PROFILE,
+        jobs: int = 1,
+        engine: str = container.FERNET,
+        compression: str | None = None,
+        compression_level: int | None = None,
+        resume: bool = False,
+        incremental: bool = False,
+        digest_algorithm: str | None = None,
+    ) -> str:
+        """Encrypt a file into a chunked container under a password-wrapped key.
+
+        The file is read and encrypted one segment at a time, so memory use is
+        bounded by ``segment_size`` regardless of the file size. With
+        ``jobs`` above one, segments are encrypted by a pool of worker
+        processes and written back in order.
+
+        Key derivation runs on a background thread while the first input
+        buffers are read, and the timings of that overlap are kept in
+        ``timings`` (None for resumable and incremental runs, which read
+        their existing output first).
+
+        Segments are Fernet tokens by default. The AEAD engines
+        (``aes-256-gcm``, ``chacha20-poly1305`` or ``auto`` to pick by CPU
+        support) encrypt in a single pass and store raw binary instead.
+
+        With ``compression`` (``zlib`` or ``lzma``) each segment is compressed
+        before it is encrypted, except segments that look already
+        compressed. Decryption undoes this automatically.
+
+        With ``resume``, progress is checkpointed to a journal next to the
+        output. If the run is interrupted, running it again verifies the
+        segments already written and continues after them, reusing the
+        header, and so the settings, of the interrupted run.
+
+        With ``incremental``, the file is split into content-defined chunks
+        and a manifest of them is kept next to the output. Encrypting the
+        file again, after it changed, reuses the encrypted chunks that did
+        not change along with the key and settings of the existing output,
+        so only the changed parts are encrypted. Segments are then sealed in
+        this process, whatever ``jobs`` is.
+
+        With ``digest_algorithm``, a ``HashingService`` digest of the
+        plaintext is computed as it is read for encryption and stored in the
+        container, and kept in ``plaintext_digest``. Decrypting the container
+        computes it again in the same way and checks it.
 
         Args:
             file_path: Path to the file to encrypt.
             password: Password for encryption.
+            segment_size: Number of plaintext bytes per encrypted segment.
+            kdf_profile: Name of the KDF cost profile to derive the key with.
+            jobs: Number of worker processes to encrypt segments with.
+            engine: Segment engine: ``fernet``, ``auto`` or an AEAD engine.
+            compression: ``zlib``, ``lzma`` or None for no compression.
+            compression_level: Compression level from 0 to 9.
+            resume: Keep a checkpoint journal and continue an interrupted run.
+            incremental: Chunk by content and reuse unchanged chunks of the
+                existing output.
+            digest_algorithm: ``HashingService`` algorithm to digest the
+                plaintext with, or None for no digest.
 
         Returns:
             str: Success message.
 
         Raises:
-            FatalError: If password is empty, file too large, encryption fails,
-                or write error.
+            FatalError: If password is empty, encryption fails, or write error.
             MildError: If file is already encrypted (.encrypto extension).
+            ValueError: If the KDF profile, engine, compression or digest
+                algorithm is unknown, or both ``resume`` and ``incremental``
+                are set.
         """
-        if password == "":
-            raise FatalError("Please enter a password")
+        self._require_password(password)
+        if resume and incremental:
+            raise ValueError("Resumable and incremental encryption can not be combined")
+        self.timings = None
+        self.plaintext_digest = None
+
+        with open_input(file_path) as file:
+            if "encrypto" in file.name:
+                raise MildError("File is already encrypted.")
+
+            output_path = f"{file.name}.encrypto"
+            # A full encryption replaces any incremental container, whose
+            # manifest then describes chunks that are gone
+            manifest_path = f"{output_path}{chunking.MANIFEST_SUFFIX}"
+            if resume:
+                self._encrypt_resumable(
+                    file,
+                    output_path,
+                    password,
+                    segment_size,
+                    kdf_profile,
+                    jobs,
+                    engine,
+                    compression,
+                    compression_level,
+                    digest_algorithm,
+                )
+                chunking.remove_manifest(manifest_path)
+                return "File encrypted successfully"
+            if incremental:
+                self._encrypt_incremental(
+                    file,
+                    output_path,
+                    password,
+                    kdf_profile,
+                    engine,
+                    compression,
+                    compression_level,
+                    digest_algorithm,
+                )
+                return "File encrypted successfully"
+
+            try:
+                with AtomicWriter(output_path, self.fsync_policy) as write_file:
+                    self.encrypt_stream(
+                        file,
+                        write_file,
+                        password,
+                        segment_size,
+                        kdf_profile,
+                        jobs,
+                        engine,
+                        compression,
+                        compression_level,
+                        digest_algorithm,
+                    )
+            except ValueError:
+                raise
+            except Exception as exc:
+                raise FatalError("Ran into an issue while encrypting file") from exc
+            chunking.remove_manifest(manifest_path)
+
+        return "File encrypted successfully"
+
+    def encrypt_stream(
+        self,
+        src: BinaryIO,
+        dst: BinaryIO,
+        password: str,
+        segment_size: int = container.DEFAULT_SEGMENT_SIZE,
+        kdf_profile: str = DEFAULT_KDF_PROFILE,
+        jobs: int = 1,
+        engine: str = container.FERNET,
+        compression: str | None = None,
+        compression_level: int | None = None,
+        digest_algorithm: str | None = None,
+    ) -> None:
+        """Encrypt a binary stream into a container written to another stream.
+
+        Neither stream needs to be seekable, so this works on pipes such as
+        stdin and stdout. Memory use is bounded by the segment size (times
+        the number of in-flight batches with ``jobs`` above one), plus the
+        input read ahead while the key is derived, which is recorded in
+        ``timings``. A plaintext digest, if asked for, is computed as the
+        input is read and kept in ``plaintext_digest``.
+
+        Args:
+            src: Binary stream to read plaintext from.
+            dst: Binary stream to write the container to.
+            password: Password for encryption.
+            segment_size: Number of plaintext bytes per encrypted segment.
+            kdf_profile: Name of the KDF cost profile to derive the key with.
+            jobs: Number of worker processes to encrypt segments with.
+            engine: Segment engine: ``fernet``, ``auto`` or an AEAD engine.
+            compression: ``zlib``, ``lzma`` or None for no compression.
+            compression_level: Compression level from 0 to 9.
+            digest_algorithm: ``HashingService`` algorithm to digest the
+                plaintext with, or None for no digest.
+
+        Returns:
+            None
+
+        Raises:
+            FatalError: If password is empty.
+            ValueError: If the KDF profile, engine, compression or digest
+                algorithm is unknown.
+        """
+        self._require_password(password)
+        self.plaintext_digest = None
+        plaintext = _digesting_reader(src, digest_algorithm)
+
+        (header, key), src, self.timings = pipeline.derive_while_prefetching(
+            lambda: self._new_header(
+                password,
+                segment_size,
+                kdf_profile,
+                engine,
+                compression,
+                compression_level,
+                digest_algorithm,
+            ),
+            plaintext,
+        )
+        tag = container.write_header(dst, key, header)
+        index = self._encrypt_segments(header, key, src, dst, jobs)
+        container.write_trailer(dst, key, tag, index, self._digest_meta(plaintext))
+
+    def _encrypt_resumable(
+        self,
+        file: BinaryIO,
+        output_path: str,
+        password: str,
+        segment_size: int,
+        kdf_profile: str,
+        jobs: int,
+        engine: str,
+        compression: str | None,
+        compression_level: int | None,
+        digest_algorithm: str | None,
+    ) -> None:
+        """Encrypt a file while checkpointing progress to a journal.
 
-        cipher: Fernet = self._cipher(password)
-        file: BinaryIO = get_file(file_path)
+        The output and journal are kept if encryption fails, so that the
+        next run can continue. The journal is removed once the container is
+        complete. The plaintext digest covers the segments verified on
+        resuming, so it still takes a single read of the file.
 
-        if "encrypto" in file.name:
-            raise MildError("File is already encrypted.")
+        Args:
+            file: The plaintext file, positioned at its start.
+            output_path: Where the container is written.
+            password: Password for encryption.
+            segment_size: Number of plaintext bytes per encrypted segment.
+            kdf_profile: Name of the KDF cost profile to derive the key with.
+            jobs: Number of worker processes to encrypt segments with.
+            engine: Segment engine: ``fernet``, ``auto`` or an AEAD engine.
+            compression: ``zlib``, ``lzma`` or None for no compression.
+            compression_level: Compression level from 0 to 9.
+            digest_algorithm: ``HashingService`` algorithm to digest the
+                plaintext with, or None for no digest.
+
+        Returns:
+            None
+
+        Raises:
+            FatalError: If the existing output was written with another
+                password, or encryption fails.
+            ValueError: If the KDF profile, engine, compression or digest
+                algorithm is unknown.
+        """
+        progress = journal.Journal(f"{output_path}{journal.SUFFIX}", file)
+        plaintext = _digesting_reader(file, digest_algorithm)
+        resumed = self._resume_output(
+            progress, plaintext, output_path, password, digest_algorithm
+        )
+        if resumed is None:
+            header, key = self._new_header(
+                password,
+                segment_size,
+                kdf_profile,
+                engine,
+                compression,
+                compression_level,
+                digest_algorithm,
+            )
+            write_file = open(output_path, "wb")
+            tag = container.write_header(write_file, key, header)
+            index, final = container.SegmentIndex(), False
+        else:
+            write_file, header, key, tag, index, final = resumed
 
         try:
-            encrypted_data = cipher.encrypt(file.read())
+            with write_file:
+                progress.checkpoint(write_file, index, force=True)
+                if not final:
+                    self._encrypt_segments(
+                        header,
+                        key,
+                        plaintext,
+                        write_file,
+                        jobs,
+                        index,
+                        lambda written: progress.checkpoint(write_file, written),
+                    )
+                container.write_trailer(
+                    write_file, key, tag, index, self._digest_meta(plaintext)
+                )
+                write_file.flush()
+                os.fsync(write_file.fileno())
+        except FatalError:
+            raise
         except Exception as exc:
             raise FatalError("Ran into an issue while encrypting file") from exc
+        progress.remove()
+
+    def _resume_output(
+        self,
+        progress: journal.Journal,
+        file: BinaryIO,
+        output_path: str,
+        password: str,
+        digest_algorithm: str | None,
+    ) -> tuple[BinaryIO, dict, bytes, bytes, container.SegmentIndex, bool] | None:
+        """Reopen the output of an interrupted run after verifying it.
+
+        The committed segments are authenticated and compared with the
+        plaintext, and anything written after the last checkpoint is
+        truncated. Output that can not be resumed, or that digests the
+        plaintext differently than asked, is started over.
+
+        Args:
+            progress: The journal of the interrupted run.
+            file: The plaintext file, positioned at its start.
+            output_path: Where the container is written.
+            password: Password for encryption.
+            digest_algorithm: The plaintext digest algorithm asked for.
+
+        Returns:
+            tuple | None: The output file positioned after the committed
+                segments, the header, key, header tag, segment index and
+                whether the final segment was already written; or None if
+                there is nothing to resume, with ``file`` back at its start.
 
+        Raises:
+            FatalError: If the output was written with another password.
+        """
+        checkpoint = progress.load()
+        if checkpoint is None:
+            return None
+        segments, offset = checkpoint
         try:
-            with open(f"{file.name}.encrypto", "wb") as write_file:
-                write_file.write(encrypted_data)
-                return "File encrypted successfully"
+            write_file = open(output_path, "r+b")
+        except OSError:
+            return None
+
+        try:
+            if write_file.read(len(container.MAGIC)) != container.MAGIC:
+                raise FatalError("Encrypted file is corrupted")
+            header, raw_header, tag = container.read_header(write_file)
+            if header.get("digest") != digest_algorithm:
+                raise FatalError("Encrypted file has another plaintext digest")
+        except FatalError:
+            write_file.close()
+            return None
+        try:
+            key = self._file_key(password, header)
+            container.verify_header(key, raw_header, tag)
+        except FatalError:
+            write_file.close()
+            raise
+
+        try:
+            index, final = container.verify_segments(
+                container.segment_cipher(header, key),
+                write_file,
+                file,
+                segments,
+                header["segment_size"],
+            )
+            if write_file.tell() != offset:
+                raise FatalError("Encrypted file does not match its journal")
+        except FatalError:
+            write_file.close()
+            file.seek(0)
+            return None
+        write_file.truncate()
+        return write_file, header, key, tag, index, final
+
+    def _encrypt_incremental(
+        self,
+        file: BinaryIO,
+        output_path: str,
+        password: str,
+        kdf_profile: str,
+        engine: str,
+        compression: str | None,
+        compression_level: int | None,
+        digest_algorithm: str | None,
+    ) -> None:
+        """Encrypt a file by content-defined chunks, reusing the existing output.
+
+        The new container is written next to the old one and only replaces
+        it once complete, since unchanged chunks are copied from the old one.
+
+        Args:
+            file: The plaintext file, positioned at its start.
+            output_path: Where the container is written.
+            password: Password for encryption.
+            kdf_profile: Name of the KDF cost profile for a new container.
+            engine: Segment engine for a new container.
+            compression: ``zlib``, ``lzma`` or None, for a new container.
+            compression_level: Compression level from 0 to 9.
+            digest_algorithm: ``HashingService`` algorithm to digest the
+                plaintext with, or None for no digest.
+
+        Returns:
+            None
+
+        Raises:
+            FatalError: If encryption fails.
+            ValueError: If the KDF profile, engine, compression or digest
+                algorithm is unknown.
+        """
+        plaintext = _digesting_reader(file, digest_algorithm)
+        manifest_path = f"{output_path}{chunking.MANIFEST_SUFFIX}"
+        previous = self._previous_chunks(output_path, manifest_path, password)
+        if previous is None:
+            params = chunking.new_chunking_params()
+            header, key = self._new_header(
+                password,
+                params["maximum"],
+                kdf_profile,
+                engine,
+                compression,
+                compression_level,
+                digest_algorithm,
+            )
+            header["chunking"] = params
+            previous_file, entries, previous_start = None, None, 0
+        else:
+            previous_file, header, key, entries, previous_start = previous
+            # The digest is recomputed on every run, so it may change
+            header.pop("digest", None)
+            if digest_algorithm is not None:
+                header["digest"] = digest_algorithm
+
+        write_file = None
+        try:
+            write_file = AtomicWriter(output_path, self.fsync_policy)
+            tag = container.write_header(write_file, key, header)
+            index, written, chunks = container.encrypt_chunks(
+                container.segment_cipher(header, key),
+                header,
+                key,
+                plaintext,
+                write_file,
+                entries,
+                previous_file,
+                previous_start,
+            )
+            trailer = container.write_trailer(
+                write_file,
+                key,
+                tag,
+                index,
+                {"chunks": chunks, **self._digest_meta(plaintext)},
+            )
+            # The old container is closed before it is replaced. A manifest
+            # left behind with a newer container no longer matches its
+            # trailer tag, so a crash between these steps only costs reuse.
+            if previous_file is not None:
+                previous_file.close()
+            write_file.commit()
+            chunking.write_manifest(
+                manifest_path, key, trailer, written, self.fsync_policy
+            )
         except Exception as exc:
-            raise FatalError("Error while writing to file") from exc
+            if write_file is not None:
+                write_file.abort()
+            raise FatalError("Ran into an issue while encrypting file") from exc
+        finally:
+            if previous_file is not None:
+                previous_file.close()
+
+    def _previous_chunks(
+        self, output_path: str, manifest_path: str, password: str
+    ) -> tuple[BinaryIO, dict, bytes, chunking.ManifestEntries, int] | None:
+        """Open an existing incremental container and its manifest for reuse.
+
+        Args:
+            output_path: Path of the existing container.
+            manifest_path: Path of its manifest.
+            password: Password for encryption.
+
+        Returns:
+            tuple | None: The open container, its header, its key, the
+                manifest entries and the position of its first segment; or
+                None if there is no incremental output encrypted under this
+                password to reuse.
+        """
+        try:
+            previous_file = open(output_path, "rb")
+        except OSError:
+            return None
+
+        try:
+            if previous_file.read(len(container.MAGIC)) != container.MAGIC:
+                raise FatalError("Encrypted file is not a container")
+            header, raw_header, tag = container.read_header(previous_file)
+            if "chunking" not in header:
+                raise FatalError("Encrypted file is not chunked")
+            key = self._file_key(password, header)
+            container.verify_header(key, raw_header, tag)
+            payload_start = previous_file.tell()
+            previous_file.seek(-container.TAG_SIZE, os.SEEK_END)
+            entries = chunking.read_manifest(
+                manifest_path, key, previous_file.read(container.TAG_SIZE)
+            )
+            if entries is None:
+                raise FatalError("Manifest does not match the encrypted file")
+        except (FatalError, OSError):
+            previous_file.close()
+            return None
+        return previous_file, header, key, entries, payload_start
+
+    def _new_header(
+        self,
+        password: str,
+        segment_size: int,
+        kdf_profile: str,
+        engine: str,
+        compression: str | None,
+        compression_level: int | None,
+        digest_algorithm: str | None = None,
+    ) -> tuple[dict, bytes]:
+        """Build the header for a new container and generate its data key.
+
+        The data key is random and stored wrapped under the password, so
+        the password can later be changed without touching the payload.
+
+        Args:
+            password: Password for encryption.
+            segment_size: Number of plaintext bytes per encrypted segment.
+            kdf_profile: Name of the KDF cost profile to derive the key with.
+            engine: Segment engine: ``fernet``, ``auto`` or an AEAD engine.
+            compression: ``zlib``, ``lzma`` or None for no compression.
+            compression_level: Compression level from 0 to 9.
+            digest_algorithm: ``HashingService`` algorithm the plaintext is
+                digested with, or None for no digest.
+
+        Returns:
+            tuple[dict, bytes]: The header and the base64-encoded data key.
+
+        Raises:
+            ValueError: If the KDF profile, engine or compression is unknown.
+        """
+        header = container.new_cipher_params(engine)
+        if compression is not None:
+            header["compression"] = new_compression_params(
+                compression, compression_level
+            )
+        if digest_algorithm is not None:
+            header["digest"] = digest_algorithm
+        key = envelope.new_data_key()
+        slot = self._new_key_slot(key, password, kdf_profile, self.key_material)
+        header.update(keys=[slot], segment_size=segment_size, trailer=True)
+        return header, key
+
+    def _encrypt_segments(
+        self,
+        header: dict,
+        key: bytes,
+        src: BinaryIO,
+        dst: BinaryIO,
+        jobs: int,
+        index: container.SegmentIndex | None = None,
+        checkpoint: Callable[[container.SegmentIndex], None] | None = None,
+    ) -> container.SegmentIndex:
+        """Seal plaintext into segments, in this process or a worker pool.
+
+        Args:
+            header: The container header.
+            key: The base64-encoded payload key.
+            src: Binary stream to read plaintext from.
+            dst: Binary stream to write segments to.
+            jobs: Number of worker processes to encrypt segments with.
+            index: Index of segments already written, to continue after them.
+            checkpoint: Called with the index as segments are written.
+
+        Returns:
+            container.SegmentIndex: The offsets of all written segments.
+        """
+        segment_size = header["segment_size"]
+        if jobs > 1:
+            return container.encrypt_segments_parallel(
+                header, key, src, dst, segment_size, jobs, index, checkpoint
+            )
+        return container.encrypt_segments(
+            container.segment_cipher(header, key),
+            src,
+            dst,
+            segment_size,
+            index,
+            checkpoint,
+        )
+
+    def rekey_file(
+        self,
+        file_path: str,
+        password: str,
+        new_password: str,
+        kdf_profile: str = DEFAULT_KDF_PROFILE,
+        new_key_material: bytes | None = None,
+    ) -> str:
+        """Change the password of an encrypted file without re-encrypting it.
+
+        Only the wrapped data key in the header is replaced, normally in
+        place, so the cost does not depend on the size of the file. Files
+        written before data keys were wrapped have to be decrypted and
+        encrypted again instead.
+
+        Args:
+            file_path: Path to the encrypted file.
+            password: Current password of the file.
+            new_password: Password to protect the file with from now on.
+            kdf_profile: Name of the KDF cost profile for the new password.
+            new_key_material: Keyfile contents to protect the file with
+                instead of ``new_password``.
+
+        Returns:
+            str: Success message.
+
+        Raises:
+            FatalError: If a password is empty, the current password is
+                wrong, the file has no wrapped data key, or write error.
+            ValueError: If the KDF profile is unknown.
+        """
+        if new_key_material is None and new_password == "":
+            raise FatalError("Please enter a password")
+
+        def replace(slots: list, position: int, key: bytes) -> None:
+            slots[position] = self._new_key_slot(
+                key, new_password, kdf_profile, new_key_material
+            )
+
+        self._update_key_slots(file_path, password, replace)
+        return "Password changed successfully"
+
+    def add_key_slot(
+        self,
+        file_path: str,
+        password: str,
+        new_password: str,
+        kdf_profile: str = DEFAULT_KDF_PROFILE,
+        new_key_material: bytes | None = None,
+    ) -> str:
+        """Let another password or keyfile open an encrypted file.
+
+        The data key is wrapped under ``new_password`` into a new key slot,
+        so the payload stays encrypted once however many passwords open it.
+
+        Args:
+            file_path: Path to the encrypted file.
+            password: A password that already opens the file.
+            new_password: The password to add.
+            kdf_profile: Name of the KDF cost profile for the new password.
+            new_key_material: Keyfile contents to add instead of
+                ``new_password``.
+
+        Returns:
+            str: Success message naming the new slot.
+
+        Raises:
+            FatalError: If a password is empty, ``password`` is wrong, the
+                file has no wrapped data key, or write error.
+            ValueError: If the KDF profile is unknown.
+        """
+        if new_key_material is None and new_password == "":
+            raise FatalError("Please enter a password")
+
+        def add(slots: list, position: int, key: bytes) -> None:
+            slots.append(
+                self._new_key_slot(key, new_password, kdf_profile, new_key_material)
+            )
+
+        slots = self._update_key_slots(file_path, password, add)
+        return f"Added key slot {len(slots) - 1}"
+
+    def remove_key_slot(self, file_path: str, password: str, slot: int) -> str:
+        """Stop a key slot from opening an encrypted file.
+
+        Args:
+            file_path: Path to the encrypted file.
+            password: A password that opens the file, through any slot.
+            slot: Position of the slot to remove, as listed by
+                ``list_key_slots``.
+
+        Returns:
+            str: Success message.
+
+        Raises:
+            FatalError: If ``password`` is wrong, the slot does not exist or
+                is the only one left, or write error.
+        """
+
+        def remove(slots: list, position: int, key: bytes) -> None:
+            if not 0 <= slot < len(slots):
+                raise FatalError(f"No key slot {slot}")
+            if len(slots) == 1:
+                raise FatalError("Can not remove the only key slot")
+            del slots[slot]
+
+        self._update_key_slots(file_path, password, remove)
+        return f"Removed key slot {slot}"
+
+    def list_key_slots(self, file_path: str) -> list[dict]:
+        """Describe the key slots of an encrypted file.
+
+        Only the header is read, and no password is needed.
+
+        Args:
+            file_path: Path to the encrypted file.
+
+        Returns:
+            list[dict]: The KDF parameters of each slot, without salts, in
+                slot order.
+
+        Raises:
+            FatalError: If the file has no wrapped data key or a slot is
+                malformed.
+        """
+        with open_input(file_path) as file:
+            header = self._read_key_header(file)[0]
+        described = []
+        for slot in header["keys"]:
+            if not isinstance(slot, dict) or not isinstance(slot.get("kdf"), dict):
+                raise FatalError("Encrypted file has an invalid key slot")
+            kdf = slot["kdf"]
+            described.append({name: kdf[name] for name in kdf if name != "salt"})
+        return described
+
+    def _update_key_slots(
+        self,
+        file_path: str,
+        password: str,
+        update: Callable[[list, int, bytes], None],
+    ) -> list:
+        """Change the key slots of a container, rewriting only its header.
+
+        The header is rewritten in place when the new slots fit in its
+        reserved space, and the container is copied with a larger header
+        otherwise. The payload is never re-encrypted.
 
-    def decrypt_file(self, file_path: str, password: str) -> None:
+        Args:
+            file_path: Path to the encrypted file.
+            password: A password that opens the file.
+            update: Called with the slot list, the position of the slot
+                ``password`` opened and the data key; it edits the list.
+
+        Returns:
+            list: The new key slots.
+
+        Raises:
+            FatalError: If ``password`` is wrong, the file has no wrapped
+                data key, or write error.
+        """
+        self._require_password(password)
+
+        try:
+            file = open(file_path, "r+b")
+        except OSError as exc:
+            raise FatalError("Ran into an issue while opening file") from exc
+
+        with file:
+            header, raw_header, tag = self._read_key_header(file)
+            position, key = self._open_slot(password, header["keys"])
+            container.verify_header(key, raw_header, tag)
+            update(header["keys"], position, key)
+            try:
+                if container.rewrite_header(file, header, len(raw_header)):
+                    file.flush()
+                    os.fsync(file.fileno())
+                else:
+                    self._copy_with_header(file, file_path, header, tag)
+            except Exception as exc:
+                raise FatalError("Ran into an issue while writing to file") from exc
+        return header["keys"]
+
+    def _read_key_header(self, file: BinaryIO) -> tuple[dict, bytes, bytes]:
+        """Read the header of a container that has key slots.
+
+        Args:
+            file: The encrypted file, positioned at its start.
+
+        Returns:
+            tuple[dict, bytes, bytes]: The header, its raw bytes and tag,
+                with ``file`` positioned after the header tag.
+
+        Raises:
+            FatalError: If the file has no wrapped data key.
+        """
+        if file.read(len(container.MAGIC)) == container.MAGIC:
+            header, raw_header, tag = container.read_header(file)
+            if isinstance(header.get("keys"), list):
+                return header, raw_header, tag
+        raise FatalError(
+            "File has no wrapped data key; decrypt and encrypt it again "
+            "to manage its passwords"
+        )
+
+    def _new_key_slot(
+        self,
+        key: bytes,
+        password: str,
+        kdf_profile: str,
+        key_material: bytes | None = None,
+    ) -> dict:
+        """Wrap a data key under a password or keyfile into a new key slot.
+
+        Args:
+            key: The base64-encoded data key.
+            password: The password the slot opens with.
+            kdf_profile: Name of the KDF cost profile to derive with.
+            key_material: Keyfile contents the slot opens with instead of
+                ``password``.
+
+        Returns:
+            dict: The key slot.
+
+        Raises:
+            ValueError: If the KDF profile is unknown.
+        """
+        if key_material is not None:
+            kdf = new_keyfile_params()
+            return envelope.wrap_key(key, derive_keyfile_key(key_material, kdf), kdf)
+        kdf = self._new_kdf_params(password, kdf_profile)
+        return envelope.wrap_key(key, derive_key(password, kdf, self.key_cache), kdf)
+
+    def _copy_with_header(
+        self, file: BinaryIO, file_path: str, header: dict, tag: bytes
+    ) -> None:
+        """Replace a container with a copy whose header has grown.
+
+        Args:
+            file: The container, positioned just after its header tag.
+            file_path: Path of the container.
+            header: The header with its new key slots.
+            tag: The stored header tag.
+
+        Returns:
+            None
+        """
+        # The copy replaces the only one of the payload, so it is always synced
+        with AtomicWriter(file_path, FSYNC_END) as write_file:
+            container.copy_with_header(file, write_file, header, tag)
+
+    def decrypt_file(self, file_path: str, password: str, jobs: int = 1) -> None:
         """Decrypt a file previously encrypted by this tool.
 
+        Chunked containers are decrypted one segment at a time, or by a pool
+        of worker processes when ``jobs`` is above one. The key is derived on
+        a background thread while the start of the payload is read, and the
+        timings of that overlap are kept in ``timings``. The plaintext digest
+        of a container that has one is checked as the plaintext is written
+        and kept in ``plaintext_digest``. Files written by older versions as
+        a single Fernet token are still accepted.
+
         Args:
             file_path: Path to the encrypted file.
             password: Password used during encryption.
+            jobs: Number of worker processes to decrypt segments with.
 
         Returns:
             None
@@ -102,28 +1078,273 @@ class AESCipher:
         Raises:
             FatalError: If password is empty, decryption fails, or write error occurs.
         """
-        if password == "":
-            raise FatalError("Please enter a password")
+        self._require_password(password)
+        self.plaintext_digest = None
+
+        output_path = file_path.replace(".encrypto", "")
+
+        with open_input(file_path) as file:
+            magic = file.read(len(container.MAGIC))
+            if magic != container.MAGIC:
+                self._decrypt_legacy_file(
+                    self._cipher(password), magic + file.read(), output_path
+                )
+                return
+
+            header, raw_header, tag = container.read_header(file)
+            key, src, self.timings = pipeline.derive_while_prefetching(
+                lambda: self._file_key(password, header), file
+            )
+            container.verify_header(key, raw_header, tag)
+            try:
+                with AtomicWriter(output_path, self.fsync_policy) as write_file:
+                    self._decrypt_payload(header, key, tag, src, write_file, jobs)
+            except FatalError:
+                raise
+            except Exception as exc:
+                raise FatalError("Ran into an issue while writing to file") from exc
+
+    def decrypt_stream(
+        self, src: BinaryIO, dst: BinaryIO, password: str, jobs: int = 1
+    ) -> None:
+        """Decrypt a container read from a stream into another stream.
+
+        Neither stream needs to be seekable. Each segment is authenticated
+        before its plaintext is written, and truncation is reported once the
+        end of the input is reached, so callers streaming to a pipe must
+        treat the output as invalid if this raises. The start of the payload
+        is read while the key is derived, as recorded in ``timings``, and a
+        plaintext digest is checked as for ``decrypt_file``.
+
+        Args:
+            src: Binary stream to read the container from.
+            dst: Binary stream to write plaintext to.
+            password: Password used during encryption.
+            jobs: Number of worker processes to decrypt segments with.
+
+        Returns:
+            None
+
+        Raises:
+            FatalError: If password is empty or decryption fails.
+        """
+        self._require_password(password)
+        self.plaintext_digest = None
+
+        magic = src.read(len(container.MAGIC))
+        if magic != container.MAGIC:
+            try:
+                dst.write(self._cipher(password).decrypt(magic + src.read()))
+            except Exception as exc:
+                raise FatalError("Ran into an issue while decrypting file") from exc
+            return
+
+        header, raw_header, tag = container.read_header(src)
+        key, payload, self.timings = pipeline.derive_while_prefetching(
+            lambda: self._file_key(password, header), src
+        )
+        container.verify_header(key, raw_header, tag)
+        self._decrypt_payload(header, key, tag, payload, dst, jobs)
+
+    def verify_file(self, file_path: str, password: str, jobs: int = 1) -> None:
+        """Check that an encrypted file is intact and opens with a password.
+
+        Every segment and the trailer are authenticated exactly as by
+        ``decrypt_file``, but the plaintext is discarded as it is produced,
+        so nothing is written and memory use stays bounded by the segment
+        size. A plaintext digest stored in the file is checked as well and
+        kept in ``plaintext_digest``. Files written by older versions as a
+        single Fernet token are decrypted in memory and discarded.
 
-        cipher: Fernet = self._cipher(password)
-        file: BinaryIO = get_file(file_path)
+        Args:
+            file_path: Path to the encrypted file.
+            password: Password used during encryption.
+            jobs: Number of worker processes to authenticate segments with.
+
+        Returns:
+            None
+
+        Raises:
+            FatalError: If password is empty, the password is wrong, or the
+                file is truncated, corrupted or tampered with.
+        """
+        self._require_password(password)
+        self.plaintext_digest = None
+
+        with open_input(file_path) as file:
+            magic = file.read(len(container.MAGIC))
+            if magic != container.MAGIC:
+                try:
+                    self._cipher(password).decrypt(magic + file.read())
+                except Exception as exc:
+                    raise FatalError("Ran into an issue while verifying file") from exc
+                return
+
+            header, raw_header, tag = container.read_header(file)
+            key, src, self.timings = pipeline.derive_while_prefetching(
+                lambda: self._file_key(password, header), file
+            )
+            container.verify_header(key, raw_header, tag)
+            try:
+                self._decrypt_payload(header, key, tag, src, _NullSink(), jobs)
+            except FatalError:
+                raise
+            except Exception as exc:
+                raise FatalError("Ran into an issue while verifying file") from exc
+
+    def decrypt_range(
+        self, file_path: str, password: str, start: int, end: int | None = None
+    ) -> bytes:
+        """Decrypt a byte range of an encrypted file without decrypting it all.
+
+        Only the segments covering the range are read, authenticated and
+        decrypted, so the cost grows with the range rather than the file.
+        Files written by older versions as a single Fernet token are
+        decrypted whole and sliced.
+
+        Args:
+            file_path: Path to the encrypted file.
+            password: Password used during encryption.
+            start: First plaintext byte to return.
+            end: Plaintext byte to stop before, or None for the end of the file.
+
+        Returns:
+            bytes: The requested plaintext, shorter if the file ends first.
+
+        Raises:
+            FatalError: If password is empty, the range is invalid, or
+                decryption fails.
+        """
+        self._require_password(password)
+        if start < 0 or (end is not None and end < start):
+            raise FatalError("Invalid byte range")
+
+        with open_input(file_path) as file:
+            magic = file.read(len(container.MAGIC))
+            if magic != container.MAGIC:
+                try:
+                    data = self._cipher(password).decrypt(magic + file.read())
+                except Exception as exc:
+                    raise FatalError("Ran into an issue while decrypting file") from exc
+                return data[start:end]
+
+            header, raw_header, tag = container.read_header(file)
+            key = self._file_key(password, header)
+            container.verify_header(key, raw_header, tag)
+            if "chunking" in header:
+                # Chunk sizes vary, so the covering chunks can not be located
+                # directly; decrypt in order and keep only the range.
+                sink = _RangeSink(start, end)
+                self._decrypt_payload(header, key, tag, file, sink, 1)
+                return sink.getvalue()
+            cipher = container.segment_cipher(header, key)
+            return container.decrypt_range(cipher, header, file, start, end)
 
+    def _decrypt_payload(
+        self,
+        header: dict,
+        key: bytes,
+        tag: bytes,
+        src: BinaryIO,
+        dst: BinaryIO,
+        jobs: int,
+    ) -> None:
+        """Decrypt the segments and check the trailer of an authenticated header.
+
+        Args:
+            header: The verified container header.
+            key: The base64-encoded payload key.
+            tag: The header tag.
+            src: Binary stream positioned at the first segment.
+            dst: Binary stream to write plaintext to.
+            jobs: Number of worker processes to decrypt segments with.
+
+        Returns:
+            None
+
+        Raises:
+            FatalError: If any segment or the trailer fails authentication,
+                or the plaintext does not match its digest.
+        """
+        algorithm = header.get("digest")
+        if algorithm is not None:
+            try:
+                dst = digest.DigestingWriter(dst, algorithm)
+            except ValueError as exc:
+                raise FatalError(f"Unsupported plaintext digest: {algorithm}") from exc
+
+        if "chunking" in header:
+            chunks = container.decrypt_chunks(
+                container.segment_cipher(header, key), key, src, dst
+            )
+            meta = container.read_trailer(src, key, tag)
+            if meta.get("chunks") != chunks:
+                raise FatalError("Encrypted file is corrupted")
+        else:
+            if jobs > 1:
+                container.decrypt_segments_parallel(header, key, src, dst, jobs)
+            else:
+                cipher = container.segment_cipher(header, key)
+                container.decrypt_segments(cipher, src, dst)
+            meta = {}
+            if header.get("trailer"):
+                meta = container.read_trailer(src, key, tag)
+            elif src.read(1):
+                raise FatalError("Encrypted file has unexpected trailing data")
+
+        if isinstance(dst, digest.DigestingWriter):
+            if meta.get("digest") != dst.hexdigest():
+                raise FatalError("Decrypted data does not match its digest")
+            self.plaintext_digest = (dst.algorithm, dst.hexdigest())
+
+    def _decrypt_legacy_file(
+        self, cipher: Fernet, data: bytes, output_path: str
+    ) -> None:
+        """Decrypt a file stored as one Fernet token by earlier versions.
+
+        Args:
+            cipher: Fernet cipher for the password.
+            data: The complete token read from the file.
+            output_path: Where to write the decrypted data.
+
+        Returns:
+            None
+
+        Raises:
+            FatalError: If decryption fails or write error occurs.
+        """
         try:
-            decrypted_data = cipher.decrypt(file.read())
+            decrypted_data = cipher.decrypt(data)
         except Exception as exc:
             raise FatalError("Ran into an issue while decrypting file") from exc
 
         try:
-            with open(file.name.replace(".encrypto", ""), "wb") as write_file:
+            with AtomicWriter(output_path, self.fsync_policy) as write_file:
                 write_file.write(decrypted_data)
         except Exception as exc:
             raise FatalError("Ran into an issue while writing to file") from exc
 
-    def _cipher(self, password: str) -> Fernet:
+    def _digest_meta(self, plaintext: BinaryIO) -> dict:
+        """Record the digest of plaintext read for encryption, if computed.
+
+        Args:
+            plaintext: The stream the plaintext was read through.
+
+        Returns:
+            dict: Trailer metadata holding the digest, or empty if
+                ``plaintext`` was not digested.
+        """
+        if not isinstance(plaintext, digest.DigestingReader):
+            return {}
+        self.plaintext_digest = (plaintext.algorithm, plaintext.hexdigest())
+        return {"digest": plaintext.hexdigest()}
+
+    def _cipher(self, password: str, kdf: dict | None = None) -> Fernet:
         """Create a Fernet cipher instance for the given password.
 
         Args:
             password: Password to derive the encryption key from.
+            kdf: Stored KDF parameters, or None for the legacy derivation.
 
         Returns:
             Fernet: Fernet cipher instance ready for encryption/decryption.
@@ -131,8 +1352,248 @@ class AESCipher:
         Raises:
             FatalError: If key derivation or cipher creation fails.
         """
-        key = key_gen(password)
+        return self._cipher_from_key(self._key(password, kdf))
+
+    def _file_key(self, password: str, header: dict) -> bytes:
+        """Recover the payload key of a container for a password.
+
+        Args:
+            password: Password to open the container with.
+            header: The container header.
+
+        Returns:
+            bytes: The base64-encoded data key, or the password-derived key
+                for containers written without key slots.
+
+        Raises:
+            FatalError: If the password opens none of the key slots, or the
+                key parameters are invalid.
+        """
+        if "keys" not in header:
+            return self._key(password, header.get("kdf"))
+        return self._open_slot(password, header["keys"])[1]
+
+    def _open_slot(self, password: str, slots: list) -> tuple[int, bytes]:
+        """Find the key slot a password opens.
+
+        Args:
+            password: Password to try against each slot.
+            slots: The key slots of a container header.
+
+        Returns:
+            tuple[int, bytes]: The position of the slot and the unwrapped
+                base64-encoded data key.
+
+        Raises:
+            FatalError: If the slots are malformed or none of them opens.
+        """
+        if not isinstance(slots, list):
+            raise FatalError("Encrypted file has an invalid key slot")
+        for position, slot in enumerate(slots):
+            if not isinstance(slot, dict) or not isinstance(slot.get("kdf"), dict):
+                raise FatalError("Encrypted file has an invalid key slot")
+            # Only try the slots opened by the kind of key this cipher holds
+            keyfile_slot = slot["kdf"].get("algorithm") == KEYFILE_KDF
+            if keyfile_slot != (self.key_material is not None):
+                continue
+            key = envelope.unwrap_key(slot, self._key(password, slot["kdf"]))
+            if key is not None:
+                return position, key
+        raise FatalError("Either the key or the input data is wrong.")
+
+    def _key(self, password: str, kdf: dict | None = None) -> bytes:
+        """Derive the key for a password, or the keyfile, and stored KDF parameters.
+
+        Args:
+            password: Password to derive the encryption key from.
+            kdf: Stored KDF parameters, or None for the legacy derivation.
+
+        Returns:
+            bytes: Base64-encoded Fernet key.
+
+        Raises:
+            FatalError: If the KDF parameters are invalid, or are for a
+                keyfile while this cipher uses passwords or the other way
+                around.
+        """
+        if kdf is not None and kdf.get("algorithm") == KEYFILE_KDF:
+            if self.key_material is None:
+                raise FatalError("Data was encrypted with a keyfile, not a password")
+            return derive_keyfile_key(self.key_material, kdf)
+        if self.key_material is not None:
+            raise FatalError("Data was encrypted with a password, not a keyfile")
+        if kdf is None:
+            return key_gen(password, self.key_cache)
+        return derive_key(password, kdf, self.key_cache)
+
+    def _new_kdf_params(self, password: str, kdf_profile: str) -> dict:
+        """Pick KDF parameters for a new encryption.
+
+        Without a key cache every encryption gets a fresh salt. With one, the
+        salt is reused per password and profile so a batch shares one key.
+
+        Args:
+            password: Password being encrypted under.
+            kdf_profile: Name of the KDF cost profile.
+
+        Returns:
+            dict: KDF parameters to store with the output.
+        """
+        if self.key_cache is None:
+            return new_kdf_params(kdf_profile)
+        return self.key_cache.get_or_create_params(
+            password, kdf_profile, lambda: new_kdf_params(kdf_profile)
+        )
+
+    def _new_text_kdf_params(self, password: str, kdf_profile: str) -> dict:
+        """Pick KDF parameters for a new text encryption.
+
+        Args:
+            password: Password being encrypted under.
+            kdf_profile: Name of the KDF cost profile.
+
+        Returns:
+            dict: HKDF parameters when this cipher uses a keyfile, scrypt
+                parameters otherwise.
+        """
+        if self.key_material is not None:
+            return new_keyfile_params()
+        return self._new_kdf_params(password, kdf_profile)
+
+    def _require_password(self, password: str) -> None:
+        """Reject an empty password unless this cipher uses a keyfile.
+
+        Args:
+            password: The password given by the caller.
+
+        Returns:
+            None
+
+        Raises:
+            FatalError: If no password was given and there is no keyfile.
+        """
+        if self.key_material is None and password == "":
+            raise FatalError("Please enter a password")
+
+    def _cipher_from_key(self, key: bytes) -> Fernet:
+        """Create a Fernet cipher instance for an already derived key.
+
+        Args:
+            key: Base64-encoded Fernet key.
+
+        Returns:
+            Fernet: Fernet cipher instance ready for encryption/decryption.
+
+        Raises:
+            FatalError: If cipher creation fails.
+        """
         try:
             return Fernet(key)
         except Exception as exc:
             raise FatalError("Key Error!") from exc
+
+
+class _RangeSink:
+    """Writable stream that keeps only one byte range of what it is given."""
+
+    def __init__(self, start: int, end: int | None) -> None:
+        """Initialize the sink.
+
+        Args:
+            start: First byte to keep.
+            end: Byte to stop before, or None to keep everything after start.
+
+        Returns:
+            None
+        """
+        self._start = start
+        self._end = end
+        self._position = 0
+        self._chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        """Keep the part of ``data`` that falls within the range.
+
+        Args:
+            data: The next bytes of the stream.
+
+        Returns:
+            int: The number of bytes consumed, always ``len(data)``.
+        """
+        position = self._position
+        self._position += len(data)
+        low = max(self._start - position, 0)
+        high = len(data) if self._end is None else min(self._end - position, len(data))
+        if low < high:
+            self._chunks.append(data[low:high])
+        return len(data)
+
+    def getvalue(self) -> bytes:
+        """Return the bytes kept so far.
+
+        Returns:
+            bytes: The range, shorter if the stream ended first.
+        """
+        return b"".join(self._chunks)
+
+
+class _NullSink:
+    """Writable stream that discards what it is given."""
+
+    def write(self, data: bytes) -> int:
+        """Discard ``data``.
+
+        Args:
+            data: The next bytes of the stream.
+
+        Returns:
+            int: The number of bytes consumed, always ``len(data)``.
+        """
+        return len(data)
+
+
+def _digesting_reader(src: BinaryIO, algorithm: str | None) -> BinaryIO:
+    """Wrap a plaintext stream to digest it, unless no algorithm is given."""
+    if algorithm is None:
+        return src
+    return digest.DigestingReader(src, algorithm)
+
+
+def _format_text(kdf: dict, token: str) -> str:
+    """Prefix a Fernet token with the KDF parameters it was derived with.
+
+    Args:
+        kdf: KDF parameters used for the key.
+        token: Fernet token.
+
+    Returns:
+        str: The self-describing text ciphertext.
+    """
+    cost = ",".join(f"{name}={kdf[name]}" for name in ("n", "r", "p") if name in kdf)
+    return f"{TEXT_PREFIX}{kdf['algorithm']}${cost}${kdf['salt']}${token}"
+
+
+def _parse_text(text: str) -> tuple[dict | None, str]:
+    """Split a text ciphertext into its KDF parameters and Fernet token.
+
+    Args:
+        text: Text ciphertext, either self-describing or a bare legacy token.
+
+    Returns:
+        tuple[dict | None, str]: KDF parameters (None for legacy tokens) and
+            the Fernet token.
+
+    Raises:
+        FatalError: If the prefix is malformed.
+    """
+    if not text.startswith(TEXT_PREFIX):
+        return None, text
+    try:
+        algorithm, cost, salt, token = text[len(TEXT_PREFIX) :].split("$")
+        kdf: dict = {"algorithm": algorithm, "salt": salt}
+        for field in filter(None, cost.split(",")):
+            name, value = field.split("=")
+            kdf[name] = int(value)
+    except ValueError as exc:
+        raise FatalError("Either the key or the input data is wrong.") from exc
+    return kdf, token
@@ -0,0 +1,161 @@
+"""Optional per-segment compression for AES containers.
+
+Each segment is compressed on its own before it is sealed, so compressed
+containers keep parallel processing and byte-range decryption. Segments that
+look already compressed (high byte entropy), or that do not shrink, are stored
+as they are; a flag byte in front of every segment records which was done.
+"""
+
+import lzma
+import math
+import zlib
+from collections import Counter
+from typing import Any
+
+from encryptocli.util.exceptions import FatalError
+
+ZLIB = "zlib"
+LZMA = "lzma"
+ALGORITHMS = (ZLIB, LZMA)
+DEFAULT_LEVEL = 6
+
+# Bits per byte above which a sample is treated as incompressible. Text and
+# JSON sit around 4-6; compressed, encrypted and media data approach 8.
+ENTROPY_THRESHOLD = 7.5
+_SAMPLE_SIZE = 2048
+
+_STORED = b"\x00"
+_COMPRESSED = b"\x01"
+
+
+def estimate_entropy(data: bytes) -> float:
+    """Estimate the Shannon entropy of a sample of ``data``.
+
+    Args:
+        data: Bytes to sample; only the first few KiB are examined.
+
+    Returns:
+        float: Entropy in bits per byte, from 0 to 8.
+    """
+    sample = data[:_SAMPLE_SIZE]
+    if not sample:
+        return 0.0
+    total = len(sample)
+    return -sum(
+        count / total * math.log2(count / total) for count in Counter(sample).values()
+    )
+
+
+def new_compression_params(algorithm: str, level: int | None = None) -> dict:
+    """Create the header field describing the compression stage.
+
+    Args:
+        algorithm: ``zlib`` or ``lzma``.
+        level: Compression level from 0 to 9, or None for the default.
+
+    Returns:
+        dict: JSON-serializable compression parameters.
+
+    Raises:
+        ValueError: If the algorithm or level is unsupported.
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(
+            f"Unknown compression: {algorithm}. "
+            f"Supported compression: {', '.join(ALGORITHMS)}"
+        )
+    level = DEFAULT_LEVEL if level is None else level
+    if not 0 <= level <= 9:
+        raise ValueError("Compression level must be between 0 and 9")
+    return {"algorithm": algorithm, "level": level}
+
+
+class CompressedSegments:
+    """Compress segments before sealing them with an inner segment cipher."""
+
+    def __init__(self, cipher: Any, params: dict, segment_size: int) -> None:
+        """Wrap a segment cipher with a compression stage.
+
+        Args:
+            cipher: Segment cipher with ``seal`` and ``open`` methods.
+            params: Compression parameters from the container header.
+            segment_size: Maximum plaintext bytes per segment, which bounds
+                decompressed output.
+
+        Returns:
+            None
+
+        Raises:
+            FatalError: If the header names an unsupported compression.
+        """
+        algorithm = params.get("algorithm") if isinstance(params, dict) else None
+        if algorithm not in ALGORITHMS:
+            raise FatalError(f"Unsupported compression: {algorithm}")
+        self._cipher = cipher
+        self._algorithm = algorithm
+        self._level = int(params.get("level", DEFAULT_LEVEL))
+        self._segment_size = segment_size
+
+    def seal(self, index: int, data: bytes, final: bool) -> bytes:
+        """Compress a segment unless it looks incompressible, then seal it.
+
+        Args:
+            index: Position of the segment in the stream.
+            data: Plaintext segment data.
+            final: Whether this is the last segment.
+
+        Returns:
+            bytes: The segment token.
+        """
+        return self._cipher.seal(index, self._pack(data), final)
+
+    def open(self, index: int, token: bytes) -> tuple[bytes, bool]:
+        """Open a segment and undo its compression.
+
+        Args:
+            index: Position the segment is expected to occupy.
+            token: The segment token.
+
+        Returns:
+            tuple[bytes, bool]: The plaintext data and the final flag.
+
+        Raises:
+            FatalError: If authentication or decompression fails.
+        """
+        packed, final = self._cipher.open(index, token)
+        return self._unpack(packed), final
+
+    def _pack(self, data: bytes) -> bytes:
+        """Prefix data with a flag byte, compressing it when worthwhile."""
+        if data and estimate_entropy(data) < ENTROPY_THRESHOLD:
+            if self._algorithm == ZLIB:
+                compressed = zlib.compress(data, self._level)
+            else:
+                compressed = lzma.compress(data, preset=self._level)
+            if len(compressed) < len(data):
+                return _COMPRESSED + compressed
+        return _STORED + data
+
+    def _unpack(self, packed: bytes) -> bytes:
+        """Reverse ``_pack``, refusing output larger than a segment."""
+        flag, body = packed[:1], packed[1:]
+        if flag == _STORED:
+            return body
+        if flag != _COMPRESSED:
+            raise FatalError("Encrypted file is corrupted")
+
+        limit = self._segment_size + 1
+        try:
+            if self._algorithm == ZLIB:
+                inflater = zlib.decompressobj()
+                data = inflater.decompress(body, limit)
+                complete = inflater.eof and not inflater.unconsumed_tail
+            else:
+                decompressor = lzma.LZMADecompressor()
+                data = decompressor.decompress(body, limit)
+                complete = decompressor.eof
+        except (zlib.error, lzma.LZMAError) as exc:
+            raise FatalError("Encrypted file is corrupted") from exc
+        if not complete or len(data) > self._segment_size:
+            raise FatalError("Encrypted file is corrupted")
+        return data
@@ -0,0 +1,1009 @@
+"""Chunked, authenticated container format for AES file encryption.
+
+An ``.encrypto`` container is laid out as a fixed preamble, a JSON header and
+a header tag, followed by a stream of length-prefixed segment tokens::
+
+    MAGIC | version | header length | header | header tag
+    token length | token
+    token length | token
+    ...
+    trailer marker | segment offsets | trailer meta | footer | trailer tag
+
+The header names the segment engine: Fernet, or one of the AEAD engines in
+``aead``. Every token authenticates its segment index and a final flag, so
+segments can not be reordered, dropped or truncated without failing
+authentication, and only one segment needs to be held in memory at a time.
+
+Containers whose header has ``"trailer": true`` end with a segment index: the
+offset of every segment, JSON metadata such as the plaintext size, and a
+fixed-size footer. The footer sits at the very end of the file so a reader can
+seek straight to the segments covering a byte range.
+
+Containers whose header has a ``chunking`` field hold content-defined chunks
+from ``chunking`` instead of fixed-size segments. Chunk tokens do not
+authenticate their position; the trailer metadata holds a digest of the
+ordered chunk ids instead.
+
+Containers whose header has a ``keys`` field encrypt under a random data key
+wrapped into key slots (see ``envelope``). The header tag covers every field
+but ``keys``, and the header is padded with spaces so that key slots can be
+rewritten in place without moving the payload.
+"""
+
+import hmac
+import json
+import os
+import shutil
+import struct
+import sys
+from array import array
+from base64 import urlsafe_b64decode
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from hashlib import sha256
+from itertools import islice
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, Union
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from encryptocli.encryption.aes import aead, chunking, compression
+from encryptocli.util.exceptions import FatalError
+
+MAGIC = b"ENCRYPTO"
+FORMAT_VERSION = 1
+DEFAULT_SEGMENT_SIZE = 64 * 1024
+FERNET = "fernet"
+TAG_SIZE = 32
+
+_PREAMBLE = struct.Struct(">BI")
+_TOKEN_LENGTH = struct.Struct(">I")
+_SEGMENT_PREFIX = struct.Struct(">QB")
+_MAX_HEADER_SIZE = 64 * 1024
+# Headers with key slots are padded to a multiple of this, with at least this
+# much room left for further or larger slots.
+_HEADER_RESERVE = 256
+# A Fernet token for a full segment is well under twice the segment size.
+_MAX_TOKEN_SIZE = 4 * 1024 * 1024
+# Plaintext handed to a worker per task in parallel mode
+_PARALLEL_BATCH_BYTES = 1024 * 1024
+# Token length that ends the segments and starts the trailer. It is above
+# _MAX_TOKEN_SIZE, so it never frames a real token.
+_TRAILER_MARKER = 0xFFFFFFFF
+_OFFSET = struct.Struct(">Q")
+# Segment count and meta length, at the end of the trailer
+_FOOTER = struct.Struct(">QI")
+_MAX_TRAILER_META_SIZE = 64 * 1024
+
+SegmentCipher = Union[
+    "FernetSegments",
+    aead.AEADSegments,
+    chunking.ChunkSegments,
+    compression.CompressedSegments,
+]
+
+# Per-process cipher used by parallel workers, set by _init_worker
+_worker_cipher: SegmentCipher | None = None
+
+
+def header_tag(key: bytes, header: bytes) -> bytes:
+    """Compute the authentication tag protecting a serialized header.
+
+    Args:
+        key: The base64-encoded Fernet key used for the payload.
+        header: The serialized header bytes.
+
+    Returns:
+        bytes: HMAC-SHA256 tag over the header.
+    """
+    subkey = hmac.new(urlsafe_b64decode(key), b"encrypto-header", sha256).digest()
+    return hmac.new(subkey, header, sha256).digest()
+
+
+def write_header(dst: BinaryIO, key: bytes, header: dict) -> bytes:
+    """Write the container preamble, header and header tag.
+
+    Args:
+        dst: Binary stream to write to.
+        key: The base64-encoded Fernet key used for the payload.
+        header: Header fields describing the payload.
+
+    Returns:
+        bytes: The header tag, which the trailer tag is bound to.
+    """
+    raw = _serialize_header(header)
+    tag = header_tag(key, _authenticated_header(raw))
+    if "keys" in header:
+        raw = _pad_header(raw)
+    dst.write(MAGIC)
+    dst.write(_PREAMBLE.pack(FORMAT_VERSION, len(raw)))
+    dst.write(raw)
+    dst.write(tag)
+    return tag
+
+
+def rewrite_header(file: BinaryIO, header: dict, length: int) -> bool:
+    """Replace the key slots of a container header in place.
+
+    Only ``keys`` may differ from the header the file was written with, so
+    the stored header tag stays valid.
+
+    Args:
+        file: The container, opened for reading and writing.
+        header: The header with its new key slots.
+        length: Length of the raw header currently in the file.
+
+    Returns:
+        bool: True if the header was rewritten, or False if it no longer
+            fits in the space reserved for it.
+    """
+    raw = _serialize_header(header)
+    if len(raw) > length:
+        return False
+    file.seek(len(MAGIC) + _PREAMBLE.size)
+    file.write(raw.ljust(length))
+    return True
+
+
+def copy_with_header(src: BinaryIO, dst: BinaryIO, header: dict, tag: bytes) -> None:
+    """Copy a container with new key slots, regrowing its header.
+
+    Args:
+        src: The container, positioned just after its header tag.
+        dst: Binary stream to write the new container to.
+        header: The header with its new key slots.
+        tag: The stored header tag, which stays valid.
+
+    Returns:
+        None
+    """
+    raw = _pad_header(_serialize_header(header))
+    dst.write(MAGIC)
+    dst.write(_PREAMBLE.pack(FORMAT_VERSION, len(raw)))
+    dst.write(raw)
+    dst.write(tag)
+    shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+def read_header(src: BinaryIO) -> tuple[dict, bytes, bytes]:
+    """Read a container header from a stream positioned just after ``MAGIC``.
+
+    Args:
+        src: Binary stream to read from.
+
+    Returns:
+        tuple[dict, bytes, bytes]: The parsed header, its raw bytes and the
+            stored header tag.
+
+    Raises:
+        FatalError: If the header is malformed or of an unsupported version.
+    """
+    preamble = src.read(_PREAMBLE.size)
+    if len(preamble) != _PREAMBLE.size:
+        raise FatalError("Encrypted file header is truncated")
+    version, length = _PREAMBLE.unpack(preamble)
+    if version != FORMAT_VERSION:
+        raise FatalError(f"Unsupported encrypted file version: {version}")
+    if length > _MAX_HEADER_SIZE:
+        raise FatalError("Encrypted file header is too large")
+
+    raw = src.read(length)
+    tag = src.read(TAG_SIZE)
+    if len(raw) != length or len(tag) != TAG_SIZE:
+        raise FatalError("Encrypted file header is truncated")
+    try:
+        header = json.loads(raw)
+    except ValueError as exc:
+        raise FatalError("Encrypted file header is corrupted") from exc
+    return header, raw, tag
+
+
+def verify_header(key: bytes, raw: bytes, tag: bytes) -> None:
+    """Check a header tag, which also confirms the key is correct.
+
+    Args:
+        key: The base64-encoded Fernet key derived for decryption.
+        raw: The raw header bytes.
+        tag: The stored header tag.
+
+    Returns:
+        None
+
+    Raises:
+        FatalError: If the tag does not match.
+    """
+    if not hmac.compare_digest(header_tag(key, _authenticated_header(raw)), tag):
+        raise FatalError("Either the key or the input data is wrong.")
+
+
+def trailer_tag(key: bytes, header_tag: bytes, trailer: bytes) -> bytes:
+    """Compute the authentication tag protecting a serialized trailer.
+
+    The tag covers the header tag too, so a trailer can not be moved onto
+    another container.
+
+    Args:
+        key: The base64-encoded payload key.
+        header_tag: The tag of the container header.
+        trailer: The serialized trailer without its tag.
+
+    Returns:
+        bytes: HMAC-SHA256 tag over the header tag and trailer.
+    """
+    subkey = hmac.new(urlsafe_b64decode(key), b"encrypto-trailer", sha256).digest()
+    return hmac.new(subkey, header_tag + trailer, sha256).digest()
+
+
+class SegmentIndex:
+    """Segment offsets and plaintext size, collected while sealing segments.
+
+    Attributes:
+        offsets: Offset of each framed segment from the first segment.
+        size: Total number of plaintext bytes sealed.
+        length: Total number of framed bytes written.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty index.
+
+        Returns:
+            None
+        """
+        self.offsets = array("Q")
+        self.size = 0
+        self.length = 0
+
+    def add(self, framed_length: int, data_length: int) -> None:
+        """Record the next segment.
+
+        Args:
+            framed_length: Size of the framed token in the container.
+            data_length: Number of plaintext bytes in the segment.
+
+        Returns:
+            None
+        """
+        self.offsets.append(self.length)
+        self.length += framed_length
+        self.size += data_length
+
+
+def write_trailer(
+    dst: BinaryIO,
+    key: bytes,
+    header_tag: bytes,
+    index: SegmentIndex,
+    meta: dict | None = None,
+) -> bytes:
+    """Write the segment index trailer after the final segment.
+
+    Args:
+        dst: Binary stream positioned after the final segment.
+        key: The base64-encoded payload key.
+        header_tag: The tag returned by ``write_header``.
+        index: The index collected while sealing the segments.
+        meta: Extra metadata stored next to the plaintext size.
+
+    Returns:
+        bytes: The trailer tag, which identifies this exact container.
+    """
+    offsets = array("Q", index.offsets)
+    if sys.byteorder == "little":
+        offsets.byteswap()
+    raw_meta = json.dumps(
+        {"size": index.size, **(meta or {})}, sort_keys=True, separators=(",", ":")
+    ).encode()
+    trailer = (
+        offsets.tobytes() + raw_meta + _FOOTER.pack(len(index.offsets), len(raw_meta))
+    )
+    tag = trailer_tag(key, header_tag, trailer)
+    dst.write(_TOKEN_LENGTH.pack(_TRAILER_MARKER))
+    dst.write(trailer)
+    dst.write(tag)
+    return tag
+
+
+def read_trailer(src: BinaryIO, key: bytes, header_tag: bytes) -> dict:
+    """Read and authenticate the trailer that follows the final segment.
+
+    Args:
+        src: Binary stream positioned just after the trailer marker.
+        key: The base64-encoded payload key.
+        header_tag: The stored tag of the container header.
+
+    Returns:
+        dict: The trailer metadata, including the plaintext ``size``.
+
+    Raises:
+        FatalError: If the trailer is missing, malformed or fails
+            authentication.
+    """
+    data = src.read()
+    if len(data) < _FOOTER.size + TAG_SIZE:
+        raise FatalError("Encrypted file is truncated")
+    trailer, tag = data[:-TAG_SIZE], data[-TAG_SIZE:]
+    if not hmac.compare_digest(trailer_tag(key, header_tag, trailer), tag):
+        raise FatalError("Either the key or the input data is wrong.")
+    count, meta_length = _FOOTER.unpack_from(trailer, len(trailer) - _FOOTER.size)
+    if count * _OFFSET.size + meta_length + _FOOTER.size != len(trailer):
+        raise FatalError("Encrypted file is corrupted")
+    try:
+        return json.loads(trailer[count * _OFFSET.size : -_FOOTER.size])
+    except ValueError as exc:
+        raise FatalError("Encrypted file is corrupted") from exc
+
+
+def iter_plaintext_segments(
+    src: BinaryIO, segment_size: int = DEFAULT_SEGMENT_SIZE, first: int = 0
+) -> Iterator[tuple[int, bytes, bool]]:
+    """Split a plaintext stream into numbered segments.
+
+    One segment of look-ahead is kept so the last segment can be flagged as
+    final. An empty stream still yields a single, empty final segment.
+
+    Args:
+        src: Binary stream to read plaintext from.
+        segment_size: Maximum number of plaintext bytes per segment.
+        first: Index of the first segment read from ``src``.
+
+    Yields:
+        tuple[int, bytes, bool]: Segment index, segment data and final flag.
+    """
+    index = first
+    current = src.read(segment_size)
+    while True:
+        upcoming = src.read(segment_size) if current else b""
+        final = not upcoming
+        yield index, current, final
+        if final:
+            return
+        index += 1
+        current = upcoming
+
+
+class FernetSegments:
+    """Seal and open container segments as Fernet tokens."""
+
+    def __init__(self, key: bytes) -> None:
+        """Create the Fernet cipher for the payload.
+
+        Args:
+            key: The base64-encoded Fernet key.
+
+        Returns:
+            None
+        """
+        self._fernet = Fernet(key)
+
+    def seal(self, index: int, data: bytes, final: bool) -> bytes:
+        """Encrypt a segment together with its index and final flag.
+
+        Args:
+            index: Position of the segment in the stream.
+            data: Plaintext segment data.
+            final: Whether this is the last segment.
+
+        Returns:
+            bytes: The segment token.
+        """
+        return self._fernet.encrypt(_SEGMENT_PREFIX.pack(index, final) + data)
+
+    def open(self, index: int, token: bytes) -> tuple[bytes, bool]:
+        """Authenticate and decrypt a segment token expected at ``index``.
+
+        Args:
+            index: Position the segment is expected to occupy.
+            token: The segment token.
+
+        Returns:
+            tuple[bytes, bool]: The plaintext data and the final flag.
+
+        Raises:
+            FatalError: If authentication fails or the segment is out of place.
+        """
+        try:
+            plaintext = self._fernet.decrypt(token)
+        except InvalidToken as exc:
+            raise FatalError("Either the key or the input data is wrong.") from exc
+        if len(plaintext) < _SEGMENT_PREFIX.size:
+            raise FatalError("Encrypted file is corrupted")
+        stored_index, final = _SEGMENT_PREFIX.unpack_from(plaintext)
+        if stored_index != index:
+            raise FatalError("Encrypted file segments are out of order")
+        return plaintext[_SEGMENT_PREFIX.size :], bool(final)
+
+
+def new_cipher_params(engine: str = FERNET) -> dict:
+    """Create the header fields selecting the segment engine for a new file.
+
+    Args:
+        engine: ``fernet``, ``auto`` or one of the AEAD engines.
+
+    Returns:
+        dict: Header fields naming the engine and any per-file parameters.
+
+    Raises:
+        ValueError: If the engine is unknown.
+    """
+    if engine == FERNET:
+        return {"cipher": FERNET}
+    return aead.new_cipher_params(engine)
+
+
+def segment_cipher(header: dict, key: bytes) -> SegmentCipher:
+    """Create the segment cipher described by a container header.
+
+    Headers without a ``cipher`` field use Fernet. A ``chunking`` field
+    selects position-independent chunk sealing, and a ``compression`` field
+    adds a compression stage in front of the engine.
+
+    Args:
+        header: The container header.
+        key: The base64-encoded payload key.
+
+    Returns:
+        SegmentCipher: An object with ``seal`` and ``open`` methods.
+
+    Raises:
+        FatalError: If the header names an unsupported cipher.
+    """
+    engine = header.get("cipher", FERNET)
+    cipher: SegmentCipher
+    if "chunking" in header:
+        primitive = None
+        if engine != FERNET:
+            primitive = aead.payload_cipher(engine, key, header.get("nonce", ""))
+        cipher = chunking.ChunkSegments(key, primitive)
+    elif engine == FERNET:
+        cipher = FernetSegments(key)
+    else:
+        cipher = aead.AEADSegments(engine, key, header.get("nonce", ""))
+    if "compression" in header:
+        cipher = compression.CompressedSegments(
+            cipher, header["compression"], _segment_size(header)
+        )
+    return cipher
+
+
+def frame_segment(token: bytes) -> bytes:
+    """Prefix a segment token with its length.
+
+    Args:
+        token: The segment token.
+
+    Returns:
+        bytes: The framed token as stored in the container.
+    """
+    return _TOKEN_LENGTH.pack(len(token)) + token
+
+
+def iter_sealed_segments(src: BinaryIO) -> Iterator[bytes]:
+    """Read length-prefixed segment tokens until the stream ends.
+
+    Args:
+        src: Binary stream positioned at the first segment.
+
+    Stops at the trailer marker, leaving ``src`` positioned at the trailer.
+
+    Yields:
+        bytes: Each segment token in order.
+
+    Raises:
+        FatalError: If a token is truncated or implausibly large.
+    """
+    while True:
+        prefix = src.read(_TOKEN_LENGTH.size)
+        if not prefix:
+            return
+        if len(prefix) != _TOKEN_LENGTH.size:
+            raise FatalError("Encrypted file is truncated")
+        (length,) = _TOKEN_LENGTH.unpack(prefix)
+        if length == _TRAILER_MARKER:
+            return
+        if length > _MAX_TOKEN_SIZE:
+            raise FatalError("Encrypted file is corrupted")
+        token = src.read(length)
+        if len(token) != length:
+            raise FatalError("Encrypted file is truncated")
+        yield token
+
+
+def encrypt_segments(
+    cipher: SegmentCipher,
+    src: BinaryIO,
+    dst: BinaryIO,
+    segment_size: int = DEFAULT_SEGMENT_SIZE,
+    segment_index: SegmentIndex | None = None,
+    checkpoint: Callable[[SegmentIndex], None] | None = None,
+) -> SegmentIndex:
+    """Stream plaintext from ``src`` into sealed segments written to ``dst``.
+
+    Args:
+        cipher: Segment cipher for the payload.
+        src: Binary stream to read plaintext from.
+        dst: Binary stream to write segments to.
+        segment_size: Maximum number of plaintext bytes per segment.
+        segment_index: Index of segments already written, to continue after
+            them, or None to start at the first segment.
+        checkpoint: Called with the index after each segment is written.
+
+    Returns:
+        SegmentIndex: The offsets of the written segments.
+    """
+    segment_index = segment_index or SegmentIndex()
+    first = len(segment_index.offsets)
+    for index, data, final in iter_plaintext_segments(src, segment_size, first):
+        framed = frame_segment(cipher.seal(index, data, final))
+        dst.write(framed)
+        segment_index.add(len(framed), len(data))
+        if checkpoint is not None:
+            checkpoint(segment_index)
+    return segment_index
+
+
+def decrypt_segments(cipher: SegmentCipher, src: BinaryIO, dst: BinaryIO) -> None:
+    """Stream sealed segments from ``src`` and write their plaintext to ``dst``.
+
+    Args:
+        cipher: Segment cipher for the payload.
+        src: Binary stream positioned at the first segment.
+        dst: Binary stream to write plaintext to.
+
+    Returns:
+        None
+
+    Raises:
+        FatalError: If any segment fails authentication, or the stream is
+            truncated or has trailing data after the final segment.
+    """
+    final = False
+    for index, token in enumerate(iter_sealed_segments(src)):
+        if final:
+            raise FatalError("Encrypted file has unexpected trailing data")
+        data, final = cipher.open(index, token)
+        dst.write(data)
+    if not final:
+        raise FatalError("Encrypted file is truncated")
+
+
+def encrypt_segments_parallel(
+    header: dict,
+    key: bytes,
+    src: BinaryIO,
+    dst: BinaryIO,
+    segment_size: int = DEFAULT_SEGMENT_SIZE,
+    jobs: int = 2,
+    segment_index: SegmentIndex | None = None,
+    checkpoint: Callable[[SegmentIndex], None] | None = None,
+) -> SegmentIndex:
+    """Encrypt segments across a pool of worker processes.
+
+    The calling process reads plaintext and writes sealed segments in order
+    while the workers encrypt, so disk I/O overlaps with the crypto work. At
+    most ``2 * jobs`` batches are in flight, which bounds memory use.
+
+    Args:
+        header: The container header, which selects the segment cipher.
+        key: The base64-encoded payload key.
+        src: Binary stream to read plaintext from.
+        dst: Binary stream to write segments to.
+        segment_size: Maximum number of plaintext bytes per segment.
+        jobs: Number of worker processes.
+        segment_index: Index of segments already written, to continue after
+            them, or None to start at the first segment.
+        checkpoint: Called with the index after each batch is written.
+
+    Returns:
+        SegmentIndex: The offsets of the written segments.
+    """
+    segment_index = segment_index or SegmentIndex()
+    first = len(segment_index.offsets)
+    batches = _batched(
+        iter_plaintext_segments(src, segment_size, first), _batch_length(segment_size)
+    )
+    with _worker_pool(header, key, jobs) as executor:
+        for sealed, lengths in _map_ordered(executor, _seal_batch, batches, jobs):
+            dst.write(sealed)
+            for framed_length, data_length in lengths:
+                segment_index.add(framed_length, data_length)
+            if checkpoint is not None:
+                checkpoint(segment_index)
+    return segment_index
+
+
+def verify_segments(
+    cipher: SegmentCipher,
+    src: BinaryIO,
+    plaintext: BinaryIO,
+    count: int,
+    segment_size: int = DEFAULT_SEGMENT_SIZE,
+) -> tuple[SegmentIndex, bool]:
+    """Check that the first ``count`` segments hold the expected plaintext.
+
+    Each segment is authenticated and its plaintext compared with the next
+    bytes of ``plaintext``, which rebuilds the index of a partially written
+    container without encrypting anything again.
+
+    Args:
+        cipher: Segment cipher for the payload.
+        src: Binary stream positioned at the first segment.
+        plaintext: Binary stream positioned at the start of the plaintext.
+        count: Number of segments to check.
+        segment_size: Number of plaintext bytes in every non-final segment.
+
+    Returns:
+        tuple[SegmentIndex, bool]: The index of the checked segments and
+            whether the last of them is the final segment.
+
+    Raises:
+        FatalError: If a segment is missing, fails authentication or does
+            not match the plaintext.
+    """
+    segment_index = SegmentIndex()
+    final = False
+    for index, token in enumerate(islice(iter_sealed_segments(src), count)):
+        if final:
+            raise FatalError("Encrypted file has unexpected trailing data")
+        data, final = cipher.open(index, token)
+        if not final and len(data) != segment_size:
+            raise FatalError("Encrypted file is corrupted")
+        if plaintext.read(len(data)) != data or (final and plaintext.read(1)):
+            raise FatalError("Encrypted file does not match its input")
+        segment_index.add(_TOKEN_LENGTH.size + len(token), len(data))
+    if len(segment_index.offsets) != count:
+        raise FatalError("Encrypted file is truncated")
+    return segment_index, final
+
+
+def encrypt_chunks(
+    cipher: SegmentCipher,
+    header: dict,
+    key: bytes,
+    src: BinaryIO,
+    dst: BinaryIO,
+    previous: chunking.ManifestEntries | None = None,
+    previous_src: BinaryIO | None = None,
+    previous_start: int = 0,
+) -> tuple[SegmentIndex, chunking.ManifestEntries, str]:
+    """Split plaintext into content-defined chunks and seal the new ones.
+
+    Chunks listed in the manifest of the previous container are copied from
+    it as they are, so only chunks that changed are encrypted.
+
+    Args:
+        cipher: Chunk cipher for the payload.
+        header: The container header, which holds the chunking parameters.
+        key: The base64-encoded payload key.
+        src: Binary stream to read plaintext from.
+        dst: Binary stream positioned at the first segment.
+        previous: Manifest entries of the previous container, if any.
+        previous_src: The previous container, read for reused chunks.
+        previous_start: Position of the first segment in ``previous_src``.
+            Manifest offsets count from it, like the segment index, so they
+            survive the header growing when key slots are added.
+
+    Returns:
+        tuple[SegmentIndex, chunking.ManifestEntries, str]: The index of the
+            written chunks, their manifest entries with offsets from the
+            first segment, and the digest of the chunk ids to store in the
+            trailer.
+    """
+    previous = previous or []
+    locations = {
+        chunk: (previous_start + offset, length)
+        for chunk, _, offset, length in previous
+    }
+    id_key = chunking.chunk_id_key(key)
+    segment_index = SegmentIndex()
+    entries = []
+    digest = sha256()
+    for chunk, data in chunking.iter_chunks(
+        src,
+        header["chunking"],
+        id_key,
+        [(chunk, size) for chunk, size, _, _ in previous],
+    ):
+        digest.update(chunk)
+        framed = _reused_chunk(locations, previous_src, chunk)
+        if framed is None:
+            framed = frame_segment(cipher.seal(0, data, False))
+        entries.append((chunk, len(data), segment_index.length, len(framed)))
+        dst.write(framed)
+        segment_index.add(len(framed), len(data))
+    return segment_index, entries, digest.hexdigest()
+
+
+def decrypt_chunks(
+    cipher: SegmentCipher, key: bytes, src: BinaryIO, dst: BinaryIO
+) -> str:
+    """Stream sealed chunks from ``src`` and write their plaintext to ``dst``.
+
+    Args:
+        cipher: Chunk cipher for the payload.
+        key: The base64-encoded payload key.
+        src: Binary stream positioned at the first segment.
+        dst: Binary stream to write plaintext to.
+
+    Returns:
+        str: The digest of the chunk ids, to compare with the trailer.
+
+    Raises:
+        FatalError: If any chunk fails authentication or is truncated.
+    """
+    id_key = chunking.chunk_id_key(key)
+    digest = sha256()
+    for token in iter_sealed_segments(src):
+        data, _ = cipher.open(0, token)
+        digest.update(chunking.chunk_id(id_key, data))
+        dst.write(data)
+    return digest.hexdigest()
+
+
+def _reused_chunk(
+    locations: dict[bytes, tuple[int, int]],
+    previous_src: BinaryIO | None,
+    chunk: bytes,
+) -> bytes | None:
+    """Read a framed chunk from the previous container, if it holds it."""
+    if previous_src is None or chunk not in locations:
+        return None
+    offset, length = locations[chunk]
+    previous_src.seek(offset)
+    framed = previous_src.read(length)
+    if len(framed) != length or framed[: _TOKEN_LENGTH.size] != _TOKEN_LENGTH.pack(
+        length - _TOKEN_LENGTH.size
+    ):
+        return None
+    return framed
+
+
+def decrypt_segments_parallel(
+    header: dict, key: bytes, src: BinaryIO, dst: BinaryIO, jobs: int = 2
+) -> None:
+    """Decrypt segments across a pool of worker processes.
+
+    Args:
+        header: The container header, which selects the segment cipher.
+        key: The base64-encoded payload key.
+        src: Binary stream positioned at the first segment.
+        dst: Binary stream to write plaintext to.
+        jobs: Number of worker processes.
+
+    Returns:
+        None
+
+    Raises:
+        FatalError: If any segment fails authentication, or the stream is
+            truncated or has trailing data after the final segment.
+    """
+    batches = _batched(enumerate(iter_sealed_segments(src)), 16)
+    final = False
+    with _worker_pool(header, key, jobs) as executor:
+        for data, batch_final in _map_ordered(executor, _open_batch, batches, jobs):
+            if final:
+                raise FatalError("Encrypted file has unexpected trailing data")
+            dst.write(data)
+            final = batch_final
+    if not final:
+        raise FatalError("Encrypted file is truncated")
+
+
+def decrypt_range(
+    cipher: SegmentCipher,
+    header: dict,
+    src: BinaryIO,
+    start: int,
+    end: int | None = None,
+) -> bytes:
+    """Decrypt only the segments covering plaintext bytes ``start`` to ``end``.
+
+    Every segment but the last holds exactly ``segment_size`` bytes, so the
+    segments covering a range follow from its offsets. Their positions come
+    from the trailer index, or from walking the token lengths for containers
+    written without one. Each token authenticates its own index and final
+    flag, so a tampered index makes decryption fail rather than return the
+    wrong bytes.
+
+    Args:
+        cipher: Segment cipher for the payload.
+        header: The container header.
+        src: Seekable binary stream positioned at the first segment.
+        start: First plaintext byte to return.
+        end: Plaintext byte to stop before, or None for the end of the file.
+
+    Returns:
+        bytes: The requested plaintext, shorter if the file ends first.
+
+    Raises:
+        FatalError: If the container is corrupted or fails authentication.
+    """
+    segment_size = _segment_size(header)
+    if end is not None and end <= start:
+        return b""
+
+    first = start // segment_size
+    last = sys.maxsize if end is None else (end - 1) // segment_size
+    payload_start = src.tell()
+    if header.get("trailer"):
+        first, offsets = _indexed_offsets(src, payload_start, first, last)
+    else:
+        first, offsets = _scanned_offsets(src, payload_start, first, last)
+
+    src.seek(offsets[0])
+    chunks = []
+    final = False
+    for index, token in enumerate(islice(iter_sealed_segments(src), len(offsets))):
+        data, final = cipher.open(first + index, token)
+        if not final and len(data) != segment_size:
+            raise FatalError("Encrypted file is corrupted")
+        chunks.append(data)
+        if final:
+            break
+    if not final and first + len(chunks) <= last:
+        raise FatalError("Encrypted file is truncated")
+
+    base = first * segment_size
+    data = b"".join(chunks)
+    return data[max(start - base, 0) : None if end is None else end - base]
+
+
+def _serialize_header(header: dict) -> bytes:
+    """Serialize header fields in the canonical form the tag is computed on."""
+    return json.dumps(header, sort_keys=True, separators=(",", ":")).encode()
+
+
+def _pad_header(raw: bytes) -> bytes:
+    """Pad a serialized header with spaces to leave room for more key slots."""
+    reserved = len(raw) + _HEADER_RESERVE
+    return raw.ljust(reserved + -reserved % _HEADER_RESERVE)
+
+
+def _authenticated_header(raw: bytes) -> bytes:
+    """Return the part of a raw header covered by the header tag."""
+    header = json.loads(raw)
+    if "keys" not in header:
+        return raw
+    del header["keys"]
+    return _serialize_header(header)
+
+
+def _segment_size(header: dict) -> int:
+    """Read and check the segment size recorded in a container header."""
+    try:
+        segment_size = int(header.get("segment_size", DEFAULT_SEGMENT_SIZE))
+    except (TypeError, ValueError) as exc:
+        raise FatalError("Encrypted file header is corrupted") from exc
+    if segment_size < 1:
+        raise FatalError("Encrypted file header is corrupted")
+    return segment_size
+
+
+def _indexed_offsets(
+    src: BinaryIO, payload_start: int, first: int, last: int
+) -> tuple[int, list[int]]:
+    """Look up segment offsets in the trailer index.
+
+    Segments past the end are clamped to the last one, which is still
+    opened so its final flag confirms where the file ends.
+
+    Returns:
+        tuple[int, list[int]]: The index of the first segment found and the
+            absolute offsets of segments ``first`` to ``last``.
+    """
+    footer_start = src.seek(0, os.SEEK_END) - _FOOTER.size - TAG_SIZE
+    if footer_start < payload_start:
+        raise FatalError("Encrypted file is truncated")
+    src.seek(footer_start)
+    count, meta_length = _FOOTER.unpack(src.read(_FOOTER.size))
+    index_start = footer_start - meta_length - count * _OFFSET.size
+    if count == 0 or index_start < payload_start:
+        raise FatalError("Encrypted file is corrupted")
+
+    first, last = min(first, count - 1), min(last, count - 1)
+    src.seek(index_start + first * _OFFSET.size)
+    raw = src.read((last - first + 1) * _OFFSET.size)
+    return first, [payload_start + offset for (offset,) in _OFFSET.iter_unpack(raw)]
+
+
+def _scanned_offsets(
+    src: BinaryIO, payload_start: int, first: int, last: int
+) -> tuple[int, list[int]]:
+    """Find segment offsets by walking token lengths, for unindexed files.
+
+    Returns:
+        tuple[int, list[int]]: The index of the first segment found and the
+            absolute offsets of segments ``first`` to ``last``.
+    """
+    offsets: list[int] = []
+    position = previous = payload_start
+    index = 0
+    while index <= last:
+        src.seek(position)
+        prefix = src.read(_TOKEN_LENGTH.size)
+        if len(prefix) != _TOKEN_LENGTH.size:
+            break
+        (length,) = _TOKEN_LENGTH.unpack(prefix)
+        if length == _TRAILER_MARKER:
+            break
+        if index >= first:
+            offsets.append(position)
+        previous = position
+        position += _TOKEN_LENGTH.size + length
+        index += 1
+
+    if offsets:
+        return first, offsets
+    if index == 0:
+        raise FatalError("Encrypted file is truncated")
+    return index - 1, [previous]
+
+
+def _worker_pool(header: dict, key: bytes, jobs: int) -> ProcessPoolExecutor:
+    """Start worker processes that each hold the segment cipher."""
+    return ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(header, key))
+
+
+def _init_worker(header: dict, key: bytes) -> None:
+    """Create the per-process segment cipher for parallel workers."""
+    global _worker_cipher
+    _worker_cipher = segment_cipher(header, key)
+
+
+def _seal_batch(
+    batch: list[tuple[int, bytes, bool]],
+) -> tuple[bytes, list[tuple[int, int]]]:
+    """Seal a batch of plaintext segments inside a worker.
+
+    Returns:
+        tuple[bytes, list[tuple[int, int]]]: The joined framed tokens and the
+            framed and plaintext length of each segment.
+    """
+    assert _worker_cipher is not None
+    framed = [
+        frame_segment(_worker_cipher.seal(index, data, final))
+        for index, data, final in batch
+    ]
+    lengths = [(len(token), len(data)) for token, (_, data, _) in zip(framed, batch)]
+    return b"".join(framed), lengths
+
+
+def _open_batch(batch: list[tuple[int, bytes]]) -> tuple[bytes, bool]:
+    """Open a batch of segment tokens inside a worker.
+
+    Returns:
+        tuple[bytes, bool]: The joined plaintext and whether the batch ends
+            with the final segment.
+    """
+    assert _worker_cipher is not None
+    chunks = []
+    final = False
+    for index, token in batch:
+        if final:
+            raise FatalError("Encrypted file has unexpected trailing data")
+        data, final = _worker_cipher.open(index, token)
+        chunks.append(data)
+    return b"".join(chunks), final
+
+
+def _batch_length(segment_size: int) -> int:
+    """Number of segments per worker task for a given segment size."""
+    return max(1, _PARALLEL_BATCH_BYTES // segment_size)
+
+
+def _batched(items: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    """Group an iterable into lists of at most ``size`` items."""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _map_ordered(
+    executor: Executor, fn: Callable[[Any], Any], items: Iterable[Any], jobs: int
+) -> Iterator[Any]:
+    """Like ``executor.map`` but with a bounded number of pending tasks."""
+    pending: deque = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= 2 * jobs:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
@@ -0,0 +1,125 @@
+"""Plaintext digests computed while a container is encrypted or decrypted.
+
+A container whose header has a ``digest`` field names a ``HashingService``
+algorithm; its trailer metadata holds that algorithm's digest of the
+plaintext. The digest is computed from the plaintext as it streams through
+the cipher, so it costs no extra read of the data. It is only known once the
+input ends, which is why the value lives in the trailer rather than in the
+header that precedes the payload.
+"""
+
+from typing import Any, BinaryIO
+
+
+def new_digest(algorithm: str) -> Any:
+    """Create a hash object for a ``HashingService`` algorithm.
+
+    Args:
+        algorithm: Name of the algorithm, such as ``SHA256`` or ``BLAKE3``.
+
+    Returns:
+        Any: A fresh hash object with ``update`` and ``hexdigest``.
+
+    Raises:
+        ValueError: If the algorithm is not supported.
+    """
+    # Imported here: the services package imports this one
+    from encryptocli.services.hashing_service import HashingService
+
+    if algorithm not in HashingService.ALGORITHMS:
+        raise ValueError(f"Unsupported algorithm: {algorithm}")
+    return HashingService.ALGORITHMS[algorithm]()
+
+
+class DigestingReader:
+    """Binary stream that hashes everything read through it."""
+
+    def __init__(self, src: BinaryIO, algorithm: str) -> None:
+        """Wrap a plaintext source stream.
+
+        Args:
+            src: Binary stream to read plaintext from.
+            algorithm: Name of the ``HashingService`` algorithm.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the algorithm is not supported.
+        """
+        self.algorithm = algorithm
+        self._src = src
+        self._hash = new_digest(algorithm)
+
+    def read(self, size: int | None = -1) -> bytes:
+        """Read from the source and add the data to the digest.
+
+        Args:
+            size: Number of bytes to read, or everything left if negative.
+
+        Returns:
+            bytes: The data read; empty at the end of the stream.
+        """
+        data = self._src.read(size)
+        self._hash.update(data)
+        return data
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        """Rewind to the start of the source and restart the digest.
+
+        Args:
+            offset: Must be 0; only rewinding is supported.
+            whence: Must be 0 (from the start of the stream).
+
+        Returns:
+            int: The new position, always 0.
+
+        Raises:
+            ValueError: If asked to seek anywhere but the start.
+        """
+        if offset != 0 or whence != 0:
+            raise ValueError("A digesting stream can only be rewound to its start")
+        self._hash = new_digest(self.algorithm)
+        return self._src.seek(0)
+
+    def hexdigest(self) -> str:
+        """Return the digest of the data read so far."""
+        return str(self._hash.hexdigest())
+
+
+class DigestingWriter:
+    """Binary stream that hashes everything written through it."""
+
+    def __init__(self, dst: BinaryIO, algorithm: str) -> None:
+        """Wrap a plaintext destination stream.
+
+        Args:
+            dst: Binary stream to write plaintext to.
+            algorithm: Name of the ``HashingService`` algorithm.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the algorithm is not supported.
+        """
+        self.algorithm = algorithm
+        self._dst = dst
+        self._hash = new_digest(algorithm)
+
+    def write(self, data: bytes) -> int:
+        """Add data to the digest and write it to the destination.
+
+        Args:
+            data: The plaintext to write.
+
+        Returns:
+            int: Number of bytes written.
+        """
+        self._hash.update(data)
+        self._dst.write(data)
+        return len(data)
+
+    def hexdigest(self) -> str:
+        """Return the digest of the data written so far."""
+        return str(self._hash.hexdigest())
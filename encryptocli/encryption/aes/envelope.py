@@ -0,0 +1,84 @@
+"""Per-file data keys wrapped by password-derived keys.
+
+A container written with a ``keys`` header field encrypts its payload under a
+random data key rather than a key derived from the password. The header holds
+the data key wrapped (RFC 3394 AES key wrap) by a key-encryption key derived
+from the password, along with the KDF parameters for that derivation. Changing
+the password only rewraps the data key, so the payload is never touched.
+
+The key slots are not covered by the header tag: a wrapped key authenticates
+itself when unwrapped, and the header tag is then checked under the unwrapped
+data key.
+"""
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives.keywrap import (
+    InvalidUnwrap,
+    aes_key_unwrap,
+    aes_key_wrap,
+)
+
+from encryptocli.util.exceptions import FatalError
+
+WRAP_ALGORITHM = "aes-kw"
+
+
+def new_data_key() -> bytes:
+    """Generate a random data key for a new container.
+
+    Returns:
+        bytes: A base64-encoded Fernet key.
+    """
+    return Fernet.generate_key()
+
+
+def wrap_key(data_key: bytes, kek: bytes, kdf: dict) -> dict:
+    """Wrap a data key into a key slot.
+
+    Args:
+        data_key: The base64-encoded data key.
+        kek: The base64-encoded key-encryption key derived with ``kdf``.
+        kdf: KDF parameters the key-encryption key was derived with.
+
+    Returns:
+        dict: JSON-serializable key slot to store in the header.
+    """
+    wrapped = aes_key_wrap(urlsafe_b64decode(kek), urlsafe_b64decode(data_key))
+    return {
+        "kdf": kdf,
+        "wrap": WRAP_ALGORITHM,
+        "key": urlsafe_b64encode(wrapped).decode(),
+    }
+
+
+def unwrap_key(slot: dict, kek: bytes) -> bytes | None:
+    """Recover the data key from a key slot.
+
+    Args:
+        slot: A key slot as produced by ``wrap_key``.
+        kek: The base64-encoded key-encryption key derived from the slot's
+            KDF parameters.
+
+    Returns:
+        bytes | None: The base64-encoded data key, or None if ``kek`` does
+            not open the slot.
+
+    Raises:
+        FatalError: If the slot is malformed or uses an unknown wrapping.
+    """
+    try:
+        algorithm = slot["wrap"]
+        wrapped = urlsafe_b64decode(slot["key"])
+    except (KeyError, TypeError, ValueError) as exc:
+        raise FatalError("Encrypted file has an invalid key slot") from exc
+    if algorithm != WRAP_ALGORITHM:
+        raise FatalError(f"Unsupported key wrapping: {algorithm}")
+
+    try:
+        return urlsafe_b64encode(aes_key_unwrap(urlsafe_b64decode(kek), wrapped))
+    except InvalidUnwrap:
+        return None
+    except ValueError as exc:
+        raise FatalError("Encrypted file has an invalid key slot") from exc
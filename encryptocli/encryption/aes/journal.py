@@ -0,0 +1,124 @@
+"""Checkpoint journal for resumable file encryption.
+
+While a file is encrypted in resumable mode, a small JSON journal next to the
+output records how many segments have been committed and where they end. A
+checkpoint is only written after the output has been flushed to disk, so the
+journal never claims more than the output durably holds. Rerunning the
+encryption reads the journal back, verifies the committed segments and
+continues after them.
+"""
+
+import json
+import os
+from typing import BinaryIO
+
+from encryptocli.encryption.aes.container import SegmentIndex
+
+SUFFIX = ".journal"
+JOURNAL_VERSION = 1
+# Output bytes written between checkpoints
+CHECKPOINT_BYTES = 64 * 1024 * 1024
+
+
+class Journal:
+    """Record and recall the progress of one resumable encryption."""
+
+    def __init__(
+        self, path: str, source: BinaryIO, interval: int | None = None
+    ) -> None:
+        """Set up the journal for encrypting ``source``.
+
+        Args:
+            path: Where the journal is stored.
+            source: The plaintext file being encrypted. Its size and
+                modification time identify it, so a journal left by a
+                different version of the file is ignored.
+            interval: Output bytes written between checkpoints, or None for
+                ``CHECKPOINT_BYTES``.
+
+        Returns:
+            None
+        """
+        self.path = path
+        self.interval = CHECKPOINT_BYTES if interval is None else interval
+        stat = os.fstat(source.fileno())
+        self._source = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        self._committed = 0
+
+    def load(self) -> tuple[int, int] | None:
+        """Read the last checkpoint for the current source file.
+
+        Returns:
+            tuple[int, int] | None: The number of committed segments and the
+                output offset they end at, or None if there is no usable
+                journal.
+        """
+        try:
+            with open(self.path, "rb") as journal_file:
+                state = json.load(journal_file)
+            if state.get("version") != JOURNAL_VERSION:
+                return None
+            if state.get("source") != self._source:
+                return None
+            segments, offset = int(state["segments"]), int(state["offset"])
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+        if segments < 0 or offset < 0:
+            return None
+        self._committed = offset
+        return segments, offset
+
+    def checkpoint(
+        self, dst: BinaryIO, index: SegmentIndex, force: bool = False
+    ) -> None:
+        """Commit the segments written so far once enough output has built up.
+
+        Args:
+            dst: The output file, positioned after the last written segment.
+            index: The index of the written segments.
+            force: Commit even if less than ``interval`` bytes were written.
+
+        Returns:
+            None
+        """
+        offset = dst.tell()
+        if not force and offset - self._committed < self.interval:
+            return
+        dst.flush()
+        os.fsync(dst.fileno())
+        self.save(len(index.offsets), offset)
+
+    def save(self, segments: int, offset: int) -> None:
+        """Atomically replace the journal with a new checkpoint.
+
+        Args:
+            segments: Number of committed segments.
+            offset: Output offset the committed segments end at.
+
+        Returns:
+            None
+        """
+        state = {
+            "version": JOURNAL_VERSION,
+            "source": self._source,
+            "segments": segments,
+            "offset": offset,
+        }
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as journal_file:
+            json.dump(state, journal_file)
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        os.replace(temp_path, self.path)
+        self._committed = offset
+
+    def remove(self) -> None:
+        """Delete the journal once the encryption has completed.
+
+        Returns:
+            None
+        """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,156 @@
+"""Overlap key derivation with reading the start of the input.
+
+scrypt releases the GIL, so a key can be derived on a background thread
+while the calling thread reads the first input buffers. On slow storage,
+such as network filesystems, this hides the shorter of the two latencies
+instead of paying for both in turn.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, TypeVar
+
+T = TypeVar("T")
+
+# Most input bytes read ahead while a key is derived
+PREFETCH_BYTES = 4 * 1024 * 1024
+_READ_SIZE = 256 * 1024
+
+
+class Timings:
+    """How the start of a file operation spent its time.
+
+    Attributes:
+        kdf: Seconds spent deriving the key, on the background thread.
+        prefetch: Seconds spent reading input while the key was derived.
+        elapsed: Seconds until both the key and the prefetched input were
+            ready.
+        prefetched: Number of input bytes read ahead.
+    """
+
+    def __init__(
+        self, kdf: float, prefetch: float, elapsed: float, prefetched: int
+    ) -> None:
+        """Record the timings of one overlapped start.
+
+        Args:
+            kdf: Seconds spent deriving the key.
+            prefetch: Seconds spent reading input meanwhile.
+            elapsed: Seconds until both were done.
+            prefetched: Number of input bytes read ahead.
+
+        Returns:
+            None
+        """
+        self.kdf = kdf
+        self.prefetch = prefetch
+        self.elapsed = elapsed
+        self.prefetched = prefetched
+
+    @property
+    def hidden(self) -> float:
+        """Seconds saved compared with deriving the key and reading in turn."""
+        return max(0.0, self.kdf + self.prefetch - self.elapsed)
+
+    def __str__(self) -> str:
+        """Summarize the timings in milliseconds."""
+        return (
+            f"KDF {self.kdf * 1000:.1f} ms, "
+            f"read-ahead {self.prefetch * 1000:.1f} ms ({self.prefetched} bytes), "
+            f"overlapped {self.elapsed * 1000:.1f} ms, "
+            f"hidden {self.hidden * 1000:.1f} ms"
+        )
+
+
+class PrefetchedStream:
+    """Binary stream serving read-ahead bytes before reading on from its source."""
+
+    def __init__(self, src: BinaryIO, buffered: bytes) -> None:
+        """Wrap a source stream whose first bytes were already read.
+
+        Args:
+            src: The source stream, positioned after ``buffered``.
+            buffered: The bytes read ahead from ``src``.
+
+        Returns:
+            None
+        """
+        self._src = src
+        self._buffer = buffered
+        self._offset = 0
+
+    def read(self, size: int | None = -1) -> bytes:
+        """Read up to ``size`` bytes, or everything left if ``size`` is negative.
+
+        Like a buffered file, fewer bytes than asked for are only returned at
+        the end of the stream.
+
+        Args:
+            size: Number of bytes to read.
+
+        Returns:
+            bytes: The data read; empty at the end of the stream.
+        """
+        if self._offset == len(self._buffer):
+            return self._src.read(size)
+        if size is None or size < 0:
+            data = self._buffer[self._offset :] + self._src.read()
+            self._release()
+            return data
+
+        data = self._buffer[self._offset : self._offset + size]
+        self._offset += len(data)
+        if self._offset == len(self._buffer):
+            self._release()
+        if len(data) < size:
+            data += self._src.read(size - len(data))
+        return data
+
+    def _release(self) -> None:
+        """Drop the read-ahead buffer once it has been served."""
+        self._buffer = b""
+        self._offset = 0
+
+
+def derive_while_prefetching(
+    derive: Callable[[], T], src: BinaryIO, limit: int | None = None
+) -> tuple[T, PrefetchedStream, Timings]:
+    """Run a key derivation in the background while reading ahead from ``src``.
+
+    Reading stops when the derivation finishes, ``limit`` bytes have been
+    read or the input ends, whichever comes first.
+
+    Args:
+        derive: Callable deriving the key; any exception it raises is
+            re-raised here.
+        src: Binary stream to read ahead from.
+        limit: Most bytes to read ahead, or None for ``PREFETCH_BYTES``.
+
+    Returns:
+        tuple[T, PrefetchedStream, Timings]: The result of ``derive``, a
+            stream reading ``src`` from where it was, and the timings.
+    """
+
+    def timed() -> tuple[T, float]:
+        began = time.perf_counter()
+        result = derive()
+        return result, time.perf_counter() - began
+
+    if limit is None:
+        limit = PREFETCH_BYTES
+    start = time.perf_counter()
+    blocks = []
+    prefetched = 0
+    with ThreadPoolExecutor(1) as executor:
+        future = executor.submit(timed)
+        while prefetched < limit and not future.done():
+            block = src.read(min(_READ_SIZE, limit - prefetched))
+            if not block:
+                break
+            blocks.append(block)
+            prefetched += len(block)
+        prefetch = time.perf_counter() - start
+        result, kdf = future.result()
+    elapsed = time.perf_counter() - start
+    timings = Timings(kdf, prefetch, elapsed, prefetched)
+    return result, PrefetchedStream(src, b"".join(blocks)), timings
@@ -1,6 +1,8 @@
 """PGP (Pretty Good Privacy) encryption/decryption utilities using a class-based API."""
 
-from typing import BinaryIO
+import copy
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator
 import os
 
 try:
@@ -11,23 +13,37 @@ except ImportError:
     )
 
 from encryptocli.util.exceptions import FatalError, MildError
-from encryptocli.util.file_handling import get_file
+from encryptocli.util.file_handling import open_input
+from encryptocli.util.output import (
+    DEFAULT_FSYNC_POLICY,
+    AtomicWriter,
+    parse_fsync_policy,
+)
 
 
 class PGPCipher:
     """Provide PGP-based encryption and decryption for text and files."""
 
-    def __init__(self, gpg_home: str | None = None) -> None:
+    def __init__(
+        self, gpg_home: str | None = None, fsync_policy: str = DEFAULT_FSYNC_POLICY
+    ) -> None:
         """Initialize PGP cipher with GPG instance.
 
         Args:
             gpg_home: Optional custom GPG home directory. If not provided,
                      uses ~/.gnupg (the system GPG keyring). Pass a custom path
                      to use an isolated keyring.
+            fsync_policy: How output files are synced to disk: ``none``,
+                     ``end`` or a size in MiB such as ``64MB``.
 
         Returns:
             None
+
+        Raises:
+            ValueError: If the fsync policy is not recognized.
         """
+        parse_fsync_policy(fsync_policy)
+        self.fsync_policy = fsync_policy
         # Use provided GPG home, or fall back to ~/.gnupg (system default)
         if gpg_home is None:
             gpg_home = os.path.expanduser("~/.gnupg")
@@ -102,41 +118,9 @@ class PGPCipher:
         if not secret:
             raise FatalError("Cannot encrypt empty text")
 
-        # Determine recipient identifier
-        recipient_id = None
-
-        # Priority 1: Import key from file
-        if recipient_key_file:
-            try:
-                with open(recipient_key_file, "r") as f:
-                    key_data = f.read()
-                import_result = self.gpg.import_keys(key_data)
-                if not import_result.fingerprints:
-                    raise FatalError(f"Failed to import key from {recipient_key_file}")
-                recipient_id = import_result.fingerprints[0]
-            except FileNotFoundError:
-                raise FatalError(f"Key file not found: {recipient_key_file}")
-            except Exception as exc:
-                raise FatalError(f"Error importing key from file: {str(exc)}") from exc
-
-        # Priority 2: Import key from string
-        elif recipient_key:
-            try:
-                import_result = self.gpg.import_keys(recipient_key)
-                if not import_result.fingerprints:
-                    raise FatalError("Failed to import provided public key")
-                recipient_id = import_result.fingerprints[0]
-            except Exception as exc:
-                raise FatalError(f"Error importing key: {str(exc)}") from exc
-
-        # Priority 3: Use email from keyring
-        elif recipient_email:
-            recipient_id = recipient_email
-
-        else:
-            raise FatalError(
-                "Must provide one of: recipient_email, recipient_key, or recipient_key_file"
-            )
+        recipient_id = self._recipient_id(
+            recipient_email, recipient_key, recipient_key_file
+        )
 
         try:
             encrypted_data = self.gpg.encrypt(
@@ -201,74 +185,108 @@ class PGPCipher:
             Exactly one of recipient_email, recipient_key, or recipient_key_file must be provided.
             Priority: recipient_key_file > recipient_key > recipient_email
         """
-        file: BinaryIO = get_file(file_path)
-
-        if file.name.endswith(".pgp") or file.name.endswith(".gpg"):
+        if file_path.endswith(".pgp") or file_path.endswith(".gpg"):
             raise MildError("File is already encrypted with PGP.")
 
-        # Determine recipient identifier
-        recipient_id = None
+        recipient_id = self._recipient_id(
+            recipient_email, recipient_key, recipient_key_file
+        )
 
-        # Priority 1: Import key from file
-        if recipient_key_file:
+        with open_input(file_path) as file:
             try:
-                with open(recipient_key_file, "r") as f:
-                    key_data = f.read()
-                import_result = self.gpg.import_keys(key_data)
-                if not import_result.fingerprints:
-                    raise FatalError(f"Failed to import key from {recipient_key_file}")
-                recipient_id = import_result.fingerprints[0]
-            except FileNotFoundError:
-                raise FatalError(f"Key file not found: {recipient_key_file}")
+                with AtomicWriter(f"{file.name}.pgp", self.fsync_policy) as out:
+                    with self._stream_output(out) as gpg:
+                        encrypted_data = gpg.encrypt_file(
+                            file, recipient_id, always_trust=True
+                        )
+                    if not encrypted_data.ok:
+                        raise FatalError(f"Encryption failed: {encrypted_data.status}")
+                return "File encrypted successfully"
             except Exception as exc:
-                raise FatalError(f"Error importing key from file: {str(exc)}") from exc
+                raise FatalError(f"Error encrypting file: {str(exc)}") from exc
 
-        # Priority 2: Import key from string
-        elif recipient_key:
+    def decrypt_file(
+        self, file_path: str, passphrase: str, output_dir: str = "./"
+    ) -> str:
+        """Decrypt a file previously encrypted with PGP.
+
+        Args:
+            file_path: Path to the encrypted file.
+            passphrase: Passphrase for the private key.
+            output_dir: Output directory for decrypted file.
+
+        Returns:
+            str: Success message.
+
+        Raises:
+            FatalError: If decryption fails.
+        """
+        if not passphrase:
+            raise FatalError("Passphrase is required for decryption")
+
+        output_file = (
+            os.path.basename(file_path).replace(".pgp", "").replace(".gpg", "")
+        )
+        output_path = os.path.join(output_dir, f"decrypted_{output_file}")
+
+        with open_input(file_path) as file:
             try:
-                import_result = self.gpg.import_keys(recipient_key)
-                if not import_result.fingerprints:
-                    raise FatalError("Failed to import provided public key")
-                recipient_id = import_result.fingerprints[0]
+                with AtomicWriter(output_path, self.fsync_policy) as out:
+                    with self._stream_output(out) as gpg:
+                        decrypted_data = gpg.decrypt_file(file, passphrase=passphrase)
+                    if not decrypted_data.ok:
+                        raise FatalError(f"Decryption failed: {decrypted_data.status}")
+                return f"File decrypted successfully to {output_path}"
             except Exception as exc:
-                raise FatalError(f"Error importing key: {str(exc)}") from exc
+                raise FatalError(f"Error decrypting file: {str(exc)}") from exc
 
-        # Priority 3: Use email from keyring
-        elif recipient_email:
-            recipient_id = recipient_email
+    def encrypt_stream(
+        self,
+        src: BinaryIO,
+        dst: BinaryIO,
+        recipient_email: str | None = None,
+        recipient_key: str | None = None,
+        recipient_key_file: str | None = None,
+    ) -> None:
+        """Encrypt a binary stream to another stream with a recipient's key.
 
-        else:
-            raise FatalError(
-                "Must provide one of: recipient_email, recipient_key, or recipient_key_file"
-            )
+        Data is piped through gpg in chunks, so neither stream needs to fit
+        in memory or be seekable.
 
-        try:
-            encrypted_data = self.gpg.encrypt_file(
-                file,
-                recipient_id,
-                always_trust=True,
-                output=f"{file.name}.pgp",
-            )
-            file.close()
+        Args:
+            src: Binary stream to read plaintext from.
+            dst: Binary stream to write the armored ciphertext to.
+            recipient_email: Email address of recipient (uses key from keyring).
+            recipient_key: Recipient's public key as a string (PEM format).
+            recipient_key_file: Path to file containing recipient's public key.
+
+        Returns:
+            None
 
+        Raises:
+            FatalError: If encryption fails or key import fails.
+        """
+        recipient_id = self._recipient_id(
+            recipient_email, recipient_key, recipient_key_file
+        )
+        try:
+            with self._stream_output(dst) as gpg:
+                encrypted_data = gpg.encrypt_file(src, recipient_id, always_trust=True)
             if not encrypted_data.ok:
                 raise FatalError(f"Encryption failed: {encrypted_data.status}")
-            return "File encrypted successfully"
         except Exception as exc:
-            raise FatalError(f"Error encrypting file: {str(exc)}") from exc
+            raise FatalError(f"Error encrypting stream: {str(exc)}") from exc
 
-    def decrypt_file(
-        self, file_path: str, passphrase: str, output_dir: str = "./"
-    ) -> str:
-        """Decrypt a file previously encrypted with PGP.
+    def decrypt_stream(self, src: BinaryIO, dst: BinaryIO, passphrase: str) -> None:
+        """Decrypt a binary stream to another stream.
 
         Args:
-            file_path: Path to the encrypted file.
+            src: Binary stream to read the ciphertext from.
+            dst: Binary stream to write plaintext to.
             passphrase: Passphrase for the private key.
-            output_dir: Output directory for decrypted file.
 
         Returns:
-            str: Success message.
+            None
 
         Raises:
             FatalError: If decryption fails.
@@ -276,21 +294,29 @@ class PGPCipher:
         if not passphrase:
             raise FatalError("Passphrase is required for decryption")
 
-        file: BinaryIO = get_file(file_path)
-
         try:
-            output_file = (
-                os.path.basename(file.name).replace(".pgp", "").replace(".gpg", "")
-            )
-            output_path = os.path.join(output_dir, f"decrypted_{output_file}")
+            with self._stream_output(dst) as gpg:
+                decrypted_data = gpg.decrypt_file(src, passphrase=passphrase)
+            if not decrypted_data.ok:
+                raise FatalError(f"Decryption failed: {decrypted_data.status}")
+        except Exception as exc:
+            raise FatalError(f"Error decrypting stream: {str(exc)}") from exc
 
-            with open(output_path, "wb") as out:
-                self.gpg.decrypt_file(file, passphrase=passphrase, output=out)
+    @contextmanager
+    def _stream_output(self, dst: BinaryIO) -> Iterator[gnupg.GPG]:
+        """Yield a gpg handle that sends its output chunks to ``dst``.
 
-            file.close()
-            return f"File decrypted successfully to {output_path}"
-        except Exception as exc:
-            raise FatalError(f"Error decrypting file: {str(exc)}") from exc
+        The handle is a copy of ``self.gpg``, so calls running on other
+        threads keep their output apart.
+        """
+
+        def on_data(chunk: bytes) -> bool:
+            dst.write(chunk)
+            return False
+
+        gpg = copy.copy(self.gpg)
+        gpg.on_data = on_data
+        yield gpg
 
     def export_public_key(self, email: str, output_path: str) -> str:
         """Export a public key to a file.
@@ -310,8 +336,8 @@ class PGPCipher:
             if not public_key:
                 raise FatalError(f"No public key found for {email}")
 
-            with open(output_path, "w") as f:
-                f.write(public_key)
+            with AtomicWriter(output_path, self.fsync_policy) as f:
+                f.write(public_key.encode())
             return f"Public key exported to {output_path}"
         except Exception as exc:
             raise FatalError(f"Error exporting public key: {str(exc)}") from exc
@@ -407,7 +433,7 @@ class PGPCipher:
             raise FatalError("Passphrase is required for signing")
 
         try:
-            with open(file_path, "rb") as f:
+            with open_input(file_path) as f:
                 signed_data = self.gpg.sign_file(
                     f, passphrase=passphrase, detach=detach
                 )
@@ -418,13 +444,13 @@ class PGPCipher:
             # Save signature to file
             if detach:
                 signature_path = f"{file_path}.sig"
-                with open(signature_path, "wb") as f:
-                    f.write(signed_data.data)
+                with AtomicWriter(signature_path, self.fsync_policy) as out:
+                    out.write(signed_data.data)
                 return f"Detached signature created: {signature_path}"
             else:
                 signed_path = f"{file_path}.asc"
-                with open(signed_path, "wb") as f:
-                    f.write(signed_data.data)
+                with AtomicWriter(signed_path, self.fsync_policy) as out:
+                    out.write(signed_data.data)
                 return f"Signed file created: {signed_path}"
         except Exception as exc:
             raise FatalError(f"Error signing file: {str(exc)}") from exc
@@ -482,11 +508,12 @@ class PGPCipher:
                 if not os.path.exists(signature_path):
                     raise FatalError(f"Signature file not found: {signature_path}")
 
-                with open(file_path, "rb") as f:
-                    verified = self.gpg.verify_file(f, signature_path)
+                # gpg reads the signature from us and the data by path
+                with open_input(signature_path) as f:
+                    verified = self.gpg.verify_file(f, file_path)
             else:
                 # Verify embedded signature
-                with open(file_path, "rb") as f:
+                with open_input(file_path) as f:
                     verified = self.gpg.verify_file(f)
 
             return {
@@ -564,21 +591,73 @@ class PGPCipher:
             raise FatalError("Passphrase is required for signing")
 
         try:
-            with open(file_path, "rb") as f:
-                encrypted_data = self.gpg.encrypt_file(
-                    f,
-                    recipient_email,
-                    sign=True,
-                    passphrase=passphrase,
-                    always_trust=True,
-                    output=f"{file_path}.pgp",
-                )
-
-            if not encrypted_data.ok:
-                raise FatalError(
-                    f"Failed to sign and encrypt file: {encrypted_data.stderr}"
-                )
+            with open_input(file_path) as f:
+                with AtomicWriter(f"{file_path}.pgp", self.fsync_policy) as out:
+                    with self._stream_output(out) as gpg:
+                        encrypted_data = gpg.encrypt_file(
+                            f,
+                            recipient_email,
+                            sign=True,
+                            passphrase=passphrase,
+                            always_trust=True,
+                        )
+                    if not encrypted_data.ok:
+                        raise FatalError(
+                            f"Failed to sign and encrypt file: {encrypted_data.stderr}"
+                        )
 
             return f"File signed and encrypted: {file_path}.pgp"
         except Exception as exc:
             raise FatalError(f"Error signing and encrypting file: {str(exc)}") from exc
+
+    def _recipient_id(
+        self,
+        recipient_email: str | None,
+        recipient_key: str | None,
+        recipient_key_file: str | None,
+    ) -> str:
+        """Resolve the recipient options to a key identifier, importing keys.
+
+        Args:
+            recipient_email: Email address of recipient (uses key from keyring).
+            recipient_key: Recipient's public key as a string (PEM format).
+            recipient_key_file: Path to file containing recipient's public key.
+
+        Returns:
+            str: A fingerprint or email address to encrypt to.
+
+        Raises:
+            FatalError: If no recipient is given or key import fails.
+        """
+        # Priority 1: Import key from file
+        if recipient_key_file:
+            try:
+                with open(recipient_key_file, "r") as f:
+                    key_data = f.read()
+                import_result = self.gpg.import_keys(key_data)
+                if not import_result.fingerprints:
+                    raise FatalError(f"Failed to import key from {recipient_key_file}")
+                return import_result.fingerprints[0]
+            except FileNotFoundError:
+                raise FatalError(f"Key file not found: {recipient_key_file}")
+            except Exception as exc:
+                raise FatalError(f"Error importing key from file: {str(exc)}") from exc
+
+        # Priority 2: Import key from string
+        elif recipient_key:
+            try:
+                import_result = self.gpg.import_keys(recipient_key)
+                if not import_result.fingerprints:
+                    raise FatalError("Failed to import provided public key")
+                return import_result.fingerprints[0]
+            except Exception as exc:
+                raise FatalError(f"Error importing key: {str(exc)}") from exc
+
+        # Priority 3: Use email from keyring
+        elif recipient_email:
+            return recipient_email
+
+        else:
+            raise FatalError(
+                "Must provide one of: recipient_email, recipient_key, or recipient_key_file"
+            )
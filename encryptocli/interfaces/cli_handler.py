@@ -1,16 +1,29 @@
 """CLI interface handler using Typer for argument-based interface."""
 
+import os
+import sys
+from contextlib import contextmanager
 from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, TextIO
 
 import typer
 
 from termcolor import colored
 
+from encryptocli.encryption.aes import aead, pipeline
 from encryptocli.error_handler import handle_error
 from encryptocli.services import (
     EncryptionService,
     DecryptionService,
     HashingService,
+    manifest,
+)
+from encryptocli.util.file_handling import open_input
+from encryptocli.util.key_gen import DEFAULT_KDF_PROFILE
+from encryptocli.util.output import (
+    DEFAULT_FSYNC_POLICY,
+    AtomicWriter,
+    parse_fsync_policy,
 )
 
 app = typer.Typer(
@@ -22,12 +35,203 @@ app = typer.Typer(
 pgp_app = typer.Typer(help="PGP commands: key management, signing, and verification")
 app.add_typer(pgp_app, name="pgp")
 
+# Key slot subcommands (passwords that open an AES file)
+keyslot_app = typer.Typer(help="Key slot commands: passwords that open an AES file")
+app.add_typer(keyslot_app, name="keyslot")
+
 # Initialize services
 encryption_service = EncryptionService()
 decryption_service = DecryptionService()
 hashing_service = HashingService()
 
 
+@contextmanager
+def _open_batch(batch: str) -> Iterator[TextIO]:
+    """Open a batch input file, or stdin for ``-``."""
+    if batch == "-":
+        yield sys.stdin
+        return
+    with open(batch, encoding="utf-8") as handle:
+        yield handle
+
+
+@contextmanager
+def _open_input(path: str) -> Iterator[BinaryIO]:
+    """Open an input file with ``open_input``, or stdin for ``-``."""
+    if path == "-":
+        yield typer.get_binary_stream("stdin")
+        return
+    with open_input(path) as handle:
+        yield handle
+
+
+def _echo_records(records: Iterator[str]) -> None:
+    """Write batch output records to stdout, one per line, uncolored."""
+    for record in records:
+        typer.echo(record)
+
+
+def _echo_batch_results(results: Iterable[tuple[str, str | None]]) -> None:
+    """Report per-file results of a directory operation as they arrive.
+
+    Raises:
+        typer.Exit: With code 1 if any file failed.
+    """
+    total = failed = 0
+    for path, error in results:
+        total += 1
+        if error is None:
+            typer.echo(colored(f"✓ {path}", "green"))
+        else:
+            failed += 1
+            typer.echo(colored(f"✗ {path}: {error}", "red"))
+    summary = f"{total - failed} succeeded, {failed} failed"
+    typer.echo(colored(summary, "red" if failed else "green"))
+    if failed:
+        raise typer.Exit(code=1)
+
+
+def _write_manifest(
+    entries: list[tuple[str, dict[str, str] | None, str | None]],
+    manifest_format: str,
+    output: str | None,
+    fsync_policy: str = DEFAULT_FSYNC_POLICY,
+) -> None:
+    """Write a checksum manifest to a file or stdout, reporting failed files.
+
+    Raises:
+        typer.Exit: With code 1 if any file could not be hashed.
+    """
+    lines = []
+    failed = 0
+    for path, digests, error in entries:
+        if digests is None:
+            failed += 1
+            typer.echo(colored(f"✗ {path}: {error}", "red"), err=True)
+            continue
+        for algorithm, digest in digests.items():
+            lines.append(manifest.format_line(manifest_format, path, algorithm, digest))
+
+    if output and output != "-":
+        with AtomicWriter(output, fsync_policy) as writer:
+            for line in lines:
+                writer.write(f"{line}\n".encode("utf-8", "surrogateescape"))
+        summary = f"Hashed {len(entries) - failed} files into {output}"
+        typer.echo(colored(summary, "green"), err=True)
+    else:
+        for line in lines:
+            typer.echo(line)
+    if failed:
+        typer.echo(colored(f"{failed} files could not be hashed", "red"), err=True)
+        raise typer.Exit(code=1)
+
+
+def _check_manifest(
+    service: HashingService,
+    manifest_path: str,
+    algorithms: list[str],
+    jobs: int | None,
+    processes: bool,
+) -> None:
+    """Verify the files of a checksum manifest, reporting each as it finishes.
+
+    Raises:
+        ValueError: If several algorithms are given or the manifest has no
+            checksum lines.
+        typer.Exit: With code 1 if any file is missing or does not match.
+    """
+    if len(algorithms) > 1:
+        raise ValueError("--check takes a single algorithm, used for GNU lines")
+    if not Path(manifest_path).exists():
+        typer.echo(colored(f"Error: File not found: {manifest_path}", "red"))
+        raise typer.Exit(code=1)
+    entries, malformed = manifest.read_manifest(manifest_path, algorithms[0])
+    if malformed:
+        typer.echo(
+            colored(f"Warning: {malformed} lines are improperly formatted", "yellow"),
+            err=True,
+        )
+    if not entries:
+        raise ValueError(f"No checksum lines found in {manifest_path}")
+    _echo_batch_results(
+        service.check_manifest(entries, jobs or os.cpu_count() or 1, processes)
+    )
+
+
+def _aes_services(
+    keyfile: str | None, fsync_policy: str = DEFAULT_FSYNC_POLICY
+) -> tuple[EncryptionService, DecryptionService]:
+    """Return the services to use, reading keys from ``keyfile`` if given."""
+    if keyfile is None and fsync_policy == DEFAULT_FSYNC_POLICY:
+        return encryption_service, decryption_service
+    return (
+        EncryptionService(keyfile=keyfile, fsync_policy=fsync_policy),
+        DecryptionService(keyfile=keyfile, fsync_policy=fsync_policy),
+    )
+
+
+def _prompt_passwords(
+    password: str | None,
+    keyfile: str | None,
+    new_password: str | None,
+    new_keyfile: str | None,
+    new_prompt: str = "New password",
+) -> tuple[str, str]:
+    """Prompt for the current and new passwords not replaced by keyfiles."""
+    if password is None:
+        password = "" if keyfile else typer.prompt("Current password", hide_input=True)
+    if new_password is None:
+        new_password = (
+            ""
+            if new_keyfile
+            else typer.prompt(new_prompt, hide_input=True, confirmation_prompt=True)
+        )
+    return password, new_password
+
+
+def _echo_timings(timings: pipeline.Timings | None) -> None:
+    """Report how key derivation overlapped with input reads, on stderr."""
+    if timings is None:
+        typer.echo(
+            colored("Timings: not measured for this operation", "yellow"), err=True
+        )
+    else:
+        typer.echo(colored(f"Timings: {timings}", "cyan"), err=True)
+
+
+def _echo_digest(plaintext_digest: tuple[str, str] | None, err: bool = False) -> None:
+    """Report the plaintext digest of the last AES file, if it has one."""
+    if plaintext_digest is not None:
+        algorithm, value = plaintext_digest
+        typer.echo(
+            colored(f"Plaintext hash ({algorithm}): ", "white")
+            + colored(value, "green"),
+            err=err,
+        )
+
+
+def _parse_range(value: str) -> tuple[int, int | None]:
+    """Parse a ``START:END`` byte range; either bound may be omitted."""
+    start, sep, end = value.partition(":")
+    try:
+        if not sep:
+            raise ValueError
+        bounds = int(start or 0), int(end) if end else None
+    except ValueError:
+        raise ValueError(f"Invalid range: {value}. Expected START:END") from None
+    if bounds[0] < 0 or (bounds[1] is not None and bounds[1] < bounds[0]):
+        raise ValueError(f"Invalid range: {value}. Expected 0 <= START <= END")
+    return bounds
+
+
+def _parse_algorithms(value: str) -> list[str]:
+    """Split a comma-separated list of hashing algorithms."""
+    algorithms = [name.strip() for name in value.split(",") if name.strip()]
+    if not algorithms:
+        raise ValueError("No hashing algorithm given")
+    return algorithms
+
+
 @app.command()
 def hash(
     text: str | None = typer.Option(None, "--text", "-t", help="Text to hash"),
@@ -38,29 +242,133 @@ def hash(
         "-a",
         help=(
             "Hashing algorithm (e.g., MD5, SHA1, SHA256, SHA512, SHA3_256, "
-            "BLAKE2S/B, BLAKE3, ARGON2ID)"
+            "BLAKE2S/B, BLAKE3, ARGON2ID), or a comma-separated list such as "
+            "SHA256,SHA512,BLAKE3 to compute several in one read"
+        ),
+    ),
+    output: str | None = typer.Option(
+        None,
+        "--output",
+        "-o",
+        help=(
+            "Write only the digest to this file ('-' for stdout); "
+            "with --dir, the manifest (default: stdout)"
         ),
     ),
+    threads: int = typer.Option(
+        1,
+        "--threads",
+        help="Threads BLAKE3 hashes a file with (0 for one per CPU core)",
+    ),
+    directory: str | None = typer.Option(
+        None,
+        "--dir",
+        "-d",
+        help="Directory to hash recursively into a checksum manifest",
+    ),
+    include: list[str] | None = typer.Option(
+        None, "--include", help="With --dir: glob of files to hash (repeatable)"
+    ),
+    exclude: list[str] | None = typer.Option(
+        None, "--exclude", help="With --dir: glob of files to skip (repeatable)"
+    ),
+    jobs: int | None = typer.Option(
+        None,
+        "--jobs",
+        "-j",
+        help="With --dir or --check: files hashed at once (default: number of CPUs)",
+    ),
+    processes: bool = typer.Option(
+        False,
+        "--processes",
+        help="With --dir or --check: hash in worker processes instead of threads",
+    ),
+    manifest_format: str = typer.Option(
+        manifest.GNU,
+        "--format",
+        help="With --dir: manifest format, gnu (sha256sum) or bsd (tagged)",
+    ),
+    check: str | None = typer.Option(
+        None,
+        "--check",
+        "-c",
+        help=(
+            "Verify the files listed in a GNU or BSD checksum manifest; "
+            "--algorithm names the algorithm of GNU lines"
+        ),
+    ),
+    fsync: str = typer.Option(
+        DEFAULT_FSYNC_POLICY,
+        "--fsync",
+        help="How output files are synced to disk: none (fastest), end, or "
+        "every N MiB (e.g., 64MB)",
+    ),
 ) -> None:
-    """Hash text or file using specified algorithm."""
-    if not text and not file:
-        typer.echo(colored("Error: Provide either --text or --file", "red"))
+    """Hash text, file ('-' for stdin) or directory, or check a manifest."""
+    provided_count = sum([bool(text), bool(file), bool(directory), bool(check)])
+    if provided_count == 0:
+        typer.echo(
+            colored("Error: Provide either --text, --file, --dir, or --check", "red")
+        )
         raise typer.Exit(code=1)
 
-    if text and file:
-        typer.echo(colored("Error: Provide either --text or --file, not both", "red"))
+    if provided_count > 1:
+        typer.echo(
+            colored(
+                "Error: Provide only one of --text, --file, --dir, or --check", "red"
+            )
+        )
         raise typer.Exit(code=1)
 
     try:
-        if file:
+        parse_fsync_policy(fsync)
+        algorithms = _parse_algorithms(algorithm)
+        service = hashing_service if threads == 1 else HashingService(threads=threads)
+        if check:
+            _check_manifest(service, check, algorithms, jobs, processes)
+            return
+        if directory:
+            manifest.check_format(manifest_format, algorithms)
+            entries = service.hash_directory(
+                directory,
+                algorithms,
+                include,
+                exclude,
+                jobs or os.cpu_count() or 1,
+                processes,
+                skip=[output] if output and output != "-" else None,
+            )
+            _write_manifest(entries, manifest_format, output, fsync)
+            return
+        if file == "-":
+            with _open_input(file) as src:
+                results = service.hash_stream_multi(src, algorithms)
+        elif file:
             if not Path(file).exists():
                 typer.echo(colored(f"Error: File not found: {file}", "red"))
                 raise typer.Exit(code=1)
-            result = hashing_service.hash_file(file, algorithm)
+            results = service.hash_file_multi(file, algorithms)
         else:
-            result = hashing_service.hash_text(str(text), algorithm)
+            results = {name: service.hash_text(str(text), name) for name in algorithms}
 
-        typer.echo(colored(f"Hash ({algorithm}): ", "white") + colored(result, "green"))
+        if output:
+            # A single digest is written bare; several are labelled
+            if len(results) == 1:
+                lines = list(results.values())
+            else:
+                lines = [f"{name} {digest}" for name, digest in results.items()]
+            if output == "-":
+                for line in lines:
+                    typer.echo(line)
+            else:
+                with AtomicWriter(output, fsync) as writer:
+                    for line in lines:
+                        writer.write(f"{line}\n".encode())
+        else:
+            for name, digest in results.items():
+                typer.echo(
+                    colored(f"Hash ({name}): ", "white") + colored(digest, "green")
+                )
     except ValueError as e:
         typer.echo(colored(f"Error: {e}", "red"))
         raise typer.Exit(code=1)
@@ -72,7 +380,9 @@ def hash(
 @app.command()
 def encrypt(
     text: str | None = typer.Option(None, "--text", "-t", help="Text to encrypt"),
-    file: str | None = typer.Option(None, "--file", "-f", help="File to encrypt"),
+    file: str | None = typer.Option(
+        None, "--file", "-f", help="File to encrypt ('-' for stdin)"
+    ),
     password: str | None = typer.Option(
         None,
         "--password",
@@ -104,27 +414,124 @@ def encrypt(
         help="Image file to embed encrypted text (PNG format recommended for steganography)",
     ),
     output_dir: str = typer.Option(
-        "./", "--output", "-o", help="Output directory for encrypted image"
+        "./",
+        "--output",
+        "-o",
+        help="Output directory for encrypted image; '-' writes file output to stdout",
     ),
     steganography: str = typer.Option(
         "lsb", "--steganography", "-s", help="Steganography method (lsb, dct)"
     ),
     method: str = typer.Option(
-        "aes", "--method", "-m", help="Encryption method (aes, pgp)"
+        "aes",
+        "--method",
+        "-m",
+        help="Encryption method (aes, aead, aes-gcm, chacha20, pgp)",
+    ),
+    kdf_profile: str = typer.Option(
+        DEFAULT_KDF_PROFILE,
+        "--kdf-profile",
+        help="AES: Key derivation cost profile (fast, interactive, strong)",
+    ),
+    jobs: int | None = typer.Option(
+        None,
+        "--jobs",
+        "-j",
+        min=1,
+        help=(
+            "AES: Worker processes for file encryption (default 1); with --dir, "
+            "files encrypted at once (default: CPU count)"
+        ),
+    ),
+    directory: str | None = typer.Option(
+        None, "--dir", "-d", help="Directory to encrypt recursively"
+    ),
+    include: list[str] | None = typer.Option(
+        None, "--include", help="With --dir: glob of files to encrypt (repeatable)"
+    ),
+    exclude: list[str] | None = typer.Option(
+        None, "--exclude", help="With --dir: glob of files to skip (repeatable)"
+    ),
+    compress: str = typer.Option(
+        "none",
+        "--compress",
+        "-c",
+        help="AES: Compress file data before encryption (none, zlib, lzma)",
+    ),
+    compress_level: int | None = typer.Option(
+        None,
+        "--compress-level",
+        min=0,
+        max=9,
+        help="AES: Compression level from 0 to 9 (default 6)",
+    ),
+    resume: bool = typer.Option(
+        False,
+        "--resume",
+        help="AES: Checkpoint file encryption and continue an interrupted run",
+    ),
+    incremental: bool = typer.Option(
+        False,
+        "--incremental",
+        help="AES: Re-encrypt only the parts of a file that changed since last time",
+    ),
+    keyfile: str | None = typer.Option(
+        None,
+        "--keyfile",
+        help="AES: Read the key from this file (32+ random bytes) instead of a password",
+    ),
+    timings: bool = typer.Option(
+        False,
+        "--timings",
+        help="AES: Report on stderr how much key derivation and read latency "
+        "was overlapped",
+    ),
+    fsync: str = typer.Option(
+        DEFAULT_FSYNC_POLICY,
+        "--fsync",
+        help="How output files are synced to disk: none (fastest), end, or "
+        "every N MiB (e.g., 64MB)",
+    ),
+    digest: str | None = typer.Option(
+        None,
+        "--digest",
+        help="AES: Store a plaintext hash computed while encrypting files "
+        "(e.g., SHA256, BLAKE3); decrypt checks and reports it",
+    ),
+    batch: str | None = typer.Option(
+        None,
+        "--batch",
+        "-b",
+        help="File of records to encrypt, one per line ('-' for stdin)",
+    ),
+    record_format: str = typer.Option(
+        "lines", "--format", help="Batch record format (lines, jsonl)"
+    ),
+    field: str = typer.Option(
+        "value", "--field", help="Batch: JSONL object field to encrypt"
     ),
 ) -> None:
-    """Encrypt text or file."""
-    if not text and not file:
-        typer.echo(colored("Error: Provide either --text or --file", "red"))
+    """Encrypt text, file, directory, or a batch of records."""
+    provided_count = sum([bool(text), bool(file), bool(batch), bool(directory)])
+    if provided_count == 0:
+        typer.echo(
+            colored("Error: Provide either --text, --file, --dir, or --batch", "red")
+        )
         raise typer.Exit(code=1)
 
-    if text and file:
-        typer.echo(colored("Error: Provide either --text or --file, not both", "red"))
+    if provided_count > 1:
+        typer.echo(
+            colored(
+                "Error: Provide only one of --text, --file, --dir, or --batch", "red"
+            )
+        )
         raise typer.Exit(code=1)
 
+    compression = None if compress.lower() == "none" else compress.lower()
+
     # Validate method-specific parameters
-    if method.lower() == "aes":
-        if not password:
+    if method.lower() == "aes" or method.lower() in aead.METHODS:
+        if not password and not keyfile:
             password = typer.prompt("Password", hide_input=True)
         if recipient_email or recipient_key or recipient_key_file:
             typer.echo(
@@ -133,6 +540,33 @@ def encrypt(
                     "yellow",
                 )
             )
+        if text and compression:
+            typer.echo(
+                colored(
+                    "Warning: --compress applies to files; ignored for text", "yellow"
+                )
+            )
+        if (text or batch) and digest:
+            typer.echo(
+                colored(
+                    "Warning: --digest applies to files; ignored for text", "yellow"
+                )
+            )
+        for flag, enabled in (("--resume", resume), ("--incremental", incremental)):
+            if enabled and (not file or file == "-" or output_dir == "-"):
+                typer.echo(
+                    colored(
+                        f"Warning: {flag} applies to files written to disk; ignored",
+                        "yellow",
+                    )
+                )
+        if (text or batch) and method.lower() in aead.METHODS:
+            typer.echo(
+                colored(
+                    "Warning: AEAD methods apply to files; text uses AES (Fernet)",
+                    "yellow",
+                )
+            )
     elif method.lower() == "pgp":
         if not recipient_email and not recipient_key and not recipient_key_file:
             typer.echo(
@@ -146,27 +580,101 @@ def encrypt(
             typer.echo(
                 colored("Warning: --password is ignored for PGP encryption", "yellow")
             )
+        if keyfile:
+            typer.echo(
+                colored("Warning: --keyfile is ignored for PGP encryption", "yellow")
+            )
 
     try:
-        if file:
+        service = _aes_services(keyfile, fsync)[0]
+        if directory:
+            results = service.encrypt_directory(
+                directory,
+                password or "",
+                method,
+                include,
+                exclude,
+                jobs or os.cpu_count() or 1,
+                recipient_email,
+                recipient_key,
+                recipient_key_file,
+                kdf_profile,
+                compression,
+                compress_level,
+                digest,
+            )
+            _echo_batch_results(results)
+        elif batch:
+            if batch != "-" and not Path(batch).exists():
+                typer.echo(colored(f"Error: File not found: {batch}", "red"))
+                raise typer.Exit(code=1)
+            with _open_batch(batch) as lines:
+                _echo_records(
+                    service.encrypt_records(
+                        lines,
+                        password or "",
+                        method,
+                        record_format,
+                        field,
+                        recipient_email,
+                        recipient_key,
+                        recipient_key_file,
+                        kdf_profile,
+                    )
+                )
+        elif file == "-" or (file and output_dir == "-"):
+            if file != "-" and not Path(file).exists():
+                typer.echo(colored(f"Error: File not found: {file}", "red"))
+                raise typer.Exit(code=1)
+            stdout = typer.get_binary_stream("stdout")
+            with _open_input(file) as src:
+                service.encrypt_stream(
+                    src,
+                    stdout,
+                    password or "",
+                    method,
+                    recipient_email,
+                    recipient_key,
+                    recipient_key_file,
+                    kdf_profile,
+                    jobs or 1,
+                    compression,
+                    compress_level,
+                    digest,
+                )
+            stdout.flush()
+            _echo_digest(service.aes_cipher.plaintext_digest, err=True)
+            if timings:
+                _echo_timings(service.aes_cipher.timings)
+        elif file:
             if not Path(file).exists():
                 typer.echo(colored(f"Error: File not found: {file}", "red"))
                 raise typer.Exit(code=1)
-            result = encryption_service.encrypt_file(
+            result = service.encrypt_file(
                 file,
                 password or "",
                 method,
                 recipient_email,
                 recipient_key,
                 recipient_key_file,
+                kdf_profile,
+                jobs or 1,
+                compression,
+                compress_level,
+                resume,
+                incremental,
+                digest,
             )
             typer.echo(colored(result, "green"))
+            _echo_digest(service.aes_cipher.plaintext_digest)
+            if timings:
+                _echo_timings(service.aes_cipher.timings)
         else:
             if image:
                 if not Path(image).exists():
                     typer.echo(colored(f"Error: Image file not found: {image}", "red"))
                     raise typer.Exit(code=1)
-                result = encryption_service.encrypt_text_to_image(
+                result = service.encrypt_text_to_image(
                     str(image),
                     str(text),
                     password or "",
@@ -176,20 +684,25 @@ def encrypt(
                     recipient_email,
                     recipient_key,
                     recipient_key_file,
+                    kdf_profile,
                 )
                 typer.echo(colored(result, "green"))
             else:
-                result = encryption_service.encrypt_text(
+                result = service.encrypt_text(
                     str(text),
                     password or "",
                     method,
                     recipient_email,
                     recipient_key,
                     recipient_key_file,
+                    kdf_profile,
                 )
                 typer.echo(
                     colored("Encrypted text: ", "white") + colored(result, "green")
                 )
+    except ValueError as e:
+        typer.echo(colored(f"Error: {e}", "red"))
+        raise typer.Exit(code=1)
     except Exception as e:
         handle_error(e)
         raise typer.Exit(code=1)
@@ -201,59 +714,419 @@ def decrypt(
         None, "--text", "-t", help="Encrypted text to decrypt"
     ),
     file: str | None = typer.Option(
-        None, "--file", "-f", help="Encrypted file to decrypt"
+        None, "--file", "-f", help="Encrypted file to decrypt ('-' for stdin)"
     ),
     image: str | None = typer.Option(
         None, "--image", "-i", help="Image file with encrypted text"
     ),
-    password: str = typer.Option(
-        ...,
+    password: str | None = typer.Option(
+        None,
         "--password",
         "-p",
-        prompt=True,
-        hide_input=True,
-        help="Password or passphrase",
+        help="Password or passphrase (prompted for unless --keyfile is given)",
     ),
     steganography: str = typer.Option(
         "lsb", "--steganography", "-s", help="Steganography method (lsb, dct)"
     ),
     method: str = typer.Option(
-        "aes", "--method", "-m", help="Decryption method (aes, pgp)"
+        "aes",
+        "--method",
+        "-m",
+        help="Decryption method (aes, pgp). AEAD files decrypt with aes",
     ),
     output_dir: str = typer.Option(
-        "./", "--output", "-o", help="Output directory for decrypted file"
+        "./",
+        "--output",
+        "-o",
+        help="Output directory for decrypted file (PGP); '-' writes to stdout",
+    ),
+    jobs: int | None = typer.Option(
+        None,
+        "--jobs",
+        "-j",
+        min=1,
+        help=(
+            "AES: Worker processes for file decryption (default 1); with --dir, "
+            "files decrypted at once (default: CPU count)"
+        ),
+    ),
+    directory: str | None = typer.Option(
+        None, "--dir", "-d", help="Directory to decrypt recursively"
+    ),
+    include: list[str] | None = typer.Option(
+        None,
+        "--include",
+        help="With --dir: glob of files to decrypt (default *.encrypto; repeatable)",
+    ),
+    exclude: list[str] | None = typer.Option(
+        None, "--exclude", help="With --dir: glob of files to skip (repeatable)"
+    ),
+    batch: str | None = typer.Option(
+        None,
+        "--batch",
+        "-b",
+        help="File of encrypted records, one per line ('-' for stdin)",
+    ),
+    record_format: str = typer.Option(
+        "lines", "--format", help="Batch record format (lines, jsonl)"
+    ),
+    field: str = typer.Option(
+        "value", "--field", help="Batch: JSONL object field to decrypt"
+    ),
+    fsync: str = typer.Option(
+        DEFAULT_FSYNC_POLICY,
+        "--fsync",
+        help="How output files are synced to disk: none (fastest), end, or "
+        "every N MiB (e.g., 64MB)",
+    ),
+    byte_range: str | None = typer.Option(
+        None,
+        "--range",
+        help="AES: Write only plaintext bytes START:END of --file to stdout",
+    ),
+    keyfile: str | None = typer.Option(
+        None,
+        "--keyfile",
+        help="AES: Read the key from this file (32+ random bytes) instead of a password",
+    ),
+    timings: bool = typer.Option(
+        False,
+        "--timings",
+        help="AES: Report on stderr how much key derivation and read latency "
+        "was overlapped",
     ),
 ) -> None:
-    """Decrypt text, file, or image."""
-    if not text and not file and not image:
-        typer.echo(colored("Error: Provide --text, --file, or --image", "red"))
+    """Decrypt text, file, directory, image, or a batch of records."""
+    provided_count = sum(
+        [bool(text), bool(file), bool(image), bool(batch), bool(directory)]
+    )
+    if provided_count == 0:
+        typer.echo(
+            colored("Error: Provide --text, --file, --dir, --image, or --batch", "red")
+        )
         raise typer.Exit(code=1)
 
-    provided_count = sum([bool(text), bool(file), bool(image)])
     if provided_count > 1:
         typer.echo(
-            colored("Error: Provide only one of --text, --file, or --image", "red")
+            colored(
+                "Error: Provide only one of --text, --file, --dir, --image, or --batch",
+                "red",
+            )
         )
         raise typer.Exit(code=1)
 
+    if password is None:
+        password = "" if keyfile else typer.prompt("Password", hide_input=True)
+
+    if byte_range and (not file or file == "-"):
+        typer.echo(colored("Error: --range requires a --file on disk", "red"))
+        raise typer.Exit(code=1)
+
     try:
-        if file:
+        service = _aes_services(keyfile, fsync)[1]
+        if directory:
+            results = service.decrypt_directory(
+                directory,
+                password,
+                method,
+                include,
+                exclude,
+                jobs or os.cpu_count() or 1,
+                output_dir,
+            )
+            _echo_batch_results(results)
+        elif batch:
+            if batch != "-" and not Path(batch).exists():
+                typer.echo(colored(f"Error: File not found: {batch}", "red"))
+                raise typer.Exit(code=1)
+            with _open_batch(batch) as lines:
+                _echo_records(
+                    service.decrypt_records(
+                        lines, password, method, record_format, field
+                    )
+                )
+        elif file == "-" or (file and output_dir == "-" and not byte_range):
+            if file != "-" and not Path(file).exists():
+                typer.echo(colored(f"Error: File not found: {file}", "red"))
+                raise typer.Exit(code=1)
+            stdout = typer.get_binary_stream("stdout")
+            with _open_input(file) as src:
+                service.decrypt_stream(src, stdout, password, method, jobs or 1)
+            stdout.flush()
+            _echo_digest(service.aes_cipher.plaintext_digest, err=True)
+            if timings:
+                _echo_timings(service.aes_cipher.timings)
+        elif file:
             if not Path(file).exists():
                 typer.echo(colored(f"Error: File not found: {file}", "red"))
                 raise typer.Exit(code=1)
-            result = decryption_service.decrypt_file(file, password, method, output_dir)
+            if byte_range:
+                start, end = _parse_range(byte_range)
+                data = service.decrypt_file_range(file, password, start, end, method)
+                typer.echo(data, nl=False)
+                return
+            result = service.decrypt_file(file, password, method, output_dir, jobs or 1)
             typer.echo(colored(result, "green"))
+            _echo_digest(service.aes_cipher.plaintext_digest)
+            if timings:
+                _echo_timings(service.aes_cipher.timings)
         elif image:
             if not Path(image).exists():
                 typer.echo(colored(f"Error: Image file not found: {image}", "red"))
                 raise typer.Exit(code=1)
-            result = decryption_service.decrypt_image(
-                image, password, steganography, method
-            )
+            result = service.decrypt_image(image, password, steganography, method)
             typer.echo(colored("Decrypted text: ", "white") + colored(result, "green"))
         else:
-            result = decryption_service.decrypt_text(str(text), password, method)
+            result = service.decrypt_text(str(text), password, method)
             typer.echo(colored("Decrypted text: ", "white") + colored(result, "green"))
+    except ValueError as e:
+        typer.echo(colored(f"Error: {e}", "red"))
+        raise typer.Exit(code=1)
+    except Exception as e:
+        handle_error(e)
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def verify(
+    file: str | None = typer.Option(
+        None, "--file", "-f", help="Encrypted file to verify"
+    ),
+    directory: str | None = typer.Option(
+        None, "--dir", "-d", help="Directory of encrypted files to verify"
+    ),
+    password: str | None = typer.Option(
+        None,
+        "--password",
+        "-p",
+        help="Password (prompted for unless --keyfile is given)",
+    ),
+    keyfile: str | None = typer.Option(
+        None, "--keyfile", help="Read the key from this file instead of a password"
+    ),
+    jobs: int | None = typer.Option(
+        None,
+        "--jobs",
+        "-j",
+        min=1,
+        help=(
+            "Worker processes for the file (default 1); with --dir, files "
+            "verified at once (default: CPU count)"
+        ),
+    ),
+    include: list[str] | None = typer.Option(
+        None,
+        "--include",
+        help="With --dir: glob of files to verify (default *.encrypto; repeatable)",
+    ),
+    exclude: list[str] | None = typer.Option(
+        None, "--exclude", help="With --dir: glob of files to skip (repeatable)"
+    ),
+) -> None:
+    """Check AES encrypted files are intact without writing their plaintext."""
+    if bool(file) == bool(directory):
+        typer.echo(colored("Error: Provide exactly one of --file or --dir", "red"))
+        raise typer.Exit(code=1)
+    if password is None:
+        password = "" if keyfile else typer.prompt("Password", hide_input=True)
+
+    try:
+        service = _aes_services(keyfile)[1]
+        if directory:
+            results = service.verify_directory(
+                directory, password, include, exclude, jobs or os.cpu_count() or 1
+            )
+            _echo_batch_results(results)
+        else:
+            if not Path(str(file)).exists():
+                typer.echo(colored(f"Error: File not found: {file}", "red"))
+                raise typer.Exit(code=1)
+            result = service.verify_file(str(file), password, jobs or 1)
+            typer.echo(colored(result, "green"))
+            _echo_digest(service.aes_cipher.plaintext_digest)
+    except ValueError as e:
+        typer.echo(colored(f"Error: {e}", "red"))
+        raise typer.Exit(code=1)
+    except Exception as e:
+        handle_error(e)
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def rekey(
+    file: str | None = typer.Option(
+        None, "--file", "-f", help="Encrypted file to change the password of"
+    ),
+    directory: str | None = typer.Option(
+        None, "--dir", "-d", help="Directory of encrypted files to rekey"
+    ),
+    password: str | None = typer.Option(
+        None,
+        "--password",
+        "-p",
+        help="Current password (prompted for unless --keyfile is given)",
+    ),
+    keyfile: str | None = typer.Option(
+        None, "--keyfile", help="Keyfile that currently opens the file"
+    ),
+    new_password: str | None = typer.Option(
+        None,
+        "--new-password",
+        help="New password (prompted for unless --new-keyfile is given)",
+    ),
+    new_keyfile: str | None = typer.Option(
+        None, "--new-keyfile", help="Keyfile to use instead of a new password"
+    ),
+    kdf_profile: str = typer.Option(
+        DEFAULT_KDF_PROFILE,
+        "--kdf-profile",
+        help="Key derivation cost profile for the new password",
+    ),
+    jobs: int | None = typer.Option(
+        None,
+        "--jobs",
+        "-j",
+        min=1,
+        help="With --dir: files rekeyed at once (default: CPU count)",
+    ),
+    include: list[str] | None = typer.Option(
+        None,
+        "--include",
+        help="With --dir: glob of files to rekey (default *.encrypto; repeatable)",
+    ),
+    exclude: list[str] | None = typer.Option(
+        None, "--exclude", help="With --dir: glob of files to skip (repeatable)"
+    ),
+) -> None:
+    """Change the password of AES encrypted files without re-encrypting them."""
+    if bool(file) == bool(directory):
+        typer.echo(colored("Error: Provide exactly one of --file or --dir", "red"))
+        raise typer.Exit(code=1)
+    password, new_password = _prompt_passwords(
+        password, keyfile, new_password, new_keyfile
+    )
+
+    try:
+        service = _aes_services(keyfile)[0]
+        if directory:
+            results = service.rekey_directory(
+                directory,
+                password,
+                new_password,
+                include,
+                exclude,
+                jobs or os.cpu_count() or 1,
+                kdf_profile,
+                new_keyfile,
+            )
+            _echo_batch_results(results)
+        else:
+            if not Path(str(file)).exists():
+                typer.echo(colored(f"Error: File not found: {file}", "red"))
+                raise typer.Exit(code=1)
+            result = service.rekey_file(
+                str(file), password, new_password, kdf_profile, new_keyfile
+            )
+            typer.echo(colored(result, "green"))
+    except ValueError as e:
+        typer.echo(colored(f"Error: {e}", "red"))
+        raise typer.Exit(code=1)
+    except Exception as e:
+        handle_error(e)
+        raise typer.Exit(code=1)
+
+
+@keyslot_app.command("add")
+def keyslot_add(
+    file: str = typer.Option(..., "--file", "-f", help="Encrypted file"),
+    password: str | None = typer.Option(
+        None,
+        "--password",
+        "-p",
+        help="Current password (prompted for unless --keyfile is given)",
+    ),
+    keyfile: str | None = typer.Option(
+        None, "--keyfile", help="Keyfile that already opens the file"
+    ),
+    new_password: str | None = typer.Option(
+        None,
+        "--new-password",
+        help="Password to add (prompted for unless --new-keyfile is given)",
+    ),
+    new_keyfile: str | None = typer.Option(
+        None, "--new-keyfile", help="Keyfile to use instead of a new password"
+    ),
+    kdf_profile: str = typer.Option(
+        DEFAULT_KDF_PROFILE,
+        "--kdf-profile",
+        help="Key derivation cost profile for the new password",
+    ),
+) -> None:
+    """Add a password or keyfile that opens an encrypted file."""
+    if not Path(file).exists():
+        typer.echo(colored(f"Error: File not found: {file}", "red"))
+        raise typer.Exit(code=1)
+    password, new_password = _prompt_passwords(
+        password, keyfile, new_password, new_keyfile, "Password to add"
+    )
+    try:
+        service = _aes_services(keyfile)[0]
+        result = service.add_key_slot(
+            file, password, new_password, kdf_profile, new_keyfile
+        )
+        typer.echo(colored(result, "green"))
+    except ValueError as e:
+        typer.echo(colored(f"Error: {e}", "red"))
+        raise typer.Exit(code=1)
+    except Exception as e:
+        handle_error(e)
+        raise typer.Exit(code=1)
+
+
+@keyslot_app.command("remove")
+def keyslot_remove(
+    file: str = typer.Option(..., "--file", "-f", help="Encrypted file"),
+    slot: int = typer.Option(
+        ..., "--slot", "-s", min=0, help="Slot to remove, as shown by 'keyslot list'"
+    ),
+    password: str | None = typer.Option(
+        None,
+        "--password",
+        "-p",
+        help="A password that opens the file (prompted for unless --keyfile)",
+    ),
+    keyfile: str | None = typer.Option(
+        None, "--keyfile", help="Keyfile that opens the file"
+    ),
+) -> None:
+    """Remove a key slot from an encrypted file."""
+    if not Path(file).exists():
+        typer.echo(colored(f"Error: File not found: {file}", "red"))
+        raise typer.Exit(code=1)
+    if password is None:
+        password = "" if keyfile else typer.prompt("Password", hide_input=True)
+    try:
+        service = _aes_services(keyfile)[0]
+        result = service.remove_key_slot(file, password, slot)
+        typer.echo(colored(result, "green"))
+    except Exception as e:
+        handle_error(e)
+        raise typer.Exit(code=1)
+
+
+@keyslot_app.command("list")
+def keyslot_list(
+    file: str = typer.Option(..., "--file", "-f", help="Encrypted file"),
+) -> None:
+    """List the key slots of an encrypted file."""
+    if not Path(file).exists():
+        typer.echo(colored(f"Error: File not found: {file}", "red"))
+        raise typer.Exit(code=1)
+    try:
+        slots = encryption_service.list_key_slots(file)
+        for number, kdf in enumerate(slots):
+            params = ", ".join(f"{name}={value}" for name, value in kdf.items())
+            typer.echo(colored(f"{number}: ", "green") + params)
     except Exception as e:
         handle_error(e)
         raise typer.Exit(code=1)
@@ -410,8 +1283,8 @@ def pgp_sign(
                 str(text), passphrase, detach=detach, clearsign=clearsign
             )
             if output:
-                with open(output, "w") as f:
-                    f.write(signed_text)
+                with AtomicWriter(output, pgp.fsync_policy) as writer:
+                    writer.write(signed_text.encode())
                 typer.echo(colored(f"Signed text saved to: {output}", "green"))
             else:
                 typer.echo(colored("Signed text:", "white"))
@@ -522,8 +1395,8 @@ def pgp_sign_encrypt(
                 str(text), recipient, passphrase
             )
             if output:
-                with open(output, "w") as f:
-                    f.write(signed_encrypted)
+                with AtomicWriter(output, pgp.fsync_policy) as writer:
+                    writer.write(signed_encrypted.encode())
                 typer.echo(
                     colored(f"Signed and encrypted text saved to: {output}", "green")
                 )
@@ -1,21 +1,67 @@
 """Core decryption business logic service."""
 
+from typing import BinaryIO, Iterable, Iterator
+
 from encryptocli.encryption.aes import AESCipher
+from encryptocli.services.directory import (
+    per_thread,
+    run_batch,
+    select_files,
+    shared_key_cache,
+)
+from encryptocli.services.records import transform_records
 from encryptocli.steganography import get_steganography_handler
+from encryptocli.util.key_gen import KeyCache
+from encryptocli.util.output import DEFAULT_FSYNC_POLICY
 
 
 class DecryptionService:
     """Handle decryption logic without UI dependencies."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        key_cache: KeyCache | None = None,
+        keyfile: str | None = None,
+        fsync_policy: str = DEFAULT_FSYNC_POLICY,
+    ) -> None:
         """Initialize decryption service with cipher instances.
 
+        Args:
+            key_cache: Optional derived-key cache shared with the AES cipher.
+            keyfile: Optional path to a keyfile. When given, AES keys come
+                from the keyfile and passwords are ignored.
+            fsync_policy: How output files are synced to disk: 'none', 'end'
+                (default) or a size in MiB such as '64MB'.
+
         Returns:
             None
+
+        Raises:
+            FatalError: If the keyfile can not be read or is too short.
+            ValueError: If the fsync policy is not recognized.
         """
-        self.aes_cipher = AESCipher()
+        self.fsync_policy = fsync_policy
+        if keyfile is None:
+            self.aes_cipher = AESCipher(key_cache, fsync_policy=fsync_policy)
+        else:
+            self.aes_cipher = AESCipher.from_keyfile(keyfile, key_cache, fsync_policy)
         self._pgp_cipher = None  # Lazy initialization
 
+    def _worker(self) -> "DecryptionService":
+        """Return a service with ciphers of its own for one batch thread.
+
+        The AES key cache and key material are shared, so the batch still
+        derives each key once.
+
+        Returns:
+            DecryptionService: The worker's service
+        """
+        worker = DecryptionService(fsync_policy=self.fsync_policy)
+        worker.aes_cipher = AESCipher(
+            self.aes_cipher.key_cache, self.aes_cipher.key_material, self.fsync_policy
+        )
+        return worker
+
     def _get_pgp_cipher(self):
         """Get PGP cipher instance, initializing lazily if needed.
 
@@ -29,7 +75,7 @@ class DecryptionService:
             try:
                 from encryptocli.encryption.pgp import PGPCipher
 
-                self._pgp_cipher = PGPCipher()
+                self._pgp_cipher = PGPCipher(fsync_policy=self.fsync_policy)
             except OSError as e:
                 raise OSError(
                     f"GPG (GNU Privacy Guard) is not installed on your system. "
@@ -54,8 +100,58 @@ class DecryptionService:
             return decrypted
         return self.aes_cipher.decrypt_text(data, password)
 
+    def decrypt_texts(
+        self, data: Iterable[str], password: str, method: str = "aes"
+    ) -> Iterator[str]:
+        """Decrypt many texts, deriving each AES key only once.
+
+        Args:
+            data: The encrypted texts to decrypt
+            password: The password/passphrase used for encryption
+            method: Decryption method ('aes' or 'pgp'). Default: 'aes'
+
+        Returns:
+            Iterator[str]: The decrypted texts, in input order
+        """
+        if method.lower() == "pgp":
+            pgp = self._get_pgp_cipher()
+            return (pgp.decrypt_text(item, password) for item in data)
+        return self.aes_cipher.decrypt_texts(data, password)
+
+    def decrypt_records(
+        self,
+        lines: Iterable[str],
+        password: str,
+        method: str = "aes",
+        record_format: str = "lines",
+        field: str = "value",
+    ) -> Iterator[str]:
+        """Decrypt newline- or JSONL-delimited records as a stream.
+
+        Args:
+            lines: Input lines, for example an open file or stdin
+            password: The password/passphrase used for encryption
+            method: Decryption method ('aes' or 'pgp'). Default: 'aes'
+            record_format: 'lines' or 'jsonl'. Default: 'lines'
+            field: For JSONL objects: the key to decrypt. Default: 'value'
+
+        Returns:
+            Iterator[str]: Output records, one per input record
+        """
+        return transform_records(
+            lines,
+            lambda items: self.decrypt_texts(items, password, method),
+            record_format,
+            field,
+        )
+
     def decrypt_file(
-        self, file_path: str, password: str, method: str = "aes", output_dir: str = "./"
+        self,
+        file_path: str,
+        password: str,
+        method: str = "aes",
+        output_dir: str = "./",
+        jobs: int = 1,
     ) -> str:
         """Decrypt a file.
 
@@ -64,6 +160,7 @@ class DecryptionService:
             password: The password/passphrase used for encryption
             method: Decryption method ('aes' or 'pgp'). Default: 'aes'
             output_dir: Output directory for decrypted file (for PGP only)
+            jobs: For AES: number of worker processes. Default: 1
 
         Returns:
             str: Success message
@@ -73,9 +170,154 @@ class DecryptionService:
                 file_path, password, output_dir
             )
             return result
-        self.aes_cipher.decrypt_file(file_path, password)
+        self.aes_cipher.decrypt_file(file_path, password, jobs)
         return "File decrypted successfully"
 
+    def decrypt_stream(
+        self,
+        src: BinaryIO,
+        dst: BinaryIO,
+        password: str,
+        method: str = "aes",
+        jobs: int = 1,
+    ) -> None:
+        """Decrypt a binary stream, such as stdin, to another stream.
+
+        Args:
+            src: Binary stream to read ciphertext from
+            dst: Binary stream to write plaintext to
+            password: The password/passphrase used for encryption
+            method: Decryption method ('aes' or 'pgp'). Default: 'aes'
+            jobs: For AES: number of worker processes. Default: 1
+
+        Returns:
+            None
+        """
+        if method.lower() == "pgp":
+            self._get_pgp_cipher().decrypt_stream(src, dst, password)
+            return
+        self.aes_cipher.decrypt_stream(src, dst, password, jobs)
+
+    def decrypt_directory(
+        self,
+        directory: str,
+        password: str,
+        method: str = "aes",
+        include: list[str] | None = None,
+        exclude: list[str] | None = None,
+        jobs: int = 4,
+        output_dir: str = "./",
+    ) -> list[tuple[str, str | None]]:
+        """Decrypt every matching encrypted file under a directory.
+
+        Files are decrypted with ``decrypt_file`` by a pool of ``jobs``
+        worker threads, each with AES and PGP ciphers of its own. Files
+        encrypted together share a salt, so their key is derived once.
+
+        Args:
+            directory: Root directory to walk recursively
+            password: The password/passphrase used for encryption
+            method: Decryption method ('aes' or 'pgp'). Default: 'aes'
+            include: Globs selecting files to decrypt (default: '*.encrypto',
+                or '*.pgp' and '*.gpg' for PGP)
+            exclude: Globs of files to leave alone
+            jobs: Number of files decrypted at once. Default: 4
+            output_dir: Output directory for decrypted files (for PGP only)
+
+        Returns:
+            list[tuple[str, str | None]]: Each file with its error message, or
+                None if it was decrypted
+
+        Raises:
+            FatalError: If the directory does not exist
+        """
+        if include is None:
+            include = ["*.pgp", "*.gpg"] if method.lower() == "pgp" else ["*.encrypto"]
+        files = select_files(directory, include, exclude)
+        with shared_key_cache(self.aes_cipher):
+            worker = per_thread(self._worker)
+            return run_batch(
+                files,
+                lambda path: worker().decrypt_file(path, password, method, output_dir),
+                jobs,
+            )
+
+    def verify_file(self, file_path: str, password: str, jobs: int = 1) -> str:
+        """Check that an AES-encrypted file is intact without decrypting it to disk.
+
+        Args:
+            file_path: Path to the encrypted file
+            password: The password used for encryption
+            jobs: Number of worker processes. Default: 1
+
+        Returns:
+            str: Success message
+        """
+        self.aes_cipher.verify_file(file_path, password, jobs)
+        return "File verified successfully"
+
+    def verify_directory(
+        self,
+        directory: str,
+        password: str,
+        include: list[str] | None = None,
+        exclude: list[str] | None = None,
+        jobs: int = 4,
+    ) -> list[tuple[str, str | None]]:
+        """Verify every matching AES-encrypted file under a directory.
+
+        Files are verified with ``verify_file`` by a pool of ``jobs`` worker
+        threads. Files encrypted together share a salt, so their key is
+        derived once.
+
+        Args:
+            directory: Root directory to walk recursively
+            password: The password used for encryption
+            include: Globs selecting files to verify (default: '*.encrypto')
+            exclude: Globs of files to leave alone
+            jobs: Number of files verified at once. Default: 4
+
+        Returns:
+            list[tuple[str, str | None]]: Each file with its error message, or
+                None if it is intact
+
+        Raises:
+            FatalError: If the directory does not exist
+        """
+        files = select_files(directory, include or ["*.encrypto"], exclude)
+        with shared_key_cache(self.aes_cipher):
+            worker = per_thread(self._worker)
+            return run_batch(
+                files, lambda path: worker().verify_file(path, password), jobs
+            )
+
+    def decrypt_file_range(
+        self,
+        file_path: str,
+        password: str,
+        start: int,
+        end: int | None = None,
+        method: str = "aes",
+    ) -> bytes:
+        """Decrypt a byte range of an encrypted file.
+
+        Args:
+            file_path: Path to the encrypted file
+            password: The password used for encryption
+            start: First plaintext byte to return
+            end: Plaintext byte to stop before, or None for the end of the file
+            method: Decryption method; only 'aes' supports ranges. Default: 'aes'
+
+        Returns:
+            bytes: The decrypted bytes of the range
+
+        Raises:
+            ValueError: If the method does not support range decryption
+        """
+        if method.lower() == "pgp":
+            raise ValueError("Range decryption is only supported for AES files")
+        return self.aes_cipher.decrypt_range(file_path, password, start, end)
+
     def decrypt_image(
         self,
         image_path: str,
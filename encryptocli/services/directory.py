@@ -0,0 +1,150 @@
+"""File selection and concurrent processing for directory operations."""
+
+import fnmatch
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, TypeVar
+
+from encryptocli.encryption.aes import AESCipher
+from encryptocli.util.exceptions import FatalError
+from encryptocli.util.key_gen import KeyCache
+
+# Outputs of earlier runs, never picked up when encrypting a directory
+ENCRYPTED_PATTERNS = (
+    "*.encrypto",
+    "*.encrypto.journal",
+    "*.encrypto.manifest",
+    "*.pgp",
+    "*.gpg",
+)
+
+T = TypeVar("T")
+
+
+def select_files(
+    directory: str,
+    include: Iterable[str] | None = None,
+    exclude: Iterable[str] | None = None,
+) -> list[str]:
+    """List the files under a directory that match the glob filters.
+
+    Patterns containing ``/`` are matched against the path relative to
+    ``directory``; other patterns are matched against the file name.
+
+    Args:
+        directory: Root directory to walk recursively.
+        include: Globs a file must match at least one of (default: all).
+        exclude: Globs that remove a file from the selection.
+
+    Returns:
+        list[str]: Matching file paths in sorted order.
+
+    Raises:
+        FatalError: If ``directory`` is not a directory.
+    """
+    root = Path(directory)
+    if not root.is_dir():
+        raise FatalError(f"Directory not found: {directory}")
+
+    include = list(include or ["*"])
+    exclude = list(exclude or [])
+    selected = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = Path(dirpath, filename)
+            relative = path.relative_to(root).as_posix()
+            if _matches(relative, include) and not _matches(relative, exclude):
+                selected.append(str(path))
+    return sorted(selected)
+
+
+def run_batch(
+    paths: Iterable[str], action: Callable[[str], object], jobs: int
+) -> list[tuple[str, str | None]]:
+    """Apply ``action`` to every path on a bounded pool of worker threads.
+
+    A failure is recorded against its file and does not stop the batch.
+
+    Args:
+        paths: Files to process.
+        action: Callable run once per path.
+        jobs: Maximum number of files processed at once.
+
+    Returns:
+        list[tuple[str, str | None]]: Each path with its error message, or
+            None if it succeeded, in input order.
+    """
+
+    def run(path: str) -> tuple[str, str | None]:
+        try:
+            action(path)
+        except Exception as exc:
+            return path, str(exc) or type(exc).__name__
+        return path, None
+
+    with ThreadPoolExecutor(max(1, jobs)) as executor:
+        return list(executor.map(run, paths))
+
+
+def per_thread(factory: Callable[[], T]) -> Callable[[], T]:
+    """Return a getter that builds one object for each thread calling it.
+
+    Batch workers use it to get ciphers of their own: the ciphers keep
+    per-call state, and PGP ciphers hold a gpg handle, so one instance must
+    not be shared by threads.
+
+    Args:
+        factory: Builds the object the first time a thread asks for it.
+
+    Returns:
+        Callable[[], T]: The getter.
+    """
+    local = threading.local()
+
+    def get() -> T:
+        if not hasattr(local, "value"):
+            local.value = factory()
+        value: T = local.value
+        return value
+
+    return get
+
+
+@contextmanager
+def shared_key_cache(cipher: AESCipher) -> Iterator[KeyCache]:
+    """Give an AES cipher a key cache for the duration of a batch.
+
+    Files encrypted under one cache share a salt, so the batch derives its
+    key once, and decrypting them again later also derives it once. A cache
+    installed here is wiped when the batch ends; one the cipher already has
+    is left in place.
+
+    Args:
+        cipher: The AES cipher the batch runs through.
+
+    Yields:
+        KeyCache: The cache in use.
+    """
+    if cipher.key_cache is not None:
+        yield cipher.key_cache
+        return
+
+    cache = KeyCache()
+    cipher.key_cache = cache
+    try:
+        yield cache
+    finally:
+        cipher.key_cache = None
+        cache.wipe()
+
+
+def _matches(relative: str, patterns: list[str]) -> bool:
+    """Check a relative path against name or path globs."""
+    name = relative.rsplit("/", 1)[-1]
+    return any(
+        fnmatch.fnmatch(relative if "/" in pattern else name, pattern)
+        for pattern in patterns
+    )
@@ -1,21 +1,68 @@
 """Core encryption business logic service."""
 
-from encryptocli.encryption.aes import AESCipher
+from typing import BinaryIO, Iterable, Iterator
+
+from encryptocli.encryption.aes import AESCipher, aead
+from encryptocli.services.directory import (
+    ENCRYPTED_PATTERNS,
+    per_thread,
+    run_batch,
+    select_files,
+    shared_key_cache,
+)
+from encryptocli.services.records import transform_records
 from encryptocli.steganography import get_steganography_handler
+from encryptocli.util.key_gen import DEFAULT_KDF_PROFILE, KeyCache, read_keyfile
+from encryptocli.util.output import DEFAULT_FSYNC_POLICY
 
 
 class EncryptionService:
     """Handle encryption logic without UI dependencies."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        key_cache: KeyCache | None = None,
+        keyfile: str | None = None,
+        fsync_policy: str = DEFAULT_FSYNC_POLICY,
+    ) -> None:
         """Initialize encryption service with cipher instances.
 
+        Args:
+            key_cache: Optional derived-key cache shared with the AES cipher.
+            keyfile: Optional path to a keyfile. When given, AES keys come
+                from the keyfile and passwords are ignored.
+            fsync_policy: How output files are synced to disk: 'none', 'end'
+                (default) or a size in MiB such as '64MB'.
+
         Returns:
             None
+
+        Raises:
+            FatalError: If the keyfile can not be read or is too short.
+            ValueError: If the fsync policy is not recognized.
         """
-        self.aes_cipher = AESCipher()
+        self.fsync_policy = fsync_policy
+        if keyfile is None:
+            self.aes_cipher = AESCipher(key_cache, fsync_policy=fsync_policy)
+        else:
+            self.aes_cipher = AESCipher.from_keyfile(keyfile, key_cache, fsync_policy)
         self._pgp_cipher = None  # Lazy initialization
 
+    def _worker(self) -> "EncryptionService":
+        """Return a service with ciphers of its own for one batch thread.
+
+        The AES key cache and key material are shared, so the batch still
+        derives each key once.
+
+        Returns:
+            EncryptionService: The worker's service
+        """
+        worker = EncryptionService(fsync_policy=self.fsync_policy)
+        worker.aes_cipher = AESCipher(
+            self.aes_cipher.key_cache, self.aes_cipher.key_material, self.fsync_policy
+        )
+        return worker
+
     def _get_pgp_cipher(self):
         """Get PGP cipher instance, initializing lazily if needed.
 
@@ -29,7 +76,7 @@ class EncryptionService:
             try:
                 from encryptocli.encryption.pgp import PGPCipher
 
-                self._pgp_cipher = PGPCipher()
+                self._pgp_cipher = PGPCipher(fsync_policy=self.fsync_policy)
             except OSError as e:
                 raise OSError(
                     f"GPG (GNU Privacy Guard) is not installed on your system. "
@@ -46,6 +93,7 @@ class EncryptionService:
         recipient_email: str | None = None,
         recipient_key: str | None = None,
         recipient_key_file: str | None = None,
+        kdf_profile: str = DEFAULT_KDF_PROFILE,
     ) -> str:
         """Encrypt text to cipher text.
 
@@ -56,6 +104,7 @@ class EncryptionService:
             recipient_email: For PGP: recipient's email address
             recipient_key: For PGP: recipient's public key as string
             recipient_key_file: For PGP: path to recipient's public key file
+            kdf_profile: For AES: KDF cost profile ('fast', 'interactive', 'strong')
 
         Returns:
             str: The encrypted text
@@ -68,7 +117,208 @@ class EncryptionService:
                 recipient_key_file=recipient_key_file,
             )
             return encrypted
-        return self.aes_cipher.encrypt_text(secret, password)
+        return self.aes_cipher.encrypt_text(secret, password, kdf_profile)
+
+    def encrypt_texts(
+        self,
+        secrets: Iterable[str],
+        password: str,
+        method: str = "aes",
+        recipient_email: str | None = None,
+        recipient_key: str | None = None,
+        recipient_key_file: str | None = None,
+        kdf_profile: str = DEFAULT_KDF_PROFILE,
+    ) -> Iterator[str]:
+        """Encrypt many texts, deriving the AES key only once.
+
+        Args:
+            secrets: The texts to encrypt
+            password: The password for AES encryption
+            method: Encryption method ('aes' or 'pgp'). Default: 'aes'
+            recipient_email: For PGP: recipient's email address
+            recipient_key: For PGP: recipient's public key as string
+            recipient_key_file: For PGP: path to recipient's public key file
+            kdf_profile: For AES: KDF cost profile ('fast', 'interactive', 'strong')
+
+        Returns:
+            Iterator[str]: The encrypted texts, in input order
+        """
+        if method.lower() == "pgp":
+            pgp = self._get_pgp_cipher()
+            return (
+                pgp.encrypt_text(
+                    secret,
+                    recipient_email=recipient_email,
+                    recipient_key=recipient_key,
+                    recipient_key_file=recipient_key_file,
+                )
+                for secret in secrets
+            )
+        return self.aes_cipher.encrypt_texts(secrets, password, kdf_profile)
+
+    def encrypt_records(
+        self,
+        lines: Iterable[str],
+        password: str,
+        method: str = "aes",
+        record_format: str = "lines",
+        field: str = "value",
+        recipient_email: str | None = None,
+        recipient_key: str | None = None,
+        recipient_key_file: str | None = None,
+        kdf_profile: str = DEFAULT_KDF_PROFILE,
+    ) -> Iterator[str]:
+        """Encrypt newline- or JSONL-delimited records as a stream.
+
+        Args:
+            lines: Input lines, for example an open file or stdin
+            password: The password for AES encryption
+            method: Encryption method ('aes' or 'pgp'). Default: 'aes'
+            record_format: 'lines' or 'jsonl'. Default: 'lines'
+            field: For JSONL objects: the key to encrypt. Default: 'value'
+            recipient_email: For PGP: recipient's email address
+            recipient_key: For PGP: recipient's public key as string
+            recipient_key_file: For PGP: path to recipient's public key file
+            kdf_profile: For AES: KDF cost profile ('fast', 'interactive', 'strong')
+
+        Returns:
+            Iterator[str]: Output records, one per input record
+        """
+        return transform_records(
+            lines,
+            lambda secrets: self.encrypt_texts(
+                secrets,
+                password,
+                method,
+                recipient_email,
+                recipient_key,
+                recipient_key_file,
+                kdf_profile,
+            ),
+            record_format,
+            field,
+        )
+
+    def encrypt_stream(
+        self,
+        src: BinaryIO,
+        dst: BinaryIO,
+        password: str,
+        method: str = "aes",
+        recipient_email: str | None = None,
+        recipient_key: str | None = None,
+        recipient_key_file: str | None = None,
+        kdf_profile: str = DEFAULT_KDF_PROFILE,
+        jobs: int = 1,
+        compression: str | None = None,
+        compression_level: int | None = None,
+        digest_algorithm: str | None = None,
+    ) -> None:
+        """Encrypt a binary stream, such as stdin, to another stream.
+
+        Args:
+            src: Binary stream to read plaintext from
+            dst: Binary stream to write ciphertext to
+            password: The password for AES encryption
+            method: Encryption method ('aes', an AEAD method, or 'pgp')
+            recipient_email: For PGP: recipient's email address
+            recipient_key: For PGP: recipient's public key as string
+            recipient_key_file: For PGP: path to recipient's public key file
+            kdf_profile: For AES: KDF cost profile ('fast', 'interactive', 'strong')
+            jobs: For AES: number of worker processes. Default: 1
+            compression: For AES: 'zlib', 'lzma' or None. Default: None
+            compression_level: For AES: compression level from 0 to 9
+            digest_algorithm: For AES: hashing algorithm to store a plaintext
+                digest with, computed while encrypting. Default: None
+
+        Returns:
+            None
+        """
+        if method.lower() == "pgp":
+            self._get_pgp_cipher().encrypt_stream(
+                src, dst, recipient_email, recipient_key, recipient_key_file
+            )
+            return
+        engine = aead.METHODS.get(method.lower(), "fernet")
+        self.aes_cipher.encrypt_stream(
+            src,
+            dst,
+            password,
+            kdf_profile=kdf_profile,
+            jobs=jobs,
+            engine=engine,
+            compression=compression,
+            compression_level=compression_level,
+            digest_algorithm=digest_algorithm,
+        )
+
+    def encrypt_directory(
+        self,
+        directory: str,
+        password: str,
+        method: str = "aes",
+        include: list[str] | None = None,
+        exclude: list[str] | None = None,
+        jobs: int = 4,
+        recipient_email: str | None = None,
+        recipient_key: str | None = None,
+        recipient_key_file: str | None = None,
+        kdf_profile: str = DEFAULT_KDF_PROFILE,
+        compression: str | None = None,
+        compression_level: int | None = None,
+        digest_algorithm: str | None = None,
+    ) -> list[tuple[str, str | None]]:
+        """Encrypt every matching file under a directory.
+
+        Files are encrypted with ``encrypt_file`` by a pool of ``jobs``
+        worker threads that share one derived key. Every thread has AES and
+        PGP ciphers of its own, so both methods run in parallel. Files that
+        are already encrypted are skipped.
+
+        Args:
+            directory: Root directory to walk recursively
+            password: The password for AES encryption
+            method: Encryption method, as for ``encrypt_file``
+            include: Globs selecting files to encrypt (default: all files)
+            exclude: Globs of files to leave alone
+            jobs: Number of files encrypted at once. Default: 4
+            recipient_email: For PGP: recipient's email address
+            recipient_key: For PGP: recipient's public key as string
+            recipient_key_file: For PGP: path to recipient's public key file
+            kdf_profile: For AES: KDF cost profile ('fast', 'interactive', 'strong')
+            compression: For AES: 'zlib', 'lzma' or None. Default: None
+            compression_level: For AES: compression level from 0 to 9
+            digest_algorithm: For AES: hashing algorithm to store a plaintext
+                digest with in every file. Default: None
+
+        Returns:
+            list[tuple[str, str | None]]: Each file with its error message, or
+                None if it was encrypted
+
+        Raises:
+            FatalError: If the directory does not exist
+        """
+        files = select_files(
+            directory, include, [*(exclude or []), *ENCRYPTED_PATTERNS]
+        )
+        with shared_key_cache(self.aes_cipher):
+            worker = per_thread(self._worker)
+            return run_batch(
+                files,
+                lambda path: worker().encrypt_file(
+                    path,
+                    password,
+                    method,
+                    recipient_email,
+                    recipient_key,
+                    recipient_key_file,
+                    kdf_profile,
+                    compression=compression,
+                    compression_level=compression_level,
+                    digest_algorithm=digest_algorithm,
+                ),
+                jobs,
+            )
 
     def encrypt_text_to_image(
         self,
@@ -81,6 +331,7 @@ class EncryptionService:
         recipient_email: str | None = None,
         recipient_key: str | None = None,
         recipient_key_file: str | None = None,
+        kdf_profile: str = DEFAULT_KDF_PROFILE,
     ) -> str:
         """Encrypt text and embed it into an image using steganography.
 
@@ -95,6 +346,7 @@ class EncryptionService:
             recipient_email: For PGP: recipient's email address
             recipient_key: For PGP: recipient's public key as string
             recipient_key_file: For PGP: path to recipient's public key file
+            kdf_profile: For AES: KDF cost profile ('fast', 'interactive', 'strong')
 
         Returns:
             str: Success message.
@@ -107,9 +359,9 @@ class EncryptionService:
                 recipient_key_file=recipient_key_file,
             )
         else:
-            encrypted_text = self.aes_cipher.encrypt_text(secret, password)
+            encrypted_text = self.aes_cipher.encrypt_text(secret, password, kdf_profile)
         steg = get_steganography_handler(steganography)
-        steg.encrypt_text(image_path, encrypted_text, output_dir)
+        steg.encrypt_text(image_path, encrypted_text, output_dir, self.fsync_policy)
         return "Image encrypted and saved successfully"
 
     def encrypt_file(
@@ -120,16 +372,34 @@ class EncryptionService:
         recipient_email: str | None = None,
         recipient_key: str | None = None,
         recipient_key_file: str | None = None,
+        kdf_profile: str = DEFAULT_KDF_PROFILE,
+        jobs: int = 1,
+        compression: str | None = None,
+        compression_level: int | None = None,
+        resume: bool = False,
+        incremental: bool = False,
+        digest_algorithm: str | None = None,
     ) -> str:
         """Encrypt a file.
 
         Args:
             file_path: Path to the file to encrypt
             password: The password for AES encryption
-            method: Encryption method ('aes' or 'pgp'). Default: 'aes'
+            method: Encryption method ('aes', 'aead', 'aes-gcm', 'chacha20' or
+                'pgp'). Default: 'aes'. The AEAD methods write raw binary
+                segments; 'aead' picks AES-GCM or ChaCha20 by CPU support.
             recipient_email: For PGP: recipient's email address
             recipient_key: For PGP: recipient's public key as string
             recipient_key_file: For PGP: path to recipient's public key file
+            kdf_profile: For AES: KDF cost profile ('fast', 'interactive', 'strong')
+            jobs: For AES: number of worker processes. Default: 1
+            compression: For AES: 'zlib', 'lzma' or None. Default: None
+            compression_level: For AES: compression level from 0 to 9
+            resume: For AES: checkpoint progress and continue an interrupted run
+            incremental: For AES: chunk by content and reuse unchanged chunks
+                of the existing output
+            digest_algorithm: For AES: hashing algorithm to store a plaintext
+                digest with, computed while encrypting. Default: None
 
         Returns:
             str: Result message
@@ -142,4 +412,147 @@ class EncryptionService:
                 recipient_key_file=recipient_key_file,
             )
             return result
-        return self.aes_cipher.encrypt_file(file_path, password)
+        engine = aead.METHODS.get(method.lower(), "fernet")
+        return self.aes_cipher.encrypt_file(
+            file_path,
+            password,
+            kdf_profile=kdf_profile,
+            jobs=jobs,
+            engine=engine,
+            compression=compression,
+            compression_level=compression_level,
+            resume=resume,
+            incremental=incremental,
+            digest_algorithm=digest_algorithm,
+        )
+
+    def rekey_file(
+        self,
+        file_path: str,
+        password: str,
+        new_password: str,
+        kdf_profile: str = DEFAULT_KDF_PROFILE,
+        new_keyfile: str | None = None,
+    ) -> str:
+        """Change the password of an AES encrypted file in place.
+
+        Only the wrapped data key in the header is rewritten; the encrypted
+        payload is left as it is.
+
+        Args:
+            file_path: Path to the encrypted file
+            password: The current password
+            new_password: The password to protect the file with
+            kdf_profile: KDF cost profile for the new password ('fast',
+                'interactive', 'strong')
+            new_keyfile: Path to a keyfile to protect the file with instead
+                of new_password
+
+        Returns:
+            str: Result message
+        """
+        return self.aes_cipher.rekey_file(
+            file_path,
+            password,
+            new_password,
+            kdf_profile,
+            None if new_keyfile is None else read_keyfile(new_keyfile),
+        )
+
+    def rekey_directory(
+        self,
+        directory: str,
+        password: str,
+        new_password: str,
+        include: list[str] | None = None,
+        exclude: list[str] | None = None,
+        jobs: int = 4,
+        kdf_profile: str = DEFAULT_KDF_PROFILE,
+        new_keyfile: str | None = None,
+    ) -> list[tuple[str, str | None]]:
+        """Change the password of every matching encrypted file under a directory.
+
+        Files are rekeyed by a pool of ``jobs`` worker threads, each with a
+        cipher of its own, that share one derived key per password.
+
+        Args:
+            directory: Root directory to walk recursively
+            password: The current password
+            new_password: The password to protect the files with
+            include: Globs selecting files to rekey (default: '*.encrypto')
+            exclude: Globs of files to leave alone
+            jobs: Number of files rekeyed at once. Default: 4
+            kdf_profile: KDF cost profile for the new password
+            new_keyfile: Path to a keyfile to protect the files with instead
+                of new_password
+
+        Returns:
+            list[tuple[str, str | None]]: Each file with its error message, or
+                None if it was rekeyed
+
+        Raises:
+            FatalError: If the directory does not exist
+        """
+        files = select_files(directory, include or ["*.encrypto"], exclude)
+        with shared_key_cache(self.aes_cipher):
+            worker = per_thread(self._worker)
+            return run_batch(
+                files,
+                lambda path: worker().rekey_file(
+                    path, password, new_password, kdf_profile, new_keyfile
+                ),
+                jobs,
+            )
+
+    def add_key_slot(
+        self,
+        file_path: str,
+        password: str,
+        new_password: str,
+        kdf_profile: str = DEFAULT_KDF_PROFILE,
+        new_keyfile: str | None = None,
+    ) -> str:
+        """Add a password or keyfile that opens an AES encrypted file.
+
+        Args:
+            file_path: Path to the encrypted file
+            password: A password that already opens the file
+            new_password: The password to add
+            kdf_profile: KDF cost profile for the new password ('fast',
+                'interactive', 'strong')
+            new_keyfile: Path to a keyfile to add instead of new_password
+
+        Returns:
+            str: Result message
+        """
+        return self.aes_cipher.add_key_slot(
+            file_path,
+            password,
+            new_password,
+            kdf_profile,
+            None if new_keyfile is None else read_keyfile(new_keyfile),
+        )
+
+    def remove_key_slot(self, file_path: str, password: str, slot: int) -> str:
+        """Remove a key slot from an AES encrypted file.
+
+        Args:
+            file_path: Path to the encrypted file
+            password: A password that opens the file
+            slot: Position of the slot to remove
+
+        Returns:
+            str: Result message
+        """
+        return self.aes_cipher.remove_key_slot(file_path, password, slot)
+
+    def list_key_slots(self, file_path: str) -> list[dict]:
+        """Describe the key slots of an AES encrypted file.
+
+        Args:
+            file_path: Path to the encrypted file
+
+        Returns:
+            list[dict]: The KDF parameters of each slot, in slot order
+        """
+        return self.aes_cipher.list_key_slots(file_path)
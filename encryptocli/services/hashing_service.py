@@ -1,11 +1,24 @@
 """Core hashing business logic service."""
 
 import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Any, Callable
+from typing import Any, BinaryIO, Callable, Iterable, Iterator
 
 from blake3 import blake3
 
+from encryptocli.services.directory import select_files
+from encryptocli.util.file_handling import (
+    READ_BUFFER_SIZE,
+    iter_stream_views,
+    open_input,
+)
+
+# Read size for multithreaded BLAKE3: each update is split across the
+# threads, so it needs to be large for all of them to have work
+PARALLEL_CHUNK_SIZE = 16 * 1024 * 1024
+
 
 class HashingService:
     """Handle hashing logic without UI dependencies."""
@@ -26,6 +39,26 @@ class HashingService:
         "BLAKE3": blake3,
     }
 
+    def __init__(self, buffer_size: int = READ_BUFFER_SIZE, threads: int = 1) -> None:
+        """Initialize the hashing service.
+
+        Args:
+            buffer_size: Bytes read and hashed at a time. Files are read in
+                chunks of this size from a memory map when large, and into
+                a single reused buffer otherwise.
+            threads: Threads BLAKE3 may hash one input with, or 0 for one
+                per CPU core. Other algorithms are inherently sequential.
+
+        Raises:
+            ValueError: If buffer_size is not positive or threads is negative
+        """
+        if buffer_size < 1:
+            raise ValueError("Buffer size must be positive")
+        if threads < 0:
+            raise ValueError("Thread count must be 0 (all cores) or more")
+        self.buffer_size = buffer_size
+        self.threads = threads
+
     def hash_text(self, text: str, algorithm: str) -> str:
         """Hash text using the specified algorithm.
 
@@ -60,18 +93,171 @@ class HashingService:
             ValueError: If algorithm is not supported
             FileNotFoundError: If file does not exist
         """
-        if algorithm not in self.ALGORITHMS:
-            raise ValueError(f"Unsupported algorithm: {algorithm}")
+        return self.hash_file_multi(file_path, [algorithm])[algorithm]
+
+    def hash_file_multi(
+        self, file_path: str, algorithms: Iterable[str]
+    ) -> dict[str, str]:
+        """Hash a file with several algorithms in a single read.
+
+        Each chunk is read once and fed to every hash, whose updates run in
+        parallel threads: hashlib and BLAKE3 release the GIL on large
+        buffers.
+
+        Args:
+            file_path: Path to the file to hash
+            algorithms: The hashing algorithms to use
+
+        Returns:
+            dict[str, str]: The hash digest of each algorithm, in the order
+                given
+
+        Raises:
+            ValueError: If no algorithm is given or one is not supported
+            FileNotFoundError: If file does not exist
+        """
+        hashers = self._new_hashers(algorithms)
 
         path = Path(file_path)
         if not path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
 
-        hash_obj = self.ALGORITHMS[algorithm]()
-        with open(path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_obj.update(chunk)
-        return str(hash_obj.hexdigest())
+        with open_input(file_path) as file:
+            chunks = file.iter_views(self._chunk_size(hashers))
+            _update_all(list(hashers.values()), chunks)
+        return {name: str(hasher.hexdigest()) for name, hasher in hashers.items()}
+
+    def hash_stream(self, stream: BinaryIO, algorithm: str) -> str:
+        """Hash a binary stream, such as stdin, read incrementally.
+
+        Args:
+            stream: Binary stream to read until EOF
+            algorithm: The hashing algorithm to use
+
+        Returns:
+            str: The hash digest
+
+        Raises:
+            ValueError: If algorithm is not supported
+        """
+        return self.hash_stream_multi(stream, [algorithm])[algorithm]
+
+    def hash_stream_multi(
+        self, stream: BinaryIO, algorithms: Iterable[str]
+    ) -> dict[str, str]:
+        """Hash a binary stream with several algorithms in a single read.
+
+        Args:
+            stream: Binary stream to read until EOF
+            algorithms: The hashing algorithms to use
+
+        Returns:
+            dict[str, str]: The hash digest of each algorithm, in the order
+                given
+
+        Raises:
+            ValueError: If no algorithm is given or one is not supported
+        """
+        hashers = self._new_hashers(algorithms)
+        chunks = iter_stream_views(stream, self._chunk_size(hashers))
+        _update_all(list(hashers.values()), chunks)
+        return {name: str(hasher.hexdigest()) for name, hasher in hashers.items()}
+
+    def hash_directory(
+        self,
+        directory: str,
+        algorithms: Iterable[str],
+        include: list[str] | None = None,
+        exclude: list[str] | None = None,
+        jobs: int = 4,
+        processes: bool = False,
+        skip: Iterable[str] | None = None,
+    ) -> list[tuple[str, dict[str, str] | None, str | None]]:
+        """Hash every matching file under a directory.
+
+        Files are hashed with ``hash_file_multi`` by a pool of ``jobs``
+        worker threads, or worker processes when ``processes`` is set: many
+        small files are bound by per-file Python work, which threads can
+        not spread across cores.
+
+        Args:
+            directory: Root directory to walk recursively
+            algorithms: The hashing algorithms to use
+            include: Globs selecting files to hash (default: all)
+            exclude: Globs of files to leave out
+            jobs: Number of files hashed at once. Default: 4
+            processes: Hash in worker processes instead of threads
+            skip: Paths never hashed, such as a manifest being written into
+                the directory
+
+        Returns:
+            list[tuple[str, dict[str, str] | None, str | None]]: Each file's
+                path as reached from the working directory (``directory``
+                joined with the path inside it, as ``find`` prints it), its
+                digests and its error message, with one of the last two
+                None, sorted by path
+
+        Raises:
+            ValueError: If no algorithm is given or one is not supported
+            FatalError: If the directory does not exist
+        """
+        algorithms = list(self._new_hashers(algorithms))
+        skipped = {os.path.realpath(path) for path in skip or []}
+        files = [
+            path
+            for path in select_files(directory, include, exclude)
+            if os.path.realpath(path) not in skipped
+        ]
+        named = sorted((Path(path).as_posix(), path) for path in files)
+        tasks = [
+            (path, algorithms, self.buffer_size, self.threads) for _, path in named
+        ]
+        pool = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        with pool(max(1, jobs)) as executor:
+            # Batches keep inter-process overhead low on trees of small files
+            results = executor.map(_hash_task, tasks, chunksize=16)
+            return [
+                (name, digests, error)
+                for (name, _), (digests, error) in zip(named, results)
+            ]
+
+    def check_manifest(
+        self,
+        entries: Iterable[tuple[str, str, str]],
+        jobs: int = 4,
+        processes: bool = False,
+    ) -> Iterator[tuple[str, str | None]]:
+        """Verify files against expected digests, yielding results as they finish.
+
+        Files are hashed by a pool of ``jobs`` worker threads, or worker
+        processes when ``processes`` is set, largest first: a big file
+        started last would leave the other workers idle while it runs.
+
+        Args:
+            entries: The path, algorithm and hex digest of each file, as
+                read by ``manifest.read_manifest``
+            jobs: Number of files hashed at once. Default: 4
+            processes: Hash in worker processes instead of threads
+
+        Yields:
+            tuple[str, str | None]: Each path with its error message, or
+                None if its digest matches, in order of completion
+        """
+        pending = sorted(entries, key=lambda entry: -_file_size(entry[0]))
+        pool = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        with pool(max(1, jobs)) as executor:
+            futures = {
+                executor.submit(
+                    _hash_task, (path, [algorithm], self.buffer_size, self.threads)
+                ): (path, algorithm, digest)
+                for path, algorithm, digest in pending
+            }
+            for future in as_completed(futures):
+                path, algorithm, digest = futures[future]
+                digests, error = future.result()
+                if digests is not None and digests[algorithm] != digest.lower():
+                    error = "Checksum does not match"
+                yield path, error
 
     def get_available_algorithms(self) -> list[str]:
         """Get list of available hashing algorithms.
@@ -80,3 +266,64 @@ class HashingService:
             list[str]: List of algorithm names
         """
         return sorted(list(self.ALGORITHMS.keys()))
+
+    def _new_hashers(self, algorithms: Iterable[str]) -> dict[str, Any]:
+        """Create a fresh hash object for each distinct algorithm.
+
+        Raises:
+            ValueError: If no algorithm is given or one is not supported
+        """
+        hashers = {}
+        for algorithm in algorithms:
+            if algorithm not in self.ALGORITHMS:
+                raise ValueError(f"Unsupported algorithm: {algorithm}")
+            if algorithm not in hashers:
+                hashers[algorithm] = self._new_hash(algorithm)
+        if not hashers:
+            raise ValueError("No hashing algorithm given")
+        return hashers
+
+    def _new_hash(self, algorithm: str) -> Any:
+        """Create a hash object, letting BLAKE3 use the configured threads."""
+        if algorithm == "BLAKE3" and self.threads != 1:
+            return blake3(max_threads=self.threads or blake3.AUTO)
+        return self.ALGORITHMS[algorithm]()
+
+    def _chunk_size(self, hashers: dict[str, Any]) -> int:
+        """Return the read size, larger when BLAKE3 hashes with threads."""
+        if "BLAKE3" in hashers and self.threads != 1:
+            return max(self.buffer_size, PARALLEL_CHUNK_SIZE)
+        return self.buffer_size
+
+
+def _update_all(hashers: list[Any], chunks: Iterable[bytes | memoryview]) -> None:
+    """Feed every chunk to every hash, updating the hashes in parallel."""
+    if len(hashers) == 1:
+        for chunk in chunks:
+            hashers[0].update(chunk)
+        return
+    with ThreadPoolExecutor(len(hashers)) as executor:
+        for chunk in chunks:
+            # Finish with a chunk before the next read may reuse its buffer
+            for future in [executor.submit(hasher.update, chunk) for hasher in hashers]:
+                future.result()
+
+
+def _file_size(path: str) -> int:
+    """Return the size of a file, or 0 if it can not be read."""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _hash_task(
+    task: tuple[str, list[str], int, int],
+) -> tuple[dict[str, str] | None, str | None]:
+    """Hash one file of a directory, in a worker thread or process."""
+    path, algorithms, buffer_size, threads = task
+    try:
+        service = HashingService(buffer_size, threads)
+        return service.hash_file_multi(path, algorithms), None
+    except Exception as exc:
+        return None, str(exc) or type(exc).__name__
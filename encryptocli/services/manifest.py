@@ -0,0 +1,159 @@
+"""Checksum manifests in the formats of GNU coreutils and BSD.
+
+A GNU manifest has one ``<digest>  <path>`` line per file, as written by
+``sha256sum``. A BSD manifest has ``<ALGORITHM> (<path>) = <digest>``
+lines, as written by BSD ``sha256`` or ``sha256sum --tag``; because each
+line names its algorithm, one manifest can hold several.
+
+Paths containing a backslash, newline or carriage return are escaped the
+way coreutils does it: the line starts with a backslash and those
+characters are written as ``\\\\``, ``\\n`` and ``\\r``.
+
+Reading accepts both formats, even mixed in one manifest, and the binary
+mode marker ``*`` of GNU lines.
+"""
+
+import re
+
+GNU = "gnu"
+BSD = "bsd"
+FORMATS = (GNU, BSD)
+
+# BSD tags that are not simply the HashingService algorithm name
+_BSD_TAGS = {
+    "SHA3_224": "SHA3-224",
+    "SHA3_256": "SHA3-256",
+    "SHA3_384": "SHA3-384",
+    "SHA3_512": "SHA3-512",
+    "BLAKE2S": "BLAKE2s",
+    "BLAKE2B": "BLAKE2b",
+}
+_ALGORITHMS_BY_TAG = {tag: algorithm for algorithm, tag in _BSD_TAGS.items()}
+
+_GNU_LINE = re.compile(r"^([0-9a-fA-F]+) [ *](.+)$", re.DOTALL)
+_BSD_LINE = re.compile(r"^([A-Za-z0-9_-]+) \((.+)\) = ([0-9a-fA-F]+)$", re.DOTALL)
+_UNESCAPES = {"\\\\": "\\", "\\n": "\n", "\\r": "\r"}
+
+
+def check_format(manifest_format: str, algorithms: list[str]) -> None:
+    """Check that a manifest format can hold the given algorithms.
+
+    Args:
+        manifest_format: ``gnu`` or ``bsd``.
+        algorithms: The algorithms the manifest will hold.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If the format is unknown, or it is ``gnu`` and more than
+            one algorithm is given.
+    """
+    if manifest_format not in FORMATS:
+        raise ValueError(
+            f"Unknown manifest format: {manifest_format} (use {' or '.join(FORMATS)})"
+        )
+    if manifest_format == GNU and len(algorithms) > 1:
+        raise ValueError(
+            "A GNU manifest holds a single algorithm; use the bsd format for several"
+        )
+
+
+def format_line(manifest_format: str, path: str, algorithm: str, digest: str) -> str:
+    """Format one manifest line, without its line ending.
+
+    Args:
+        manifest_format: ``gnu`` or ``bsd``.
+        path: The file path recorded in the manifest.
+        algorithm: The ``HashingService`` algorithm of the digest.
+        digest: The hex digest.
+
+    Returns:
+        str: The manifest line.
+    """
+    escaped = _escape(path)
+    prefix = "\\" if escaped != path else ""
+    if manifest_format == GNU:
+        return f"{prefix}{digest}  {escaped}"
+    return f"{prefix}{_BSD_TAGS.get(algorithm, algorithm)} ({escaped}) = {digest}"
+
+
+def parse_line(line: str, default_algorithm: str) -> tuple[str, str, str] | None:
+    """Parse one manifest line in either format.
+
+    Args:
+        line: The line, without its line ending.
+        default_algorithm: Algorithm of GNU lines, which do not name one.
+
+    Returns:
+        tuple[str, str, str] | None: The path, algorithm and lower-case
+            digest, or None if the line is not a checksum line.
+    """
+    escaped = line.startswith("\\")
+    if escaped:
+        line = line[1:]
+    match = _BSD_LINE.match(line)
+    if match is not None:
+        tag, path, digest = match.groups()
+        algorithm = _ALGORITHMS_BY_TAG.get(tag, tag.upper())
+    else:
+        match = _GNU_LINE.match(line)
+        if match is None:
+            return None
+        digest, path = match.groups()
+        algorithm = default_algorithm
+    if escaped:
+        path = _unescape(path)
+        if path is None:
+            return None
+    return path, algorithm, digest.lower()
+
+
+def read_manifest(
+    manifest_path: str, default_algorithm: str
+) -> tuple[list[tuple[str, str, str]], int]:
+    """Read the checksum lines of a manifest file.
+
+    Relative paths are left relative to the working directory, as
+    ``sha256sum -c`` and BSD tools treat them.
+
+    Args:
+        manifest_path: Path to the manifest.
+        default_algorithm: Algorithm of GNU lines, which do not name one.
+
+    Returns:
+        tuple[list[tuple[str, str, str]], int]: The path, algorithm and
+            digest of each entry in manifest order, and the number of
+            non-blank lines that are not checksum lines.
+
+    Raises:
+        FileNotFoundError: If the manifest does not exist.
+    """
+    entries = []
+    malformed = 0
+    with open(manifest_path, encoding="utf-8", errors="surrogateescape") as handle:
+        for line in handle:
+            line = line.rstrip("\r\n")
+            if not line.strip():
+                continue
+            entry = parse_line(line, default_algorithm)
+            if entry is None:
+                malformed += 1
+                continue
+            entries.append(entry)
+    return entries, malformed
+
+
+def _unescape(path: str) -> str | None:
+    """Undo ``_escape``; None if the path holds an unknown escape."""
+    parts = re.split(r"(\\.?)", path, flags=re.DOTALL)
+    for position in range(1, len(parts), 2):
+        if parts[position] not in _UNESCAPES:
+            return None
+        parts[position] = _UNESCAPES[parts[position]]
+    return "".join(parts)
+
+
+def _escape(path: str) -> str:
+    """Escape the characters a manifest line can not hold literally."""
+    return path.replace("\\", "\\\\").replace("\n", "\\n").replace("\r", "\\r")
@@ -0,0 +1,91 @@
+"""Record framing for batch text encryption and decryption."""
+
+import json
+from collections import deque
+from typing import Any, Callable, Iterable, Iterator
+
+from encryptocli.util.exceptions import FatalError
+
+RECORD_FORMATS = ("lines", "jsonl")
+
+
+def transform_records(
+    lines: Iterable[str],
+    transform: Callable[[Iterator[str]], Iterator[str]],
+    record_format: str = "lines",
+    field: str = "value",
+) -> Iterator[str]:
+    """Apply a batch text transform to newline- or JSONL-delimited records.
+
+    ``lines`` records are whole lines. ``jsonl`` records are JSON strings, or
+    objects whose ``field`` is transformed and whose other keys pass through
+    unchanged. Records are streamed: only the record currently being
+    transformed is held in memory.
+
+    Args:
+        lines: Input lines, for example an open file or ``sys.stdin``.
+        transform: Batch function mapping an iterator of values to an
+            iterator of results in the same order.
+        record_format: ``lines`` or ``jsonl``.
+        field: Object key holding the value for ``jsonl`` records.
+
+    Returns:
+        Iterator[str]: Output lines without trailing newlines.
+
+    Raises:
+        ValueError: If the record format is unknown.
+        FatalError: If a JSONL record is malformed.
+    """
+    if record_format not in RECORD_FORMATS:
+        raise ValueError(
+            f"Unknown record format: {record_format}. "
+            f"Supported formats: {', '.join(RECORD_FORMATS)}"
+        )
+    return _transform(lines, transform, record_format, field)
+
+
+def _transform(
+    lines: Iterable[str],
+    transform: Callable[[Iterator[str]], Iterator[str]],
+    record_format: str,
+    field: str,
+) -> Iterator[str]:
+    """Generator behind ``transform_records``."""
+    pending: deque = deque()
+
+    def values() -> Iterator[str]:
+        for number, line in enumerate(lines, 1):
+            if record_format == "lines":
+                pending.append(None)
+                yield line.rstrip("\r\n")
+                continue
+            if not line.strip():
+                continue
+            record, value = _parse_json_record(line, field, number)
+            pending.append(record)
+            yield value
+
+    for result in transform(values()):
+        record = pending.popleft()
+        if record_format == "lines":
+            yield result
+        elif isinstance(record, dict):
+            yield json.dumps({**record, field: result})
+        else:
+            yield json.dumps(result)
+
+
+def _parse_json_record(line: str, field: str, number: int) -> tuple[Any, str]:
+    """Parse one JSONL record into the record itself and its text value."""
+    try:
+        record = json.loads(line)
+    except ValueError as exc:
+        raise FatalError(f"Invalid JSON record on line {number}") from exc
+
+    value = record.get(field) if isinstance(record, dict) else record
+    if not isinstance(value, str):
+        raise FatalError(
+            f"Record on line {number} must be a string or an object "
+            f"with a string '{field}' field"
+        )
+    return record, value
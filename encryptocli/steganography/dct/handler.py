@@ -3,6 +3,8 @@
 import numpy as np
 from PIL import Image
 
+from encryptocli.util.output import DEFAULT_FSYNC_POLICY, AtomicWriter
+
 
 class DCTSteganography:
     """Hide and reveal secrets using frequency domain steganography.
@@ -22,7 +24,11 @@ class DCTSteganography:
         self.quality = quality
 
     def encrypt_text(
-        self, input_image_path: str, secret: str, output_dir: str = "./"
+        self,
+        input_image_path: str,
+        secret: str,
+        output_dir: str = "./",
+        fsync_policy: str = DEFAULT_FSYNC_POLICY,
     ) -> None:
         """Embed secret text into an image using frequency domain embedding.
 
@@ -33,6 +39,7 @@ class DCTSteganography:
             input_image_path: Path to the input image file (PNG recommended).
             secret: Secret text to hide in the image.
             output_dir: Directory to save the output image (default: current directory).
+            fsync_policy: How the output image is synced to disk (default: "end").
 
         Returns:
             None
@@ -66,7 +73,8 @@ class DCTSteganography:
         # Reshape and save as PNG (lossless) instead of JPEG
         stego_array = flat.reshape(img_array.shape)
         stego_img = Image.fromarray(stego_array.astype(np.uint8), "RGB")
-        stego_img.save(f"{output_dir}encrypto.png")
+        with AtomicWriter(f"{output_dir}encrypto.png", fsync_policy) as out:
+            stego_img.save(out, format="PNG")
 
     def decrypt_image(self, input_image_path: str) -> str:
         """Extract hidden text from an image using frequency domain extraction.
@@ -3,6 +3,8 @@
 import numpy as np
 from PIL import Image
 
+from encryptocli.util.output import DEFAULT_FSYNC_POLICY, AtomicWriter
+
 
 class LSBSteganography:
     """Hide and reveal secrets using least significant bit steganography.
@@ -12,7 +14,11 @@ class LSBSteganography:
     """
 
     def encrypt_text(
-        self, input_image_path: str, secret: str, output_dir: str = "./"
+        self,
+        input_image_path: str,
+        secret: str,
+        output_dir: str = "./",
+        fsync_policy: str = DEFAULT_FSYNC_POLICY,
     ) -> None:
         """Embed secret text into an image and save as encrypto.png in output_dir.
 
@@ -23,6 +29,7 @@ class LSBSteganography:
             input_image_path: Path to the input image file (PNG recommended).
             secret: Secret text to hide in the image.
             output_dir: Directory to save the output image (default: current directory).
+            fsync_policy: How the output image is synced to disk (default: "end").
 
         Returns:
             None
@@ -54,7 +61,8 @@ class LSBSteganography:
         # Reshape and save
         stego_array = flat.reshape(img_array.shape)
         stego_img = Image.fromarray(stego_array.astype(np.uint8), "RGB")
-        stego_img.save(f"{output_dir}encrypto.png")
+        with AtomicWriter(f"{output_dir}encrypto.png", fsync_policy) as out:
+            stego_img.save(out, format="PNG")
 
     def decrypt_image(self, input_image_path: str) -> str:
         """Extract hidden text from an image.
@@ -1,37 +1,278 @@
+"""Reading input files without copying their data more than needed.
+
+``open_input`` picks how a file is read from what it is:
+
+* Regular files of at least ``MMAP_THRESHOLD`` bytes are memory-mapped, and
+  ``read_view`` hands out ``memoryview`` slices of the mapping, so hashing
+  and encryption read the page cache directly.
+* Pipes, devices and small files are read with ``readinto`` into one buffer
+  that is reused for every chunk.
+
+Either way the input is a file-like object with ``read``, ``seek`` and
+``tell``, so code written for plain file objects keeps working, and a
+context manager, so the underlying file is always closed.
+"""
+
+import mmap
 import os
-from typing import BinaryIO
+import stat
+from typing import BinaryIO, Iterator
 
 import encryptocli.util.exceptions as exceptions
 
+# Regular files at least this large are memory-mapped
+MMAP_THRESHOLD = 1024 * 1024
+# Chunk size of read_view, iter_views and iter_stream_views
+READ_BUFFER_SIZE = 1024 * 1024
 
-def get_file(filename: str) -> BinaryIO:
-    """Open and return a file in binary mode after validating its size.
 
-    Opens a file in binary read mode and validates that it does not
-    exceed the maximum supported size of 1 GB.
+def open_input(filename: str, size_limit: int | None = None) -> "InputFile":
+    """Open a file for reading, memory-mapping it when that pays off.
 
     Args:
         filename: Path to the file to open.
+        size_limit: Maximum accepted size in bytes, or None for no limit.
+            Only regular files have a size to check.
 
     Returns:
-        BinaryIO: File object opened in binary read mode.
+        InputFile: The opened input; use it as a context manager.
 
     Raises:
-        FatalError: If file size exceeds 1 GB or file cannot be opened.
+        FileNotFoundError: If the file does not exist.
+        FatalError: If the file exceeds the limit or can not be opened.
     """
-    file_size = os.path.getsize(f"{filename}")
-
-    # Verifying if the file size is less than 1 GB
-    if file_size > 1073741824:
-        raise exceptions.FatalError(
-            "File too large. Only files till 1GB are supported."
-        )
-
-    try:
-        # Opening and reading the file as binary
-        file = open(filename, "rb")
-        return file
-
-    except Exception:
-        # Handling exceptions
-        raise exceptions.FatalError("Ran into an issue while openng file")
+    return InputFile(filename, size_limit)
+
+
+def iter_stream_views(
+    stream: BinaryIO, size: int = READ_BUFFER_SIZE
+) -> Iterator[memoryview]:
+    """Read a stream to its end in chunks, through one reusable buffer.
+
+    Args:
+        stream: Binary stream, such as stdin. Streams without ``readinto``
+            are read with ``read``.
+        size: Chunk size in bytes.
+
+    Yields:
+        memoryview: Each chunk, valid until the next one is requested.
+    """
+    if not hasattr(stream, "readinto"):
+        for chunk in iter(lambda: stream.read(size), b""):
+            yield memoryview(chunk)
+        return
+    buffer = memoryview(bytearray(size))
+    while True:
+        count = stream.readinto(buffer)
+        if not count:
+            return
+        yield buffer[:count]
+
+
+class InputFile:
+    """Binary input file served from a memory map or a reusable buffer."""
+
+    def __init__(
+        self,
+        filename: str,
+        size_limit: int | None = None,
+        mmap_threshold: int = MMAP_THRESHOLD,
+    ) -> None:
+        """Open the file and map it if it is a large regular file.
+
+        Args:
+            filename: Path to the file to open.
+            size_limit: Maximum accepted size in bytes, or None for no limit.
+            mmap_threshold: Smallest regular file that is memory-mapped.
+
+        Returns:
+            None
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            FatalError: If the file exceeds the limit or can not be opened.
+        """
+        self.name = filename
+        try:
+            self._file: BinaryIO = open(filename, "rb")
+        except FileNotFoundError:
+            raise
+        except OSError as exc:
+            raise exceptions.FatalError("Ran into an issue while opening file") from exc
+
+        info = os.fstat(self._file.fileno())
+        # Pipes and devices have no meaningful size
+        self.size: int | None = info.st_size if stat.S_ISREG(info.st_mode) else None
+        if size_limit is not None and self.size is not None and self.size > size_limit:
+            self._file.close()
+            raise exceptions.FatalError(
+                f"File too large. Only files up to {size_limit} bytes are supported."
+            )
+
+        self._map: mmap.mmap | None = None
+        self._view: memoryview | None = None
+        self._position = 0
+        self._buffer: bytearray | None = None
+        if self.size is not None and self.size >= max(mmap_threshold, 1):
+            try:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                # Some filesystems can not be mapped; read them instead
+                self._map = None
+            else:
+                self._view = memoryview(self._map)
+
+    def __enter__(self) -> "InputFile":
+        """Return the input itself."""
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        """Close the input."""
+        self.close()
+
+    @property
+    def mapped(self) -> bool:
+        """Whether the file is served from a memory map."""
+        return self._view is not None
+
+    def readable(self) -> bool:
+        """Return True; inputs are always readable."""
+        return True
+
+    def read(self, size: int | None = -1) -> bytes:
+        """Read bytes from the current position.
+
+        Args:
+            size: Number of bytes to read, or everything left if negative.
+
+        Returns:
+            bytes: The data read; shorter only at the end of the file.
+        """
+        if self._view is None:
+            return self._file.read(size)
+        end = self._end(size)
+        data = self._map[self._position : end]
+        self._position = end
+        return data
+
+    def read_view(self, size: int = READ_BUFFER_SIZE) -> memoryview:
+        """Read up to ``size`` bytes without copying them into a new object.
+
+        Mapped files return a slice of the mapping. Other files fill a
+        buffer that the next call reuses, so the view is only valid until
+        then.
+
+        Args:
+            size: Number of bytes to read, or everything left if negative.
+
+        Returns:
+            memoryview: The data read; empty at the end of the file.
+        """
+        if self._view is not None:
+            end = self._end(size)
+            view = self._view[self._position : end]
+            self._position = end
+            return view
+        if size < 0:
+            return memoryview(self._file.read())
+        if self._buffer is None or len(self._buffer) < size:
+            self._buffer = bytearray(size)
+        view = memoryview(self._buffer)[:size]
+        return view[: self._file.readinto(view)]
+
+    def iter_views(self, size: int = READ_BUFFER_SIZE) -> Iterator[memoryview]:
+        """Yield the rest of the file in chunks of ``size`` bytes.
+
+        Args:
+            size: Chunk size in bytes.
+
+        Yields:
+            memoryview: Each chunk, valid until the next one is requested.
+        """
+        while True:
+            view = self.read_view(size)
+            if not view:
+                return
+            yield view
+
+    def readinto(self, buffer: bytearray | memoryview) -> int:
+        """Read bytes into a caller's buffer.
+
+        Args:
+            buffer: Writable buffer to fill.
+
+        Returns:
+            int: Number of bytes read; 0 at the end of the file.
+        """
+        if self._view is None:
+            return self._file.readinto(buffer)
+        target = memoryview(buffer).cast("B")
+        end = self._end(len(target))
+        count = end - self._position
+        target[:count] = self._view[self._position : end]
+        self._position = end
+        return count
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        """Move to a new position.
+
+        Args:
+            offset: Offset in bytes, relative to ``whence``.
+            whence: ``os.SEEK_SET``, ``os.SEEK_CUR`` or ``os.SEEK_END``.
+
+        Returns:
+            int: The new absolute position.
+
+        Raises:
+            ValueError: If the position would be negative or ``whence`` is
+                invalid.
+        """
+        if self._view is None:
+            return self._file.seek(offset, whence)
+        bases = {
+            os.SEEK_SET: 0,
+            os.SEEK_CUR: self._position,
+            os.SEEK_END: len(self._view),
+        }
+        if whence not in bases:
+            raise ValueError(f"Invalid whence: {whence}")
+        position = bases[whence] + offset
+        if position < 0:
+            raise ValueError(f"Negative seek position {position}")
+        self._position = position
+        return position
+
+    def tell(self) -> int:
+        """Return the current position."""
+        if self._view is None:
+            return self._file.tell()
+        return self._position
+
+    def fileno(self) -> int:
+        """Return the file descriptor of the underlying file."""
+        return self._file.fileno()
+
+    def close(self) -> None:
+        """Unmap and close the file.
+
+        Returns:
+            None
+        """
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+            try:
+                self._map.close()
+            except BufferError:
+                # A caller still holds a view; the map goes with its last one
+                pass
+            self._map = None
+        self._buffer = None
+        self._file.close()
+
+    def _end(self, size: int | None) -> int:
+        """Return where a read of ``size`` bytes from the mapping stops."""
+        length = len(self._view)
+        if size is None or size < 0:
+            return max(length, self._position)
+        return max(min(self._position + size, length), self._position)
@@ -1,18 +1,336 @@
 """Key generation utilities for Fernet encryption."""
 
+import hmac
+import os
 import random
-from base64 import urlsafe_b64encode
-from hashlib import scrypt
+import threading
+import time
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from hashlib import scrypt, sha256
+from typing import Callable
 
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 
-def key_gen(passW: str) -> bytes:
+from encryptocli.util.exceptions import FatalError
+
+# scrypt cost profiles selectable at encryption time. The chosen parameters
+# are stored with the output, so each file decrypts with the cost it was
+# written with.
+KDF_PROFILES: dict[str, dict[str, int]] = {
+    "fast": {"n": 2**12, "r": 8, "p": 1},
+    "interactive": {"n": 2**14, "r": 8, "p": 1},
+    "strong": {"n": 2**17, "r": 8, "p": 1},
+}
+DEFAULT_KDF_PROFILE = "interactive"
+SALT_SIZE = 16
+
+# Keys from keyfiles are expanded with HKDF instead of stretched with scrypt,
+# since the keyfile already holds high-entropy key material.
+KEYFILE_KDF = "hkdf-sha256"
+MIN_KEYFILE_SIZE = 32
+_MAX_KEYFILE_SIZE = 1024 * 1024
+
+# Upper bounds for parameters read back from untrusted headers
+_MAX_SCRYPT_N = 2**20
+_MAX_SCRYPT_R = 8
+_MAX_SCRYPT_P = 16
+
+
+class KeyCache:
+    """Opt-in, in-process cache of derived keys.
+
+    Entries are keyed on a keyed digest of the password and the KDF
+    parameters, so the cache never holds the password itself. The cache is
+    bounded in size (least recently used entries are evicted first) and in
+    time (entries expire ``ttl`` seconds after they were derived).
+
+    Attributes:
+        max_entries: Maximum number of keys kept at once.
+        ttl: Lifetime of an entry in seconds, or None to never expire.
+        hits: Number of lookups served from the cache.
+        misses: Number of lookups that had to derive a key.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 32,
+        ttl: float | None = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize an empty key cache.
+
+        Args:
+            max_entries: Maximum number of keys kept at once.
+            ttl: Lifetime of an entry in seconds, or None to never expire.
+            clock: Monotonic time source, replaceable for testing.
+
+        Returns:
+            None
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._secret = os.urandom(32)
+        self._entries: OrderedDict[bytes, tuple[float, bytearray]] = OrderedDict()
+        self._params: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+        self._pending: dict[bytes, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Return the number of cached keys, including any not yet expired."""
+        return len(self._entries)
+
+    def get_or_derive(
+        self, password: str, params: tuple, derive: Callable[[], bytes]
+    ) -> bytes:
+        """Return the cached key for ``password`` and ``params``, deriving on a miss.
+
+        Args:
+            password: The password the key is derived from.
+            params: Hashable KDF parameters, including the salt.
+            derive: Callable that performs the derivation on a miss.
+
+        Returns:
+            bytes: The derived key.
+        """
+        entry_id = self._entry_id(password, params)
+
+        key = self._lookup(entry_id)
+        if key is not None:
+            return key
+
+        # Threads missing on the same entry wait for a single derivation
+        with self._lock:
+            pending = self._pending.setdefault(entry_id, threading.Lock())
+        with pending:
+            try:
+                key = self._lookup(entry_id)
+                if key is not None:
+                    return key
+                with self._lock:
+                    self.misses += 1
+                key = derive()
+                now = self._clock()
+                with self._lock:
+                    self._entries[entry_id] = (now, bytearray(key))
+                    self._entries.move_to_end(entry_id)
+                    self._evict(now)
+            finally:
+                # Also on failure, so a later call retries the derivation
+                with self._lock:
+                    self._pending.pop(entry_id, None)
+        return key
+
+    def get_or_create_params(
+        self, password: str, profile: str, create: Callable[[], dict]
+    ) -> dict:
+        """Return the KDF parameters last used to encrypt under ``password``.
+
+        Reusing one salt per password and profile lets a batch of outputs
+        share a single derivation, both when encrypting and when decrypting
+        them later with the same cache.
+
+        Args:
+            password: The password being encrypted under.
+            profile: Name of the KDF cost profile.
+            create: Callable producing fresh parameters on a miss.
+
+        Returns:
+            dict: The KDF parameters.
+        """
+        entry_id = self._entry_id(password, ("params", profile))
+        now = self._clock()
+        with self._lock:
+            entry = self._params.get(entry_id)
+            if entry is not None and not self._expired(entry[0], now):
+                self._params.move_to_end(entry_id)
+                return entry[1]
+            params = create()
+            self._params[entry_id] = (now, params)
+            while len(self._params) > self.max_entries:
+                self._params.popitem(last=False)
+            return params
+
+    def wipe(self) -> None:
+        """Overwrite and drop every cached key.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            for _, key in self._entries.values():
+                key[:] = bytes(len(key))
+            self._entries.clear()
+            self._params.clear()
+
+    def _lookup(self, entry_id: bytes) -> bytes | None:
+        """Return an unexpired cached key and count the hit, or None."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is None or self._expired(entry[0], now):
+                return None
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            return bytes(entry[1])
+
+    def _entry_id(self, password: str, params: tuple) -> bytes:
+        """Compute the cache slot for a password and parameter tuple."""
+        return hmac.new(
+            self._secret, repr((password, params)).encode(), sha256
+        ).digest()
+
+    def _expired(self, created: float, now: float) -> bool:
+        """Check whether an entry created at ``created`` has outlived the TTL."""
+        return self.ttl is not None and now - created >= self.ttl
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries and trim the cache to ``max_entries``."""
+        for entry_id, (created, key) in list(self._entries.items()):
+            if self._expired(created, now):
+                key[:] = bytes(len(key))
+                del self._entries[entry_id]
+        while len(self._entries) > self.max_entries:
+            _, (_, key) = self._entries.popitem(last=False)
+            key[:] = bytes(len(key))
+
+
+def new_kdf_params(profile: str = DEFAULT_KDF_PROFILE) -> dict:
+    """Create scrypt parameters with a fresh random salt for a cost profile.
+
+    Args:
+        profile: Name of a cost profile from ``KDF_PROFILES``.
+
+    Returns:
+        dict: JSON-serializable KDF parameters to store alongside the output.
+
+    Raises:
+        ValueError: If the profile is unknown.
+    """
+    if profile not in KDF_PROFILES:
+        raise ValueError(
+            f"Unknown KDF profile: {profile}. "
+            f"Supported profiles: {', '.join(KDF_PROFILES)}"
+        )
+    salt = urlsafe_b64encode(os.urandom(SALT_SIZE)).decode()
+    return {"algorithm": "scrypt", "salt": salt, **KDF_PROFILES[profile]}
+
+
+def derive_key(password: str, kdf: dict, cache: KeyCache | None = None) -> bytes:
+    """Derive a Fernet key from a password and stored KDF parameters.
+
+    The parameters come from untrusted input, so they are bounded before
+    any work is done.
+
+    Args:
+        password: The password to derive a key from.
+        kdf: KDF parameters as produced by ``new_kdf_params``.
+        cache: Optional key cache to reuse earlier derivations.
+
+    Returns:
+        bytes: A base64-encoded cryptographic key suitable for Fernet
+            encryption.
+
+    Raises:
+        FatalError: If the parameters are unsupported or out of bounds.
+    """
+    try:
+        algorithm = kdf["algorithm"]
+        salt = urlsafe_b64decode(kdf["salt"])
+        n, r, p = int(kdf["n"]), int(kdf["r"]), int(kdf["p"])
+    except (KeyError, TypeError, ValueError) as exc:
+        raise FatalError("Encrypted data has invalid KDF parameters") from exc
+
+    if algorithm != "scrypt":
+        raise FatalError(f"Unsupported KDF algorithm: {algorithm}")
+    if not (1 < n <= _MAX_SCRYPT_N and n & (n - 1) == 0):
+        raise FatalError("Encrypted data has invalid KDF parameters")
+    if not (1 <= r <= _MAX_SCRYPT_R and 1 <= p <= _MAX_SCRYPT_P):
+        raise FatalError("Encrypted data has invalid KDF parameters")
+
+    return _scrypt_key(password, salt, n, r, p, cache)
+
+
+def read_keyfile(path: str) -> bytes:
+    """Read the key material from a keyfile.
+
+    Args:
+        path: Path to a file holding at least 32 random bytes.
+
+    Returns:
+        bytes: The key material.
+
+    Raises:
+        FatalError: If the file can not be read, or is too short or too
+            large to be a keyfile.
+    """
+    try:
+        with open(path, "rb") as keyfile:
+            material = keyfile.read(_MAX_KEYFILE_SIZE + 1)
+    except OSError as exc:
+        raise FatalError(f"Ran into an issue while reading keyfile: {path}") from exc
+    if len(material) < MIN_KEYFILE_SIZE:
+        raise FatalError(
+            f"Keyfile must hold at least {MIN_KEYFILE_SIZE} bytes of key material"
+        )
+    if len(material) > _MAX_KEYFILE_SIZE:
+        raise FatalError("Keyfile is too large")
+    return material
+
+
+def new_keyfile_params() -> dict:
+    """Create HKDF parameters with a fresh random salt for a keyfile key.
+
+    Returns:
+        dict: JSON-serializable KDF parameters to store alongside the output.
+    """
+    salt = urlsafe_b64encode(os.urandom(SALT_SIZE)).decode()
+    return {"algorithm": KEYFILE_KDF, "salt": salt}
+
+
+def derive_keyfile_key(material: bytes, kdf: dict) -> bytes:
+    """Derive a Fernet key from keyfile material and stored HKDF parameters.
+
+    Args:
+        material: The contents of the keyfile.
+        kdf: KDF parameters as produced by ``new_keyfile_params``.
+
+    Returns:
+        bytes: A base64-encoded cryptographic key suitable for Fernet
+            encryption.
+
+    Raises:
+        FatalError: If the parameters are invalid.
+    """
+    try:
+        salt = urlsafe_b64decode(kdf["salt"])
+    except (KeyError, TypeError, ValueError) as exc:
+        raise FatalError("Encrypted data has invalid KDF parameters") from exc
+    if kdf.get("algorithm") != KEYFILE_KDF:
+        raise FatalError(f"Unsupported KDF algorithm: {kdf.get('algorithm')}")
+    hkdf = HKDF(
+        algorithm=hashes.SHA256(), length=32, salt=salt, info=b"encrypto-keyfile"
+    )
+    return urlsafe_b64encode(hkdf.derive(material))
+
+
+def key_gen(passW: str, cache: KeyCache | None = None) -> bytes:
     """Generate a cryptographic key from a password using scrypt.
 
     Derives a cryptographic key from the provided password using scrypt
-    with fixed parameters for consistency across platforms.
+    with fixed parameters and a password-seeded salt. This is the scheme
+    used before salts and KDF costs were stored with the output, and is
+    kept to decrypt data written that way.
 
     Args:
         passW: The password to derive a key from.
+        cache: Optional key cache to reuse earlier derivations.
 
     Returns:
         bytes: A base64-encoded cryptographic key suitable for Fernet
@@ -21,8 +339,27 @@ def key_gen(passW: str) -> bytes:
     # Using password as seed to random to keep salt for scrypt consistent
     random.seed(passW)
     salt = f"{random.random()}".encode()
-    key = urlsafe_b64encode(
-        scrypt(passW.encode(), salt=salt, n=16384, r=8, p=1, dklen=32)
-    )
+    return _scrypt_key(passW, salt, 16384, 8, 1, cache)
+
+
+def _scrypt_key(
+    password: str, salt: bytes, n: int, r: int, p: int, cache: KeyCache | None
+) -> bytes:
+    """Run scrypt, consulting the cache first when one is given."""
+
+    def derive() -> bytes:
+        return urlsafe_b64encode(
+            scrypt(
+                password.encode(),
+                salt=salt,
+                n=n,
+                r=r,
+                p=p,
+                maxmem=128 * r * (n + p + 2) + 1024 * 1024,
+                dklen=32,
+            )
+        )
 
-    return key
+    if cache is None:
+        return derive()
+    return cache.get_or_derive(password, ("scrypt", salt, n, r, p), derive)
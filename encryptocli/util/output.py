@@ -0,0 +1,199 @@
+"""Atomic, durable writing of output files.
+
+Output is written to a uniquely named temporary file next to its
+destination and renamed over it only once complete, so a crash never leaves
+a truncated output behind and concurrent runs writing the same path never
+interleave their data: the last one to finish wins.
+
+How hard the data is pushed to disk is set by an fsync policy:
+
+* ``none``: leave it to the operating system, for speed in batch jobs.
+* ``end``: fsync the file before it is renamed, and the directory after.
+* ``<N>MB``: also fsync every N MiB written, which bounds how much dirty
+  data a large output builds up in the page cache.
+"""
+
+import os
+import re
+import secrets
+from typing import BinaryIO
+
+import encryptocli.util.exceptions as exceptions
+
+FSYNC_NONE = "none"
+FSYNC_END = "end"
+DEFAULT_FSYNC_POLICY = FSYNC_END
+# Write buffer of output files; large writes bypass it
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+_INTERVAL = re.compile(r"^(\d+)\s*(?:mb|mib|m)?$", re.IGNORECASE)
+_MB = 1024 * 1024
+
+
+def parse_fsync_policy(policy: str) -> int | None:
+    """Validate an fsync policy and return its sync interval.
+
+    Args:
+        policy: ``none``, ``end``, or a size in MiB such as ``64MB``.
+
+    Returns:
+        int | None: None to never fsync, 0 to fsync only at the end, or the
+            number of bytes written between fsyncs.
+
+    Raises:
+        ValueError: If the policy is not recognized.
+    """
+    normalized = policy.strip().lower()
+    if normalized == FSYNC_NONE:
+        return None
+    if normalized == FSYNC_END:
+        return 0
+    match = _INTERVAL.match(normalized)
+    if match is None or int(match.group(1)) == 0:
+        raise ValueError(
+            f"Unknown fsync policy: {policy} (use none, end or a size such as 64MB)"
+        )
+    return int(match.group(1)) * _MB
+
+
+class AtomicWriter:
+    """Binary output file that only appears at its path once committed.
+
+    Use it as a context manager: the output is committed when the block
+    ends normally and discarded if it raises.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fsync_policy: str = DEFAULT_FSYNC_POLICY,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+    ) -> None:
+        """Create the temporary file the output is written to.
+
+        Args:
+            path: Final path of the output.
+            fsync_policy: ``none``, ``end`` or a size in MiB such as ``64MB``.
+            buffer_size: Size of the write buffer in bytes.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the fsync policy is not recognized.
+            FatalError: If the temporary file can not be created.
+        """
+        self.path = path
+        self._interval = parse_fsync_policy(fsync_policy)
+        self._unsynced = 0
+        directory, name = os.path.split(path)
+        self.temp_path = os.path.join(directory, f".{name}.{secrets.token_hex(4)}.tmp")
+        try:
+            # O_EXCL keeps concurrent writers apart; the mode honours umask
+            fd = os.open(self.temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        except OSError as exc:
+            raise exceptions.FatalError(
+                f"Ran into an issue while creating {path}"
+            ) from exc
+        self._file: BinaryIO = os.fdopen(fd, "wb", buffering=buffer_size)
+        self._done = False
+
+    def __enter__(self) -> "AtomicWriter":
+        """Return the writer itself."""
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        """Commit the output, or discard it if the block raised."""
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+    def write(self, data: bytes) -> int:
+        """Write data, syncing it to disk if the policy's interval is reached.
+
+        Args:
+            data: The bytes to write.
+
+        Returns:
+            int: Number of bytes written.
+        """
+        written = self._file.write(data)
+        if self._interval:
+            self._unsynced += written
+            if self._unsynced >= self._interval:
+                self._sync()
+        return written
+
+    def tell(self) -> int:
+        """Return the number of bytes written so far."""
+        return self._file.tell()
+
+    def flush(self) -> None:
+        """Flush the write buffer to the operating system."""
+        self._file.flush()
+
+    def fileno(self) -> int:
+        """Return the file descriptor of the temporary file."""
+        return self._file.fileno()
+
+    def commit(self) -> None:
+        """Sync the output as the policy asks and move it to its final path.
+
+        Returns:
+            None
+        """
+        if self._done:
+            return
+        self._done = True
+        try:
+            if self._interval is not None:
+                self._sync()
+            self._file.close()
+            os.replace(self.temp_path, self.path)
+        except BaseException:
+            self._file.close()
+            _remove(self.temp_path)
+            raise
+        if self._interval is not None:
+            _sync_directory(os.path.dirname(self.path))
+
+    def abort(self) -> None:
+        """Discard the output, leaving any existing file at the path alone.
+
+        Returns:
+            None
+        """
+        if self._done:
+            return
+        self._done = True
+        self._file.close()
+        _remove(self.temp_path)
+
+    def _sync(self) -> None:
+        """Flush and fsync what has been written so far."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+
+def _remove(path: str) -> None:
+    """Remove a file if it exists."""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _sync_directory(directory: str) -> None:
+    """Fsync a directory so a rename in it survives a crash, where supported."""
+    try:
+        fd = os.open(directory or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -1,5 +1,7 @@
 """Pytest configuration and shared fixtures."""
 
+import os
+
 import pytest
 from PIL import Image
 import numpy as np
@@ -31,6 +33,14 @@ def sample_file(temp_dir):
     return file_path
 
 
+@pytest.fixture
+def sample_keyfile(temp_dir):
+    """Create a keyfile holding 32 random bytes."""
+    file_path = temp_dir / "secret.key"
+    file_path.write_bytes(os.urandom(32))
+    return file_path
+
+
 @pytest.fixture
 def sample_image(temp_dir):
     """Create a sample PNG image for steganography."""
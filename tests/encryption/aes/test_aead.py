@@ -0,0 +1,62 @@
+"""Tests for the AEAD segment engines."""
+
+import pytest
+from cryptography.fernet import Fernet
+
+from encryptocli.encryption.aes import aead
+from encryptocli.util.exceptions import FatalError
+
+
+class TestAEADSegments:
+    """Test AES-256-GCM and ChaCha20-Poly1305 segment sealing."""
+
+    @pytest.fixture(params=aead.ENGINES)
+    def header(self, request):
+        """Provide header fields for each AEAD engine."""
+        return aead.new_cipher_params(request.param)
+
+    @pytest.fixture
+    def key(self):
+        """Provide a random base64-encoded key."""
+        return Fernet.generate_key()
+
+    def test_seal_open_roundtrip(self, header, key):
+        """Test that a sealed segment opens to the same data and flag."""
+        segments = aead.AEADSegments(header["cipher"], key, header["nonce"])
+        token = segments.seal(3, b"payload", True)
+        assert len(token) == 1 + len(b"payload") + 16
+        assert segments.open(3, token) == (b"payload", True)
+
+    def test_open_wrong_index(self, header, key):
+        """Test that a segment moved to another position fails."""
+        segments = aead.AEADSegments(header["cipher"], key, header["nonce"])
+        token = segments.seal(0, b"payload", False)
+        with pytest.raises(FatalError):
+            segments.open(1, token)
+
+    def test_open_flipped_final_flag(self, header, key):
+        """Test that marking a segment final fails authentication."""
+        segments = aead.AEADSegments(header["cipher"], key, header["nonce"])
+        token = segments.seal(0, b"payload", False)
+        with pytest.raises(FatalError):
+            segments.open(0, b"\x01" + token[1:])
+
+    def test_file_nonce_separates_keys(self, header, key):
+        """Test that each file nonce yields a different payload key."""
+        first = aead.AEADSegments(header["cipher"], key, header["nonce"])
+        other = aead.new_cipher_params(header["cipher"])
+        second = aead.AEADSegments(header["cipher"], key, other["nonce"])
+        with pytest.raises(FatalError):
+            second.open(0, first.seal(0, b"payload", True))
+
+    def test_resolve_auto_engine(self, monkeypatch):
+        """Test that auto picks ChaCha20 without AES acceleration."""
+        monkeypatch.setattr(aead, "has_aes_acceleration", lambda: False)
+        assert aead.resolve_engine(aead.AUTO) == aead.CHACHA20
+        monkeypatch.setattr(aead, "has_aes_acceleration", lambda: True)
+        assert aead.resolve_engine(aead.AUTO) == aead.AES_GCM
+
+    def test_resolve_unknown_engine(self):
+        """Test that unknown engines are rejected."""
+        with pytest.raises(ValueError, match="Unknown AEAD engine"):
+            aead.resolve_engine("rot13")
@@ -0,0 +1,103 @@
+"""Tests for content-defined chunking in AES containers."""
+
+import io
+import os
+
+import pytest
+from cryptography.fernet import Fernet
+
+from encryptocli.encryption.aes import chunking, container
+from encryptocli.util.exceptions import FatalError
+
+
+class TestChunking:
+    """Test the content-defined chunker, chunk sealing and manifests."""
+
+    @pytest.fixture
+    def key(self):
+        """Provide a random Fernet key."""
+        return Fernet.generate_key()
+
+    @pytest.fixture
+    def params(self):
+        """Provide small chunking parameters so tests stay fast."""
+        return chunking.new_chunking_params(4096)
+
+    @pytest.fixture
+    def id_key(self, key):
+        """Provide the chunk id key."""
+        return chunking.chunk_id_key(key)
+
+    def _chunks(self, data, params, id_key, previous=None):
+        """Chunk ``data`` and return the chunk ids and data."""
+        return list(chunking.iter_chunks(io.BytesIO(data), params, id_key, previous))
+
+    def test_chunks_cover_input_within_bounds(self, params, id_key):
+        """Test that chunks reassemble the input and respect the size limits."""
+        data = os.urandom(500_000)
+        chunks = [chunk for _, chunk in self._chunks(data, params, id_key)]
+        assert b"".join(chunks) == data
+        assert all(len(chunk) <= params["maximum"] for chunk in chunks)
+        assert all(len(chunk) >= params["minimum"] for chunk in chunks[:-1])
+
+    def test_edit_changes_only_nearby_chunks(self, params, id_key):
+        """Test that an insertion leaves the other chunk boundaries in place."""
+        data = os.urandom(500_000)
+        edited = data[:200_000] + b"inserted" + data[200_000:]
+        before = self._chunks(data, params, id_key)
+        after = self._chunks(edited, params, id_key)
+        assert len(set(after) - set(before)) <= 2
+
+    @pytest.mark.parametrize(
+        "edit",
+        [
+            lambda data: data[:200_000] + b"inserted" + data[200_000:],
+            lambda data: data[:100_000] + data[150_000:],
+            lambda data: data + b"appended",
+            lambda data: data[:-5000],
+            lambda data: os.urandom(300_000),
+        ],
+    )
+    def test_previous_chunks_match_full_chunking(self, params, id_key, edit):
+        """Test that re-chunking against a previous version changes nothing."""
+        data = os.urandom(500_000)
+        previous = [
+            (chunk, len(chunk_data))
+            for chunk, chunk_data in self._chunks(data, params, id_key)
+        ]
+        edited = edit(data)
+        assert self._chunks(edited, params, id_key, previous) == self._chunks(
+            edited, params, id_key
+        )
+
+    def test_empty_input_has_no_chunks(self, params, id_key):
+        """Test that an empty stream yields nothing."""
+        assert self._chunks(b"", params, id_key) == []
+
+    def test_invalid_params(self, id_key):
+        """Test that bad chunk sizes and unknown algorithms are rejected."""
+        with pytest.raises(ValueError, match="power of two"):
+            chunking.new_chunking_params(5000)
+        with pytest.raises(FatalError, match="Unsupported chunking"):
+            self._chunks(b"x", {"algorithm": "rabin"}, id_key)
+
+    @pytest.mark.parametrize("engine", ["fernet", "aes-256-gcm", "chacha20-poly1305"])
+    def test_chunk_tokens_roundtrip(self, key, engine):
+        """Test that chunk tokens open regardless of their index."""
+        header = container.new_cipher_params(engine)
+        header["chunking"] = chunking.new_chunking_params(4096)
+        cipher = container.segment_cipher(header, key)
+        token = cipher.seal(3, b"chunk", True)
+        assert cipher.open(7, token) == (b"chunk", False)
+        if engine != "fernet":
+            assert cipher.seal(0, b"chunk", False) == token
+
+    def test_manifest_bound_to_trailer(self, key, temp_dir):
+        """Test that a manifest is only read back for its own container."""
+        path = str(temp_dir / "file.encrypto.manifest")
+        entries = [(b"i" * 32, 40, 100, 50), (b"j" * 32, 50, 150, 60)]
+        chunking.write_manifest(path, key, b"t" * 32, entries)
+        assert chunking.read_manifest(path, key, b"t" * 32) == entries
+        assert chunking.read_manifest(path, key, b"u" * 32) is None
+        assert chunking.read_manifest(path, Fernet.generate_key(), b"t" * 32) is None
+        assert chunking.read_manifest(f"{path}.missing", key, b"t" * 32) is None
@@ -1,10 +1,22 @@
 """Tests for AES cipher functionality."""
 
+import hashlib
+import io
+import os
+
 import pytest
+from cryptography.fernet import Fernet
 from hypothesis import given, strategies as st
 
-from encryptocli.encryption.aes import AESCipher
+from encryptocli.encryption.aes import (
+    AESCipher,
+    chunking,
+    container,
+    journal,
+    pipeline,
+)
 from encryptocli.util.exceptions import FatalError, MildError
+from encryptocli.util.key_gen import KDF_PROFILES, KeyCache, key_gen, new_kdf_params
 
 
 class TestAESCipher:
@@ -77,6 +89,759 @@ class TestAESCipher:
         with pytest.raises(MildError, match="File is already encrypted"):
             cipher.encrypt_file(str(encrypted_file), sample_password)
 
+    def test_file_roundtrip_multiple_segments(self, cipher, sample_password, temp_dir):
+        """Test that files spanning many segments decrypt to the original."""
+        data = os.urandom(10_000)
+        source = temp_dir / "data.bin"
+        source.write_bytes(data)
+
+        cipher.encrypt_file(str(source), sample_password, segment_size=1024)
+        source.unlink()
+        cipher.decrypt_file(f"{source}.encrypto", sample_password)
+        assert source.read_bytes() == data
+
+    def test_file_roundtrip_parallel(self, cipher, sample_password, temp_dir):
+        """Test that files encrypted with several jobs decrypt either way."""
+        data = os.urandom(50_000)
+        source = temp_dir / "data.bin"
+        source.write_bytes(data)
+
+        cipher.encrypt_file(str(source), sample_password, segment_size=1024, jobs=2)
+        source.unlink()
+        cipher.decrypt_file(f"{source}.encrypto", sample_password)
+        assert source.read_bytes() == data
+
+        source.unlink()
+        cipher.decrypt_file(f"{source}.encrypto", sample_password, jobs=2)
+        assert source.read_bytes() == data
+
+    @pytest.mark.parametrize("engine", ["aes-256-gcm", "chacha20-poly1305", "auto"])
+    def test_file_roundtrip_aead(self, cipher, sample_password, temp_dir, engine):
+        """Test that AEAD engines write raw binary and decrypt back."""
+        data = os.urandom(10_000)
+        source = temp_dir / "data.bin"
+        source.write_bytes(data)
+
+        cipher.encrypt_file(str(source), sample_password, engine=engine)
+        encrypted_file = temp_dir / "data.bin.encrypto"
+        # Raw binary segments: no base64 inflation beyond header and tags
+        assert encrypted_file.stat().st_size < len(data) + 1024
+        source.unlink()
+        cipher.decrypt_file(str(encrypted_file), sample_password)
+        assert source.read_bytes() == data
+
+    @pytest.mark.parametrize("engine", ["fernet", "aes-256-gcm"])
+    def test_decrypt_range(self, cipher, sample_password, temp_dir, engine):
+        """Test that byte ranges match slices of the original file."""
+        data = os.urandom(10_000)
+        source = temp_dir / "data.bin"
+        source.write_bytes(data)
+        cipher.encrypt_file(
+            str(source), sample_password, segment_size=1024, engine=engine
+        )
+
+        encrypted = f"{source}.encrypto"
+        for start, end in [(0, 10), (1000, 3000), (9_990, None), (20_000, 20_010)]:
+            assert (
+                cipher.decrypt_range(encrypted, sample_password, start, end)
+                == data[start:end]
+            )
+
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_stream_roundtrip(self, cipher, sample_password, jobs):
+        """Test encrypting and decrypting between non-file streams."""
+        data = os.urandom(200_000)
+        encrypted = io.BytesIO()
+        cipher.encrypt_stream(
+            io.BytesIO(data), encrypted, sample_password, 4096, "fast", jobs
+        )
+        decrypted = io.BytesIO()
+        cipher.decrypt_stream(
+            io.BytesIO(encrypted.getvalue()), decrypted, sample_password, jobs
+        )
+        assert decrypted.getvalue() == data
+
+    def test_decrypt_stream_truncated(self, cipher, sample_password):
+        """Test that a truncated stream is reported after its valid prefix."""
+        encrypted = io.BytesIO()
+        cipher.encrypt_stream(io.BytesIO(b"x" * 10_000), encrypted, sample_password)
+        with pytest.raises(FatalError):
+            cipher.decrypt_stream(
+                io.BytesIO(encrypted.getvalue()[:-100]), io.BytesIO(), sample_password
+            )
+
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_file_roundtrip_compressed(self, cipher, sample_password, temp_dir, jobs):
+        """Test that compressed files shrink, decrypt and support ranges."""
+        data = b"".join(b"%06d GET /index.html 200\n" % i for i in range(5000))
+        source = temp_dir / "access.log"
+        source.write_bytes(data)
+        cipher.encrypt_file(
+            str(source), sample_password, 4096, jobs=jobs, compression="zlib"
+        )
+
+        encrypted = temp_dir / "access.log.encrypto"
+        assert encrypted.stat().st_size < len(data) // 3
+        assert (
+            cipher.decrypt_range(str(encrypted), sample_password, 50_000, 50_100)
+            == data[50_000:50_100]
+        )
+        source.unlink()
+        cipher.decrypt_file(str(encrypted), sample_password, jobs)
+        assert source.read_bytes() == data
+
+    def test_decrypt_range_legacy_file(self, cipher, sample_password, temp_dir):
+        """Test that single-token legacy files support ranges too."""
+        encrypted = temp_dir / "old.txt.encrypto"
+        encrypted.write_bytes(Fernet(key_gen(sample_password)).encrypt(b"0123456789"))
+        assert cipher.decrypt_range(str(encrypted), sample_password, 2, 5) == b"234"
+
+    def test_decrypt_range_invalid(self, cipher, sample_file, sample_password):
+        """Test that inverted ranges are rejected."""
+        with pytest.raises(FatalError, match="Invalid byte range"):
+            cipher.decrypt_range(str(sample_file), sample_password, 5, 2)
+
+    def test_stripped_trailer_detected(self, cipher, sample_password, temp_dir):
+        """Test that removing the index trailer fails full decryption."""
+        source = temp_dir / "data.bin"
+        source.write_bytes(os.urandom(5000))
+        cipher.encrypt_file(str(source), sample_password, segment_size=1024)
+        encrypted = temp_dir / "data.bin.encrypto"
+        encrypted.write_bytes(encrypted.read_bytes()[:-10])
+        with pytest.raises(FatalError):
+            cipher.decrypt_file(str(encrypted), sample_password)
+
+    @pytest.fixture
+    def interrupted(self, request, cipher, sample_password, temp_dir, monkeypatch):
+        """Provide a source file whose resumable encryption failed at segment 6.
+
+        An indirect parameter names the plaintext digest algorithm to use.
+        """
+        digest_algorithm = getattr(request, "param", None)
+        monkeypatch.setattr(journal, "CHECKPOINT_BYTES", 1)
+        source = temp_dir / "data.bin"
+        source.write_bytes(os.urandom(10 * 1024))
+        seal = container.FernetSegments.seal
+
+        def failing_seal(segments, index, data, final):
+            if index == 6:
+                raise OSError("disk full")
+            return seal(segments, index, data, final)
+
+        monkeypatch.setattr(container.FernetSegments, "seal", failing_seal)
+        with pytest.raises(FatalError):
+            cipher.encrypt_file(
+                str(source),
+                sample_password,
+                1024,
+                resume=True,
+                digest_algorithm=digest_algorithm,
+            )
+        monkeypatch.setattr(container.FernetSegments, "seal", seal)
+        return source
+
+    def _count_seals(self, monkeypatch):
+        """Count the segments sealed from now on."""
+        sealed = []
+        seal = container.FernetSegments.seal
+        monkeypatch.setattr(
+            container.FernetSegments,
+            "seal",
+            lambda segments, index, *args: sealed.append(index)
+            or seal(segments, index, *args),
+        )
+        return sealed
+
+    def test_resume_continues_after_checkpoint(
+        self, cipher, sample_password, interrupted, monkeypatch
+    ):
+        """Test that a rerun only encrypts the segments after the checkpoint."""
+        data = interrupted.read_bytes()
+        encrypted = interrupted.with_name("data.bin.encrypto")
+        assert os.path.exists(f"{encrypted}{journal.SUFFIX}")
+
+        sealed = self._count_seals(monkeypatch)
+        cipher.encrypt_file(str(interrupted), sample_password, 1024, resume=True)
+        assert sealed == [6, 7, 8, 9]
+        assert not os.path.exists(f"{encrypted}{journal.SUFFIX}")
+
+        interrupted.unlink()
+        cipher.decrypt_file(str(encrypted), sample_password)
+        assert interrupted.read_bytes() == data
+
+    def test_resume_restarts_when_source_changed(
+        self, cipher, sample_password, interrupted, monkeypatch
+    ):
+        """Test that a modified source is encrypted again from the start."""
+        data = os.urandom(3000)
+        interrupted.write_bytes(data)
+        sealed = self._count_seals(monkeypatch)
+        cipher.encrypt_file(str(interrupted), sample_password, 1024, resume=True)
+        assert sealed == [0, 1, 2]
+
+        interrupted.unlink()
+        cipher.decrypt_file(f"{interrupted}.encrypto", sample_password)
+        assert interrupted.read_bytes() == data
+
+    def test_resume_wrong_password_keeps_output(self, cipher, interrupted):
+        """Test that resuming with another password fails without overwriting."""
+        encrypted = interrupted.with_name("data.bin.encrypto")
+        before = encrypted.read_bytes()
+        with pytest.raises(FatalError, match="key or the input data is wrong"):
+            cipher.encrypt_file(str(interrupted), "other", 1024, resume=True)
+        assert encrypted.read_bytes() == before
+
+    @pytest.mark.parametrize(
+        "engine, compression",
+        [("fernet", None), ("aes-256-gcm", None), ("chacha20-poly1305", "zlib")],
+    )
+    def test_incremental_reencrypts_changed_chunks(
+        self, cipher, sample_password, temp_dir, monkeypatch, engine, compression
+    ):
+        """Test that re-encrypting a modified file only seals its new chunks."""
+        source = temp_dir / "dump.sql"
+        data = os.urandom(1_000_000)
+        source.write_bytes(data)
+        cipher.encrypt_file(
+            str(source),
+            sample_password,
+            engine=engine,
+            compression=compression,
+            incremental=True,
+        )
+
+        sealed = []
+        seal = chunking.ChunkSegments.seal
+        monkeypatch.setattr(
+            chunking.ChunkSegments,
+            "seal",
+            lambda segments, index, chunk, final: sealed.append(chunk)
+            or seal(segments, index, chunk, final),
+        )
+        data = data[:400_000] + b"UPDATE" + data[400_000:]
+        source.write_bytes(data)
+        cipher.encrypt_file(str(source), sample_password, incremental=True)
+        assert 1 <= len(sealed) <= 2
+
+        encrypted = temp_dir / "dump.sql.encrypto"
+        assert (
+            cipher.decrypt_range(str(encrypted), sample_password, 399_990, 400_010)
+            == data[399_990:400_010]
+        )
+        source.unlink()
+        cipher.decrypt_file(str(encrypted), sample_password)
+        assert source.read_bytes() == data
+
+    def test_incremental_reuse_survives_header_growth(
+        self, cipher, sample_password, temp_dir, monkeypatch
+    ):
+        """Test that chunks are reused after key slots outgrow the header."""
+        source = temp_dir / "dump.sql"
+        data = os.urandom(1_000_000)
+        source.write_bytes(data)
+        cipher.encrypt_file(str(source), sample_password, incremental=True)
+        encrypted = temp_dir / "dump.sql.encrypto"
+        size = encrypted.stat().st_size
+        for number in range(3):
+            cipher.add_key_slot(
+                str(encrypted), sample_password, f"operator{number}", "fast"
+            )
+        assert encrypted.stat().st_size > size
+
+        sealed = []
+        seal = chunking.ChunkSegments.seal
+        monkeypatch.setattr(
+            chunking.ChunkSegments,
+            "seal",
+            lambda segments, index, chunk, final: sealed.append(chunk)
+            or seal(segments, index, chunk, final),
+        )
+        data = data[:500_000] + b"x" + data[500_001:]
+        source.write_bytes(data)
+        cipher.encrypt_file(str(source), sample_password, incremental=True)
+        assert 1 <= len(sealed) <= 2
+
+        source.unlink()
+        cipher.decrypt_file(str(encrypted), "operator2")
+        assert source.read_bytes() == data
+
+    def test_incremental_new_password_starts_over(
+        self, cipher, sample_password, temp_dir
+    ):
+        """Test that output under another password is not reused."""
+        source = temp_dir / "dump.sql"
+        source.write_bytes(b"row\n" * 10_000)
+        cipher.encrypt_file(str(source), sample_password, incremental=True)
+        cipher.encrypt_file(str(source), "rotated", incremental=True)
+        source.unlink()
+        cipher.decrypt_file(str(temp_dir / "dump.sql.encrypto"), "rotated")
+        assert source.read_bytes() == b"row\n" * 10_000
+
+    @pytest.mark.parametrize("resume", [False, True])
+    def test_full_encrypt_removes_manifest(
+        self, cipher, sample_password, temp_dir, resume
+    ):
+        """Test that a full encryption deletes the incremental manifest."""
+        source = temp_dir / "dump.sql"
+        source.write_bytes(b"row\n" * 10_000)
+        cipher.encrypt_file(str(source), sample_password, incremental=True)
+        manifest = temp_dir / f"dump.sql.encrypto{chunking.MANIFEST_SUFFIX}"
+        assert manifest.exists()
+
+        cipher.encrypt_file(str(source), sample_password, resume=resume)
+        assert not manifest.exists()
+        cipher.encrypt_file(str(source), sample_password, incremental=True)
+        source.unlink()
+        cipher.decrypt_file(str(temp_dir / "dump.sql.encrypto"), sample_password)
+        assert source.read_bytes() == b"row\n" * 10_000
+
+    def test_incremental_dropped_chunk_detected(
+        self, cipher, sample_password, temp_dir
+    ):
+        """Test that removing a whole chunk token fails decryption."""
+        source = temp_dir / "data.bin"
+        source.write_bytes(os.urandom(300_000))
+        cipher.encrypt_file(str(source), sample_password, incremental=True)
+        encrypted = temp_dir / "data.bin.encrypto"
+        raw = encrypted.read_bytes()
+
+        stream = io.BytesIO(raw[len(container.MAGIC) :])
+        header, _, _ = container.read_header(stream)
+        manifest = chunking.read_manifest(
+            f"{encrypted}{chunking.MANIFEST_SUFFIX}",
+            cipher._file_key(sample_password, header),
+            raw[-container.TAG_SIZE :],
+        )
+        # Manifest offsets count from the first segment
+        _, _, offset, length = manifest[1]
+        offset += len(container.MAGIC) + stream.tell()
+        encrypted.write_bytes(raw[:offset] + raw[offset + length :])
+        with pytest.raises(FatalError, match="corrupted"):
+            cipher.decrypt_file(str(encrypted), sample_password)
+
+    def test_incremental_and_resume_exclusive(self, cipher, sample_file):
+        """Test that incremental and resumable modes can not be combined."""
+        with pytest.raises(ValueError, match="can not be combined"):
+            cipher.encrypt_file(str(sample_file), "pw", resume=True, incremental=True)
+
+    @pytest.mark.parametrize("engine", [container.FERNET, "aes-256-gcm"])
+    def test_rekey_file(self, cipher, sample_file, sample_password, temp_dir, engine):
+        """Test that changing the password rewrites only the header."""
+        cipher.encrypt_file(str(sample_file), sample_password, engine=engine)
+        encrypted = temp_dir / f"{sample_file.name}.encrypto"
+        before = encrypted.read_bytes()
+
+        result = cipher.rekey_file(str(encrypted), sample_password, "rotated", "fast")
+        assert result == "Password changed successfully"
+        after = encrypted.read_bytes()
+        assert len(after) == len(before) and after != before
+        assert after[-200:] == before[-200:]
+
+        sample_file.unlink()
+        with pytest.raises(FatalError, match="key or the input data is wrong"):
+            cipher.decrypt_file(str(encrypted), sample_password)
+        cipher.decrypt_file(str(encrypted), "rotated")
+        assert sample_file.read_text() == "Sample file content for testing."
+
+    def test_rekey_file_wrong_password(
+        self, cipher, sample_file, sample_password, temp_dir
+    ):
+        """Test that a wrong current password leaves the file untouched."""
+        cipher.encrypt_file(str(sample_file), sample_password)
+        encrypted = temp_dir / f"{sample_file.name}.encrypto"
+        before = encrypted.read_bytes()
+        with pytest.raises(FatalError, match="key or the input data is wrong"):
+            cipher.rekey_file(str(encrypted), "wrong_password", "rotated")
+        assert encrypted.read_bytes() == before
+
+    def test_rekey_legacy_file(self, cipher, sample_password, temp_dir):
+        """Test that files without a wrapped data key can not be rekeyed."""
+        legacy_file = temp_dir / "legacy.txt.encrypto"
+        legacy_file.write_bytes(Fernet(key_gen(sample_password)).encrypt(b"legacy"))
+        with pytest.raises(FatalError, match="no wrapped data key"):
+            cipher.rekey_file(str(legacy_file), sample_password, "rotated")
+
+    def test_key_slots(self, cipher, sample_file, sample_password, temp_dir):
+        """Test that added slots open the same payload and can be removed."""
+        cipher.encrypt_file(str(sample_file), sample_password, kdf_profile="fast")
+        encrypted = temp_dir / f"{sample_file.name}.encrypto"
+        before = encrypted.read_bytes()
+
+        added = cipher.add_key_slot(str(encrypted), sample_password, "operator", "fast")
+        assert added == "Added key slot 1"
+        assert encrypted.read_bytes()[-200:] == before[-200:]
+        assert [slot["n"] for slot in cipher.list_key_slots(str(encrypted))] == [
+            4096,
+            4096,
+        ]
+        for password in (sample_password, "operator"):
+            assert cipher.decrypt_range(str(encrypted), password, 0, 6) == b"Sample"
+
+        cipher.remove_key_slot(str(encrypted), "operator", 0)
+        with pytest.raises(FatalError, match="key or the input data is wrong"):
+            cipher.decrypt_range(str(encrypted), sample_password, 0, 6)
+        with pytest.raises(FatalError, match="only key slot"):
+            cipher.remove_key_slot(str(encrypted), "operator", 0)
+        with pytest.raises(FatalError, match="No key slot 3"):
+            cipher.remove_key_slot(str(encrypted), "operator", 3)
+
+    def test_key_slots_outgrow_header(self, cipher, sample_file, temp_dir):
+        """Test that slots beyond the reserved header space grow the header."""
+        cipher.encrypt_file(str(sample_file), "pw0", kdf_profile="fast")
+        encrypted = temp_dir / f"{sample_file.name}.encrypto"
+        size = encrypted.stat().st_size
+        for number in range(1, 6):
+            cipher.add_key_slot(str(encrypted), "pw0", f"pw{number}", "fast")
+        assert encrypted.stat().st_size > size
+        assert len(cipher.list_key_slots(str(encrypted))) == 6
+        assert cipher.decrypt_range(str(encrypted), "pw5", 0, 6) == b"Sample"
+
+    def test_decrypt_container_without_key_slots(
+        self, cipher, sample_password, temp_dir
+    ):
+        """Test that containers keyed directly by the password still decrypt."""
+        kdf = new_kdf_params("fast")
+        key = cipher._key(sample_password, kdf)
+        header = {"cipher": "fernet", "kdf": kdf, "segment_size": 16, "trailer": True}
+        encrypted = temp_dir / "direct.txt.encrypto"
+        with open(encrypted, "wb") as f:
+            tag = container.write_header(f, key, header)
+            index = container.encrypt_segments(
+                container.FernetSegments(key), io.BytesIO(b"direct" * 10), f, 16
+            )
+            container.write_trailer(f, key, tag, index)
+
+        cipher.decrypt_file(str(encrypted), sample_password)
+        assert (temp_dir / "direct.txt").read_bytes() == b"direct" * 10
+
+    def test_file_timings(self, cipher, sample_password, temp_dir, monkeypatch):
+        """Test that reads ahead during key derivation still round trip."""
+        monkeypatch.setattr(pipeline, "PREFETCH_BYTES", 100_000)
+        source = temp_dir / "data.bin"
+        data = os.urandom(300_000)
+        source.write_bytes(data)
+        cipher.encrypt_file(str(source), sample_password, segment_size=4096)
+        assert cipher.timings is not None
+        assert 0 < cipher.timings.prefetched <= 100_000
+
+        source.unlink()
+        cipher.decrypt_file(f"{source}.encrypto", sample_password)
+        assert cipher.timings.kdf > 0
+        assert source.read_bytes() == data
+
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_plaintext_digest(self, cipher, sample_password, temp_dir, jobs):
+        """Test that encryption stores a plaintext digest and decryption checks it."""
+        source = temp_dir / "data.bin"
+        data = os.urandom(200_000)
+        source.write_bytes(data)
+        expected = ("SHA256", hashlib.sha256(data).hexdigest())
+        cipher.encrypt_file(
+            str(source), sample_password, 4096, jobs=jobs, digest_algorithm="SHA256"
+        )
+        assert cipher.plaintext_digest == expected
+
+        source.unlink()
+        cipher.decrypt_file(f"{source}.encrypto", sample_password, jobs)
+        assert cipher.plaintext_digest == expected
+        assert source.read_bytes() == data
+
+    def test_plaintext_digest_stream(self, cipher, sample_password):
+        """Test that streams are digested, and containers without one are not."""
+        data = os.urandom(50_000)
+        encrypted = io.BytesIO()
+        cipher.encrypt_stream(
+            io.BytesIO(data), encrypted, sample_password, digest_algorithm="BLAKE2B"
+        )
+        cipher.decrypt_stream(
+            io.BytesIO(encrypted.getvalue()), io.BytesIO(), sample_password
+        )
+        assert cipher.plaintext_digest == (
+            "BLAKE2B",
+            hashlib.blake2b(data).hexdigest(),
+        )
+
+        encrypted = io.BytesIO()
+        cipher.encrypt_stream(io.BytesIO(data), encrypted, sample_password)
+        assert cipher.plaintext_digest is None
+        cipher.decrypt_stream(
+            io.BytesIO(encrypted.getvalue()), io.BytesIO(), sample_password
+        )
+        assert cipher.plaintext_digest is None
+
+    @pytest.mark.parametrize("interrupted", ["SHA256"], indirect=True)
+    def test_plaintext_digest_resume(
+        self, cipher, sample_password, interrupted, monkeypatch
+    ):
+        """Test that a resumed run digests the verified and the new segments."""
+        sealed = self._count_seals(monkeypatch)
+        cipher.encrypt_file(
+            str(interrupted),
+            sample_password,
+            1024,
+            resume=True,
+            digest_algorithm="SHA256",
+        )
+        assert sealed == [6, 7, 8, 9]
+        expected = ("SHA256", hashlib.sha256(interrupted.read_bytes()).hexdigest())
+        assert cipher.plaintext_digest == expected
+
+        interrupted.unlink()
+        cipher.decrypt_file(f"{interrupted}.encrypto", sample_password)
+        assert cipher.plaintext_digest == expected
+
+    def test_plaintext_digest_resume_other_algorithm(
+        self, cipher, sample_password, interrupted, monkeypatch
+    ):
+        """Test that asking for a digest the interrupted run lacked starts over."""
+        sealed = self._count_seals(monkeypatch)
+        cipher.encrypt_file(
+            str(interrupted), sample_password, 1024, resume=True, digest_algorithm="MD5"
+        )
+        assert sealed == list(range(10))
+        assert cipher.plaintext_digest == (
+            "MD5",
+            hashlib.md5(interrupted.read_bytes()).hexdigest(),
+        )
+
+    def test_plaintext_digest_incremental(self, cipher, sample_password, temp_dir):
+        """Test that an incremental run digests the whole new plaintext."""
+        source = temp_dir / "dump.sql"
+        data = os.urandom(300_000)
+        source.write_bytes(data)
+        cipher.encrypt_file(str(source), sample_password, incremental=True)
+        data = data[:100_000] + b"UPDATE" + data[100_000:]
+        source.write_bytes(data)
+        cipher.encrypt_file(
+            str(source), sample_password, incremental=True, digest_algorithm="SHA1"
+        )
+        expected = ("SHA1", hashlib.sha1(data).hexdigest())
+        assert cipher.plaintext_digest == expected
+
+        source.unlink()
+        cipher.decrypt_file(f"{source}.encrypto", sample_password)
+        assert cipher.plaintext_digest == expected
+
+    def test_plaintext_digest_unknown_algorithm(
+        self, cipher, sample_file, sample_password
+    ):
+        """Test that an unknown algorithm is rejected without leaving output."""
+        with pytest.raises(ValueError, match="Unsupported algorithm"):
+            cipher.encrypt_file(
+                str(sample_file), sample_password, digest_algorithm="CRC32"
+            )
+        assert not os.path.exists(f"{sample_file}.encrypto")
+
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_verify_file(self, cipher, sample_password, temp_dir, jobs):
+        """Test that verification authenticates everything and writes nothing."""
+        source = temp_dir / "data.bin"
+        source.write_bytes(os.urandom(100_000))
+        cipher.encrypt_file(
+            str(source), sample_password, 4096, digest_algorithm="SHA256"
+        )
+        source.unlink()
+        encrypted = temp_dir / "data.bin.encrypto"
+        cipher.verify_file(str(encrypted), sample_password, jobs)
+        assert cipher.plaintext_digest[0] == "SHA256"
+        assert sorted(os.listdir(temp_dir)) == ["data.bin.encrypto"]
+
+        with pytest.raises(FatalError, match="key or the input data is wrong"):
+            cipher.verify_file(str(encrypted), "wrong")
+        raw = bytearray(encrypted.read_bytes())
+        raw[50_000] ^= 1
+        encrypted.write_bytes(bytes(raw))
+        with pytest.raises(FatalError):
+            cipher.verify_file(str(encrypted), sample_password, jobs)
+        assert sorted(os.listdir(temp_dir)) == ["data.bin.encrypto"]
+
+    def test_verify_truncated_and_legacy_files(self, cipher, sample_password, temp_dir):
+        """Test that truncation is detected and legacy files still verify."""
+        source = temp_dir / "data.bin"
+        source.write_bytes(os.urandom(10_000))
+        cipher.encrypt_file(str(source), sample_password, 1024)
+        encrypted = temp_dir / "data.bin.encrypto"
+        encrypted.write_bytes(encrypted.read_bytes()[:-2000])
+        with pytest.raises(FatalError, match="truncated|wrong|corrupted"):
+            cipher.verify_file(str(encrypted), sample_password)
+
+        legacy = temp_dir / "old.txt.encrypto"
+        legacy.write_bytes(Fernet(key_gen(sample_password)).encrypt(b"old"))
+        cipher.verify_file(str(legacy), sample_password)
+        with pytest.raises(FatalError, match="verifying"):
+            cipher.verify_file(str(legacy), "wrong")
+
+    def test_failed_decrypt_keeps_existing_output(
+        self, cipher, sample_password, temp_dir
+    ):
+        """Test that a failed decryption leaves no partial or temporary file."""
+        source = temp_dir / "data.bin"
+        source.write_bytes(os.urandom(10_000))
+        AESCipher(fsync_policy="none").encrypt_file(str(source), sample_password, 1024)
+        encrypted = temp_dir / "data.bin.encrypto"
+        encrypted.write_bytes(encrypted.read_bytes()[:-2000])
+        source.write_bytes(b"previous plaintext")
+        with pytest.raises(FatalError):
+            cipher.decrypt_file(str(encrypted), sample_password)
+        assert source.read_bytes() == b"previous plaintext"
+        assert sorted(os.listdir(temp_dir)) == ["data.bin", "data.bin.encrypto"]
+
+    def test_unknown_fsync_policy(self):
+        """Test that an unknown fsync policy is rejected up front."""
+        with pytest.raises(ValueError, match="Unknown fsync policy"):
+            AESCipher(fsync_policy="sometimes")
+
+    def test_keyfile_file_roundtrip(self, sample_file, sample_keyfile, temp_dir):
+        """Test that a keyfile replaces the password and is recorded."""
+        keyed = AESCipher.from_keyfile(str(sample_keyfile))
+        keyed.encrypt_file(str(sample_file), "")
+        encrypted = temp_dir / f"{sample_file.name}.encrypto"
+        with open(encrypted, "rb") as f:
+            f.read(len(container.MAGIC))
+            header, _, _ = container.read_header(f)
+        assert header["keys"][0]["kdf"]["algorithm"] == "hkdf-sha256"
+
+        with pytest.raises(FatalError, match="key or the input data is wrong"):
+            AESCipher().decrypt_file(str(encrypted), "any password")
+        sample_file.unlink()
+        AESCipher.from_keyfile(str(sample_keyfile)).decrypt_file(str(encrypted), "")
+        assert sample_file.read_text() == "Sample file content for testing."
+
+    def test_keyfile_text_roundtrip(self, sample_text, sample_keyfile):
+        """Test that texts encrypted with a keyfile carry HKDF parameters."""
+        keyed = AESCipher.from_keyfile(str(sample_keyfile))
+        encrypted = keyed.encrypt_text(sample_text, "")
+        assert encrypted.startswith("$encrypto$hkdf-sha256$$")
+        assert keyed.decrypt_text(encrypted, "") == sample_text
+        with pytest.raises(FatalError, match="encrypted with a keyfile"):
+            AESCipher().decrypt_text(encrypted, "password")
+
+    def test_keyfile_key_slot(
+        self, cipher, sample_file, sample_password, sample_keyfile, temp_dir
+    ):
+        """Test that a password file can also be opened by a keyfile."""
+        cipher.encrypt_file(str(sample_file), sample_password, kdf_profile="fast")
+        encrypted = temp_dir / f"{sample_file.name}.encrypto"
+        cipher.add_key_slot(
+            str(encrypted), sample_password, "", new_key_material=b"k" * 32
+        )
+        keyed = AESCipher(key_material=b"k" * 32)
+        assert keyed.decrypt_range(str(encrypted), "", 0, 6) == b"Sample"
+        assert cipher.decrypt_range(str(encrypted), sample_password, 0, 6) == b"Sample"
+        assert [
+            slot["algorithm"] for slot in cipher.list_key_slots(str(encrypted))
+        ] == [
+            "scrypt",
+            "hkdf-sha256",
+        ]
+
+    def test_encrypted_file_uses_container(
+        self, cipher, sample_file, sample_password, temp_dir
+    ):
+        """Test that encrypted files start with the container magic."""
+        cipher.encrypt_file(str(sample_file), sample_password)
+        encrypted_file = temp_dir / f"{sample_file.name}.encrypto"
+        assert encrypted_file.read_bytes().startswith(container.MAGIC)
+
+    def test_decrypt_legacy_file(self, cipher, sample_password, temp_dir):
+        """Test that single-token files from earlier versions still decrypt."""
+        legacy_file = temp_dir / "legacy.txt.encrypto"
+        legacy_file.write_bytes(
+            Fernet(key_gen(sample_password)).encrypt(b"legacy content")
+        )
+
+        cipher.decrypt_file(str(legacy_file), sample_password)
+        assert (temp_dir / "legacy.txt").read_bytes() == b"legacy content"
+
+    def test_decrypt_file_wrong_password(
+        self, cipher, sample_file, sample_password, temp_dir
+    ):
+        """Test that a wrong password is rejected before writing output."""
+        cipher.encrypt_file(str(sample_file), sample_password)
+        sample_file.unlink()
+        with pytest.raises(FatalError):
+            cipher.decrypt_file(f"{sample_file}.encrypto", "wrong_password")
+        assert not sample_file.exists()
+
+    def test_encrypted_text_records_kdf(self, cipher, sample_text, sample_password):
+        """Test that text ciphertext carries its salt and KDF cost."""
+        encrypted = cipher.encrypt_text(sample_text, sample_password, "fast")
+        assert encrypted.startswith("$encrypto$scrypt$n=4096,r=8,p=1$")
+        assert cipher.encrypt_text(sample_text, sample_password) != encrypted
+        assert cipher.decrypt_text(encrypted, sample_password) == sample_text
+
+    def test_decrypt_legacy_text(self, cipher, sample_text, sample_password):
+        """Test that bare tokens from earlier versions still decrypt."""
+        legacy = Fernet(key_gen(sample_password)).encrypt(sample_text.encode())
+        assert cipher.decrypt_text(legacy.decode(), sample_password) == sample_text
+
+    @pytest.mark.parametrize("profile", ["fast", "strong"])
+    def test_file_records_kdf_profile(
+        self, cipher, sample_file, sample_password, temp_dir, profile
+    ):
+        """Test that files decrypt with the KDF cost they were written with."""
+        cipher.encrypt_file(str(sample_file), sample_password, kdf_profile=profile)
+        encrypted_file = temp_dir / f"{sample_file.name}.encrypto"
+        with open(encrypted_file, "rb") as f:
+            f.read(len(container.MAGIC))
+            header, _, _ = container.read_header(f)
+        assert header["keys"][0]["kdf"]["n"] == KDF_PROFILES[profile]["n"]
+
+        sample_file.unlink()
+        cipher.decrypt_file(str(encrypted_file), sample_password)
+        assert sample_file.read_text() == "Sample file content for testing."
+
+    def test_encrypt_unknown_kdf_profile(self, cipher, sample_text, sample_password):
+        """Test that an unknown KDF profile is rejected."""
+        with pytest.raises(ValueError, match="Unknown KDF profile"):
+            cipher.encrypt_text(sample_text, sample_password, "glacial")
+
+    def test_key_cache_reused_across_calls(self, sample_text, sample_password):
+        """Test that an opted-in key cache avoids repeated derivation."""
+        cache = KeyCache()
+        cipher = AESCipher(key_cache=cache)
+        tokens = [cipher.encrypt_text(sample_text, sample_password) for _ in range(3)]
+        assert all(
+            cipher.decrypt_text(t, sample_password) == sample_text for t in tokens
+        )
+        assert cache.misses == 1
+        assert cache.hits == 5
+
+    def test_batch_texts_derive_key_once(self, sample_password):
+        """Test that a batch of texts costs one derivation each way."""
+        cache = KeyCache()
+        cipher = AESCipher(key_cache=cache)
+        secrets = [f"secret {i}" for i in range(20)]
+        tokens = list(cipher.encrypt_texts(secrets, sample_password, "fast"))
+        assert len(set(tokens)) == len(secrets)
+        assert list(cipher.decrypt_texts(tokens, sample_password)) == secrets
+        assert cache.misses == 1
+
+    def test_batch_texts_match_single_api(self, cipher, sample_password):
+        """Test that batch and single-text outputs are interchangeable."""
+        token = next(cipher.encrypt_texts(["one"], sample_password, "fast"))
+        assert cipher.decrypt_text(token, sample_password) == "one"
+        singles = [cipher.encrypt_text(t, sample_password, "fast") for t in "ab"]
+        assert list(cipher.decrypt_texts(singles, sample_password)) == ["a", "b"]
+
+    def test_batch_decrypt_legacy_token(self, cipher, sample_password):
+        """Test that legacy bare tokens decrypt in a batch."""
+        token = Fernet(key_gen(sample_password)).encrypt(b"old").decode()
+        assert list(cipher.decrypt_texts([token], sample_password)) == ["old"]
+
+    def test_batch_decrypt_wrong_password(self, cipher, sample_password):
+        """Test that a wrong password fails a batch decrypt."""
+        tokens = list(cipher.encrypt_texts(["a"], sample_password, "fast"))
+        with pytest.raises(FatalError):
+            list(cipher.decrypt_texts(tokens, "wrong"))
+
+    def test_batch_empty_password(self, cipher):
+        """Test that batch APIs reject an empty password up front."""
+        with pytest.raises(FatalError):
+            cipher.encrypt_texts(["a"], "")
+        with pytest.raises(FatalError):
+            cipher.decrypt_texts(["a"], "")
+
     @given(text=st.text(min_size=1, max_size=1000))
     def test_text_roundtrip_property(self, text):
         """Property test: any text encrypted then decrypted equals original."""
@@ -0,0 +1,78 @@
+"""Tests for per-segment compression in AES containers."""
+
+import io
+import os
+import zlib
+
+import pytest
+from cryptography.fernet import Fernet
+
+from encryptocli.encryption.aes import compression, container
+from encryptocli.util.exceptions import FatalError
+
+
+class TestCompression:
+    """Test the compression stage in front of the segment engines."""
+
+    @pytest.fixture
+    def key(self):
+        """Provide a random Fernet key."""
+        return Fernet.generate_key()
+
+    def test_entropy_estimate(self):
+        """Test that text scores low and random data scores high."""
+        assert compression.estimate_entropy(b"") == 0.0
+        assert compression.estimate_entropy(b"a" * 1000) == 0.0
+        assert compression.estimate_entropy(b"hello world " * 400) < 4
+        assert compression.estimate_entropy(os.urandom(4096)) > 7.5
+
+    @pytest.mark.parametrize("algorithm", ["zlib", "lzma"])
+    @pytest.mark.parametrize("engine", ["fernet", "aes-256-gcm"])
+    def test_roundtrip_shrinks_text(self, key, algorithm, engine):
+        """Test that compressible data round trips and gets smaller."""
+        data = b'{"level": "info", "message": "request served"}\n' * 2000
+        header = container.new_cipher_params(engine)
+        header.update(
+            compression=compression.new_compression_params(algorithm),
+            segment_size=4096,
+        )
+        sealed = io.BytesIO()
+        container.encrypt_segments(
+            container.segment_cipher(header, key), io.BytesIO(data), sealed, 4096
+        )
+        assert len(sealed.getvalue()) < len(data) // 5
+
+        sealed.seek(0)
+        output = io.BytesIO()
+        container.decrypt_segments(
+            container.segment_cipher(header, key), sealed, output
+        )
+        assert output.getvalue() == data
+
+    def test_incompressible_segments_stored(self, key):
+        """Test that high-entropy segments skip the compressor."""
+        cipher = compression.CompressedSegments(
+            container.FernetSegments(key), {"algorithm": "zlib"}, 4096
+        )
+        data = os.urandom(4096)
+        assert cipher._pack(data) == b"\x00" + data
+        assert cipher.open(0, cipher.seal(0, data, True)) == (data, True)
+
+    def test_decompression_is_bounded(self, key):
+        """Test that a segment inflating past the segment size is rejected."""
+        inner = container.FernetSegments(key)
+        bomb = inner.seal(0, b"\x01" + zlib.compress(b"\0" * 10_000), True)
+        cipher = compression.CompressedSegments(inner, {"algorithm": "zlib"}, 4096)
+        with pytest.raises(FatalError, match="corrupted"):
+            cipher.open(0, bomb)
+
+    def test_unknown_compression(self, key):
+        """Test that unknown algorithms and levels are rejected."""
+        with pytest.raises(ValueError, match="Unknown compression"):
+            compression.new_compression_params("brotli")
+        with pytest.raises(ValueError, match="between 0 and 9"):
+            compression.new_compression_params("zlib", 12)
+        with pytest.raises(FatalError, match="Unsupported compression"):
+            compression.CompressedSegments(
+                container.FernetSegments(key), {"algorithm": "x"}, 16
+            )
@@ -0,0 +1,232 @@
+"""Tests for the chunked AES container format."""
+
+import io
+
+import pytest
+from cryptography.fernet import Fernet
+
+from encryptocli.encryption.aes import container
+from encryptocli.util.exceptions import FatalError
+
+
+class TestContainer:
+    """Test segment sealing, framing and header authentication."""
+
+    @pytest.fixture
+    def key(self):
+        """Provide a random Fernet key."""
+        return Fernet.generate_key()
+
+    def _seal(self, key, data, segment_size=16):
+        """Encrypt data into an in-memory segment stream."""
+        sealed = io.BytesIO()
+        container.encrypt_segments(
+            container.FernetSegments(key), io.BytesIO(data), sealed, segment_size
+        )
+        sealed.seek(0)
+        return sealed
+
+    @pytest.mark.parametrize("size", [0, 1, 15, 16, 17, 100])
+    def test_segments_roundtrip(self, key, size):
+        """Test that data of any size survives a segment round trip."""
+        data = bytes(range(256))[:size]
+        output = io.BytesIO()
+        container.decrypt_segments(
+            container.FernetSegments(key), self._seal(key, data), output
+        )
+        assert output.getvalue() == data
+
+    def test_segments_are_bounded(self):
+        """Test that plaintext is split into segments of the requested size."""
+        segments = list(container.iter_plaintext_segments(io.BytesIO(b"x" * 40), 16))
+        assert [len(data) for _, data, _ in segments] == [16, 16, 8]
+        assert [final for _, _, final in segments] == [False, False, True]
+
+    def test_truncated_stream_detected(self, key):
+        """Test that dropping the final segment fails decryption."""
+        tokens = list(container.iter_sealed_segments(self._seal(key, b"y" * 40)))
+        truncated = io.BytesIO()
+        for token in tokens[:-1]:
+            truncated.write(len(token).to_bytes(4, "big") + token)
+        truncated.seek(0)
+        with pytest.raises(FatalError, match="truncated"):
+            container.decrypt_segments(
+                container.FernetSegments(key), truncated, io.BytesIO()
+            )
+
+    def test_reordered_segments_detected(self, key):
+        """Test that swapping segments fails decryption."""
+        tokens = list(container.iter_sealed_segments(self._seal(key, b"z" * 40)))
+        swapped = io.BytesIO()
+        for token in [tokens[1], tokens[0], tokens[2]]:
+            swapped.write(len(token).to_bytes(4, "big") + token)
+        swapped.seek(0)
+        with pytest.raises(FatalError, match="out of order"):
+            container.decrypt_segments(
+                container.FernetSegments(key), swapped, io.BytesIO()
+            )
+
+    @pytest.mark.parametrize("size", [0, 100, 5000])
+    def test_parallel_matches_serial_format(self, key, size):
+        """Test that parallel and serial modes read each other's output."""
+        data = bytes(range(256)) * (size // 256) + b"x" * (size % 256)
+        sealed = io.BytesIO()
+        container.encrypt_segments_parallel(
+            {}, key, io.BytesIO(data), sealed, 64, jobs=2
+        )
+        sealed.seek(0)
+        output = io.BytesIO()
+        container.decrypt_segments(container.FernetSegments(key), sealed, output)
+        assert output.getvalue() == data
+
+        output = io.BytesIO()
+        container.decrypt_segments_parallel(
+            {}, key, self._seal(key, data, 64), output, 2
+        )
+        assert output.getvalue() == data
+
+    def test_parallel_truncated_stream_detected(self, key):
+        """Test that parallel decryption also rejects truncated streams."""
+        tokens = list(container.iter_sealed_segments(self._seal(key, b"y" * 400)))
+        truncated = io.BytesIO()
+        for token in tokens[:-1]:
+            truncated.write(len(token).to_bytes(4, "big") + token)
+        truncated.seek(0)
+        with pytest.raises(FatalError, match="truncated"):
+            container.decrypt_segments_parallel({}, key, truncated, io.BytesIO(), 2)
+
+    @pytest.mark.parametrize("engine", ["fernet", "aes-256-gcm", "chacha20-poly1305"])
+    def test_segment_cipher_from_header(self, key, engine):
+        """Test that the header selects the segment engine."""
+        header = container.new_cipher_params(engine)
+        assert header["cipher"] == engine
+        cipher = container.segment_cipher(header, key)
+        sealed = io.BytesIO()
+        container.encrypt_segments(cipher, io.BytesIO(b"a" * 100), sealed, 16)
+        sealed.seek(0)
+        output = io.BytesIO()
+        container.decrypt_segments(
+            container.segment_cipher(header, key), sealed, output
+        )
+        assert output.getvalue() == b"a" * 100
+
+    def test_header_roundtrip_and_tag(self, key):
+        """Test that headers are read back and authenticated."""
+        stream = io.BytesIO()
+        container.write_header(stream, key, {"cipher": "fernet"})
+        stream.seek(0)
+        assert stream.read(len(container.MAGIC)) == container.MAGIC
+        header, raw, tag = container.read_header(stream)
+        assert header == {"cipher": "fernet"}
+        container.verify_header(key, raw, tag)
+        with pytest.raises(FatalError, match="key or the input data is wrong"):
+            container.verify_header(Fernet.generate_key(), raw, tag)
+
+    def test_key_slots_rewritten_in_place(self, key):
+        """Test that key slots can change without invalidating the header tag."""
+        stream = io.BytesIO()
+        header = {"cipher": "fernet", "keys": [{"key": "a"}]}
+        tag = container.write_header(stream, key, header)
+        stream.write(b"payload")
+        stream.seek(len(container.MAGIC))
+        _, raw, _ = container.read_header(stream)
+
+        header["keys"] = [{"key": "b"}, {"key": "c"}]
+        assert container.rewrite_header(stream, header, len(raw))
+        stream.seek(len(container.MAGIC))
+        read, raw, stored = container.read_header(stream)
+        assert read == header and stored == tag
+        container.verify_header(key, raw, stored)
+        assert stream.read() == b"payload"
+
+        header["keys"] = [{"key": "x" * len(raw)}]
+        assert not container.rewrite_header(stream, header, len(raw))
+        stream.seek(len(container.MAGIC))
+        container.read_header(stream)
+        copy = io.BytesIO()
+        container.copy_with_header(stream, copy, header, tag)
+        copy.seek(len(container.MAGIC))
+        read, raw, stored = container.read_header(copy)
+        assert read == header
+        container.verify_header(key, raw, stored)
+        assert copy.read() == b"payload"
+
+    def test_verify_segments(self, key):
+        """Test that written segments are checked against their plaintext."""
+        cipher = container.FernetSegments(key)
+        sealed = io.BytesIO()
+        written = container.encrypt_segments(cipher, io.BytesIO(b"a" * 40), sealed, 16)
+        sealed.seek(0)
+        index, final = container.verify_segments(
+            cipher, sealed, io.BytesIO(b"a" * 40), 2, 16
+        )
+        assert list(index.offsets) == list(written.offsets[:2]) and not final
+        sealed.seek(0)
+        with pytest.raises(FatalError, match="does not match"):
+            container.verify_segments(cipher, sealed, io.BytesIO(b"b" * 40), 2, 16)
+
+    def _container(self, key, data, segment_size=16, trailer=True):
+        """Write a full container and return it positioned after the header."""
+        header = {"segment_size": segment_size, "trailer": trailer}
+        stream = io.BytesIO()
+        tag = container.write_header(stream, key, header)
+        index = container.encrypt_segments(
+            container.FernetSegments(key), io.BytesIO(data), stream, segment_size
+        )
+        if trailer:
+            container.write_trailer(stream, key, tag, index, {"note": "x"})
+        stream.seek(len(container.MAGIC))
+        header, _, tag = container.read_header(stream)
+        return header, tag, stream
+
+    @pytest.mark.parametrize("trailer", [True, False])
+    @pytest.mark.parametrize(
+        "start,end", [(0, 1), (5, 40), (16, 32), (30, None), (99, 200), (120, 130)]
+    )
+    def test_decrypt_range(self, key, trailer, start, end):
+        """Test that ranges match slicing, with and without an index."""
+        data = bytes(range(100))
+        header, _, stream = self._container(key, data, trailer=trailer)
+        cipher = container.FernetSegments(key)
+        result = container.decrypt_range(cipher, header, stream, start, end)
+        assert result == data[start:end]
+
+    def test_decrypt_range_reads_only_covering_segments(self, key):
+        """Test that a range opens only the segments it covers."""
+        header, _, stream = self._container(key, b"q" * 1600)
+        opened = []
+        cipher = container.FernetSegments(key)
+        original = cipher.open
+
+        def spy(index, token):
+            opened.append(index)
+            return original(index, token)
+
+        cipher.open = spy
+        assert container.decrypt_range(cipher, header, stream, 800, 820) == b"q" * 20
+        assert opened == [50, 51]
+
+    def test_decrypt_range_tampered_index(self, key):
+        """Test that a forged offset fails authentication."""
+        header, _, stream = self._container(key, b"w" * 100)
+        raw = bytearray(stream.getvalue())
+        # Point the index entry for segment 1 at segment 0
+        footer = len(raw) - 32 - 12
+        entry = footer - len(b'{"note":"x","size":100}') - 7 * 8 + 8
+        raw[entry : entry + 8] = bytes(8)
+        tampered = io.BytesIO(bytes(raw))
+        tampered.seek(stream.tell())
+        with pytest.raises(FatalError):
+            container.decrypt_range(
+                container.FernetSegments(key), header, tampered, 16, 20
+            )
+
+    def test_trailer_roundtrip(self, key):
+        """Test that the trailer is authenticated after the segments."""
+        header, tag, stream = self._container(key, b"e" * 50)
+        container.decrypt_segments(container.FernetSegments(key), stream, io.BytesIO())
+        position = stream.tell()
+        assert container.read_trailer(stream, key, tag) == {"note": "x", "size": 50}
+        stream.seek(position)
+        with pytest.raises(FatalError, match="key or the input data is wrong"):
+            container.read_trailer(stream, key, bytes(32))
@@ -0,0 +1,59 @@
+"""Tests for overlapping key derivation with input reads."""
+
+import io
+import time
+
+import pytest
+
+from encryptocli.encryption.aes import pipeline
+from encryptocli.util.exceptions import FatalError
+
+
+class TestPipeline:
+    """Test the read-ahead stream and the overlapped key derivation."""
+
+    def test_prefetched_stream_reads_through(self):
+        """Test that buffered and remaining bytes read back in order."""
+        data = bytes(range(256)) * 40
+        src = io.BytesIO(data)
+        stream = pipeline.PrefetchedStream(src, src.read(1000))
+        assert stream.read(300) == data[:300]
+        assert stream.read(1000) == data[300:1300]
+        assert stream.read(0) == b""
+        assert stream.read() == data[1300:]
+        assert stream.read(10) == b""
+
+    def test_prefetched_stream_read_all(self):
+        """Test that an unbounded read returns the buffer and the rest."""
+        src = io.BytesIO(b"abcdef")
+        stream = pipeline.PrefetchedStream(src, src.read(2))
+        assert stream.read(1) == b"a"
+        assert stream.read(-1) == b"bcdef"
+
+    def test_reads_while_deriving(self):
+        """Test that input is read ahead until the derivation finishes."""
+        data = b"x" * 5_000_000
+        src = io.BytesIO(data)
+
+        def derive():
+            time.sleep(0.05)
+            return b"key"
+
+        key, stream, timings = pipeline.derive_while_prefetching(
+            derive, src, limit=1_000_000
+        )
+        assert key == b"key"
+        assert timings.prefetched == 1_000_000
+        assert timings.kdf >= 0.05 and timings.elapsed >= timings.kdf
+        assert timings.hidden >= 0
+        assert "hidden" in str(timings)
+        assert stream.read() == data
+
+    def test_derivation_error_propagates(self):
+        """Test that a failed derivation is raised to the caller."""
+
+        def derive():
+            raise FatalError("Either the key or the input data is wrong.")
+
+        with pytest.raises(FatalError, match="key or the input data is wrong"):
+            pipeline.derive_while_prefetching(derive, io.BytesIO(b"data"))
@@ -58,6 +58,66 @@ class TestPGPCipher:
         decrypted = cipher.decrypt_text(encrypted, test_passphrase)
         assert decrypted == sample_text
 
+    def test_encrypt_decrypt_stream(self, cipher, test_key_email, test_passphrase):
+        """Test PGP stream encryption and decryption roundtrip."""
+        import io
+
+        cipher.generate_key_pair("Test User", test_key_email, test_passphrase)
+        data = bytes(range(256)) * 64
+
+        encrypted = io.BytesIO()
+        cipher.encrypt_stream(io.BytesIO(data), encrypted, test_key_email)
+        assert encrypted.getvalue().startswith(b"-----BEGIN PGP MESSAGE-----")
+
+        decrypted = io.BytesIO()
+        cipher.decrypt_stream(
+            io.BytesIO(encrypted.getvalue()), decrypted, test_passphrase
+        )
+        assert decrypted.getvalue() == data
+
+    def test_sign_and_encrypt_file(
+        self, cipher, test_key_email, test_passphrase, sample_file, temp_dir
+    ):
+        """Test that a signed and encrypted file is written atomically."""
+        cipher.generate_key_pair("Test User", test_key_email, test_passphrase)
+
+        result = cipher.sign_and_encrypt_file(
+            str(sample_file), test_key_email, test_passphrase
+        )
+        assert result.endswith(f"{sample_file}.pgp")
+        # No temporary file is left next to the output
+        assert sorted(path.name for path in temp_dir.iterdir()) == [
+            sample_file.name,
+            f"{sample_file.name}.pgp",
+        ]
+
+        output_dir = temp_dir / "decrypted"
+        output_dir.mkdir()
+        cipher.decrypt_file(f"{sample_file}.pgp", test_passphrase, str(output_dir))
+        decrypted = output_dir / f"decrypted_{sample_file.name}"
+        assert decrypted.read_bytes() == sample_file.read_bytes()
+
+    @pytest.mark.parametrize("detach", [True, False])
+    def test_sign_verify_mapped_file(
+        self, cipher, test_key_email, test_passphrase, temp_dir, detach
+    ):
+        """Test signing and verifying a file large enough to be memory-mapped."""
+        cipher.generate_key_pair("Test User", test_key_email, test_passphrase)
+        large_file = temp_dir / "large.bin"
+        large_file.write_bytes(bytes(range(256)) * 8192)
+
+        cipher.sign_file(str(large_file), test_passphrase, detach=detach)
+        if detach:
+            result = cipher.verify_file(str(large_file), f"{large_file}.sig")
+        else:
+            result = cipher.verify_file(f"{large_file}.asc")
+        assert result["valid"]
+
+        large_file.write_bytes(b"tampered")
+        if detach:
+            result = cipher.verify_file(str(large_file), f"{large_file}.sig")
+            assert not result["valid"]
+
     @pytest.mark.skip(reason="PGP operations depend on GPG keyring state")
     def test_sign_verify_text(
         self, cipher, test_key_email, test_passphrase, sample_text
@@ -1,5 +1,7 @@
 """Tests for CLI interface using Typer's testing utilities."""
 
+import hashlib
+
 import pytest
 from typer.testing import CliRunner
 
@@ -30,6 +32,40 @@ class TestCLIHandler:
         assert result.exit_code == 0
         assert len(result.stdout) > 0
 
+    def test_hash_output_file(self, runner, sample_file, temp_dir):
+        """Test writing digests to a file, replacing it atomically."""
+        output = temp_dir / "digest.txt"
+        output.write_text("stale")
+        result = runner.invoke(
+            app,
+            ["hash", "-f", str(sample_file), "-a", "MD5,SHA1", "-o", str(output)],
+        )
+        assert result.exit_code == 0
+        data = sample_file.read_bytes()
+        assert output.read_text() == (
+            f"MD5 {hashlib.md5(data).hexdigest()}\n"
+            f"SHA1 {hashlib.sha1(data).hexdigest()}\n"
+        )
+        assert sorted(path.name for path in temp_dir.iterdir()) == [
+            "digest.txt",
+            "sample.txt",
+        ]
+
+    def test_hash_fsync_policy(self, runner, sample_file, temp_dir):
+        """Test that hash --fsync is accepted and validated."""
+        output = temp_dir / "SUMS"
+        result = runner.invoke(
+            app,
+            ["hash", "-d", str(temp_dir), "-o", str(output), "--fsync", "none"],
+        )
+        assert result.exit_code == 0
+        assert output.exists()
+        result = runner.invoke(
+            app, ["hash", "-f", str(sample_file), "-o", str(output), "--fsync", "often"]
+        )
+        assert result.exit_code == 1
+        assert "Unknown fsync policy" in result.stdout
+
     def test_hash_missing_input(self, runner):
         """Test hash command without text or file."""
         result = runner.invoke(app, ["hash", "--algorithm", "SHA256"])
@@ -59,6 +95,510 @@ class TestCLIHandler:
         )
         assert result.exit_code == 0
 
+    def test_encrypt_file_kdf_profile(self, runner, sample_file):
+        """Test choosing a KDF cost profile via CLI."""
+        result = runner.invoke(
+            app,
+            [
+                "encrypt",
+                "--file",
+                str(sample_file),
+                "--password",
+                "pass123",
+                "--kdf-profile",
+                "fast",
+            ],
+        )
+        assert result.exit_code == 0
+
+    def test_file_roundtrip_jobs(self, runner, sample_file, sample_password):
+        """Test encrypting and decrypting a file with several jobs via CLI."""
+        result = runner.invoke(
+            app,
+            ["encrypt", "-f", str(sample_file), "-p", sample_password, "-j", "2"],
+        )
+        assert result.exit_code == 0
+        sample_file.unlink()
+        result = runner.invoke(
+            app,
+            [
+                "decrypt",
+                "-f",
+                f"{sample_file}.encrypto",
+                "-p",
+                sample_password,
+                "-j",
+                "2",
+            ],
+        )
+        assert result.exit_code == 0
+        assert sample_file.read_text() == "Sample file content for testing."
+
+    @pytest.mark.parametrize("method", ["aead", "aes-gcm", "chacha20"])
+    def test_file_roundtrip_aead_method(
+        self, runner, sample_file, sample_password, method
+    ):
+        """Test encrypting a file with an AEAD method and decrypting it."""
+        result = runner.invoke(
+            app,
+            ["encrypt", "-f", str(sample_file), "-p", sample_password, "-m", method],
+        )
+        assert result.exit_code == 0
+        sample_file.unlink()
+        result = runner.invoke(
+            app, ["decrypt", "-f", f"{sample_file}.encrypto", "-p", sample_password]
+        )
+        assert result.exit_code == 0
+        assert sample_file.read_text() == "Sample file content for testing."
+
+    def test_batch_roundtrip(self, runner, temp_dir, sample_password):
+        """Test encrypting a batch file and decrypting it from stdin."""
+        batch = temp_dir / "secrets.txt"
+        batch.write_text("one\ntwo\n")
+        result = runner.invoke(
+            app,
+            [
+                "encrypt",
+                "-b",
+                str(batch),
+                "-p",
+                sample_password,
+                "--kdf-profile",
+                "fast",
+            ],
+        )
+        assert result.exit_code == 0
+        encrypted = result.stdout.splitlines()
+        assert len(encrypted) == 2
+        result = runner.invoke(
+            app,
+            ["decrypt", "-b", "-", "-p", sample_password],
+            input=result.stdout,
+        )
+        assert result.exit_code == 0
+        assert result.stdout.splitlines() == ["one", "two"]
+
+    def test_batch_with_text_rejected(self, runner, sample_password):
+        """Test that --batch cannot be combined with --text."""
+        result = runner.invoke(
+            app, ["encrypt", "-b", "-", "-t", "x", "-p", sample_password]
+        )
+        assert result.exit_code != 0
+        assert "only one of" in result.stdout
+
+    def test_decrypt_range(self, runner, temp_dir, sample_password):
+        """Test writing a decrypted byte range to stdout."""
+        source = temp_dir / "log.txt"
+        source.write_text("".join(f"line {i}\n" for i in range(1000)))
+        result = runner.invoke(
+            app, ["encrypt", "-f", str(source), "-p", sample_password]
+        )
+        assert result.exit_code == 0
+        result = runner.invoke(
+            app,
+            [
+                "decrypt",
+                "-f",
+                f"{source}.encrypto",
+                "-p",
+                sample_password,
+                "--range",
+                "7:13",
+            ],
+        )
+        assert result.exit_code == 0
+        assert result.stdout == "line 1"
+
+    def test_decrypt_range_invalid(self, runner, sample_file, sample_password):
+        """Test that malformed ranges are rejected."""
+        result = runner.invoke(
+            app,
+            ["decrypt", "-f", str(sample_file), "-p", sample_password, "--range", "x"],
+        )
+        assert result.exit_code != 0
+        assert "Invalid range" in result.stdout
+
+    def test_stdin_stdout_roundtrip(self, runner, sample_password):
+        """Test piping data through encrypt and decrypt with '-'."""
+        data = bytes(range(256)) * 1000
+        result = runner.invoke(
+            app,
+            ["encrypt", "-f", "-", "-p", sample_password, "--kdf-profile", "fast"],
+            input=data,
+        )
+        assert result.exit_code == 0
+        assert result.stdout_bytes.startswith(b"ENCRYPTO")
+        result = runner.invoke(
+            app,
+            ["decrypt", "-f", "-", "-p", sample_password],
+            input=result.stdout_bytes,
+        )
+        assert result.exit_code == 0
+        assert result.stdout_bytes == data
+
+    def test_encrypt_file_to_stdout(self, runner, sample_file, sample_password):
+        """Test that --output - writes file ciphertext to stdout."""
+        result = runner.invoke(
+            app, ["encrypt", "-f", str(sample_file), "-p", sample_password, "-o", "-"]
+        )
+        assert result.exit_code == 0
+        assert result.stdout_bytes.startswith(b"ENCRYPTO")
+        assert not sample_file.with_name(f"{sample_file.name}.encrypto").exists()
+
+    def test_file_to_stdout_reads_through_open_input(
+        self, runner, temp_dir, sample_password, monkeypatch
+    ):
+        """Test that a file streamed to stdout is opened with open_input."""
+        import encryptocli.interfaces.cli_handler as cli_handler
+
+        opened = []
+        open_input = cli_handler.open_input
+
+        def record(path):
+            handle = open_input(path)
+            opened.append((handle.name, handle.mapped))
+            return handle
+
+        monkeypatch.setattr(cli_handler, "open_input", record)
+        source = temp_dir / "large.bin"
+        data = bytes(range(256)) * 8192
+        source.write_bytes(data)
+        result = runner.invoke(
+            app, ["encrypt", "-f", str(source), "-p", sample_password, "-o", "-"]
+        )
+        assert result.exit_code == 0
+        encrypted = temp_dir / "large.bin.encrypto"
+        encrypted.write_bytes(result.stdout_bytes)
+
+        result = runner.invoke(
+            app, ["decrypt", "-f", str(encrypted), "-p", sample_password, "-o", "-"]
+        )
+        assert result.exit_code == 0
+        assert result.stdout_bytes == data
+        assert opened == [(str(source), True), (str(encrypted), True)]
+
+    def test_hash_stdin(self, runner):
+        """Test hashing stdin and printing the bare digest."""
+        result = runner.invoke(app, ["hash", "-f", "-", "-o", "-"], input=b"hello")
+        assert result.exit_code == 0
+        assert result.stdout == (
+            "2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824\n"
+        )
+
+    def test_hash_multiple_algorithms(self, runner, sample_file):
+        """Test hashing a file with a comma-separated algorithm list."""
+        data = sample_file.read_bytes()
+        result = runner.invoke(
+            app, ["hash", "-f", str(sample_file), "-a", "SHA256,SHA512", "-o", "-"]
+        )
+        assert result.exit_code == 0
+        assert result.stdout.splitlines() == [
+            f"SHA256 {hashlib.sha256(data).hexdigest()}",
+            f"SHA512 {hashlib.sha512(data).hexdigest()}",
+        ]
+
+        result = runner.invoke(app, ["hash", "-t", "hello", "-a", "MD5, SHA1"])
+        assert result.exit_code == 0
+        assert f"Hash (MD5): {hashlib.md5(b'hello').hexdigest()}" in result.stdout
+        assert f"Hash (SHA1): {hashlib.sha1(b'hello').hexdigest()}" in result.stdout
+
+    def test_hash_directory(self, runner, temp_dir, monkeypatch):
+        """Test writing GNU and BSD manifests of a directory."""
+        monkeypatch.chdir(temp_dir)
+        tree = temp_dir / "tree"
+        (tree / "sub").mkdir(parents=True)
+        (tree / "sub" / "a.txt").write_bytes(b"a")
+        (tree / "b.txt").write_bytes(b"b")
+        sha_a = hashlib.sha256(b"a").hexdigest()
+        sha_b = hashlib.sha256(b"b").hexdigest()
+
+        # Paths are as reached from the working directory, like find prints
+        result = runner.invoke(app, ["hash", "--dir", "tree"])
+        assert result.exit_code == 0
+        assert result.stdout == f"{sha_b}  tree/b.txt\n{sha_a}  tree/sub/a.txt\n"
+
+        sums = tree / "SUMS"
+        monkeypatch.chdir(tree)
+        for _ in range(2):
+            result = runner.invoke(
+                app, ["hash", "-d", ".", "--format", "bsd", "-o", "SUMS"]
+            )
+            assert result.exit_code == 0
+        # The manifest never lists itself
+        assert sums.read_text() == (
+            f"SHA256 (b.txt) = {sha_b}\nSHA256 (sub/a.txt) = {sha_a}\n"
+        )
+
+        result = runner.invoke(app, ["hash", "-d", ".", "-a", "SHA256,MD5"])
+        assert result.exit_code == 1
+        assert "single algorithm" in result.stdout
+
+    def test_hash_check(self, runner, temp_dir, monkeypatch):
+        """Test checking a manifest written by hash --dir from outside the tree."""
+        monkeypatch.chdir(temp_dir)
+        tree = temp_dir / "tree"
+        (tree / "sub").mkdir(parents=True)
+        (tree / "sub" / "a.txt").write_bytes(b"a")
+        (tree / "b.txt").write_bytes(b"b")
+        result = runner.invoke(app, ["hash", "-d", "tree", "-a", "BLAKE3"])
+        (temp_dir / "tree.b3").write_text(result.stdout)
+
+        result = runner.invoke(app, ["hash", "--check", "tree.b3", "-a", "BLAKE3"])
+        assert result.exit_code == 0
+        assert "2 succeeded, 0 failed" in result.stdout
+
+        (tree / "b.txt").write_bytes(b"tampered")
+        result = runner.invoke(
+            app, ["hash", "-c", "tree.b3", "-a", "BLAKE3", "-j", "1", "--processes"]
+        )
+        assert result.exit_code == 1
+        assert "tree/b.txt: Checksum does not match" in result.stdout
+        assert "1 succeeded, 1 failed" in result.stdout
+
+    def test_hash_threads(self, runner, sample_file):
+        """Test BLAKE3 hashing with --threads."""
+        single = runner.invoke(app, ["hash", "-f", str(sample_file), "-a", "BLAKE3"])
+        threaded = runner.invoke(
+            app, ["hash", "-f", str(sample_file), "-a", "BLAKE3", "--threads", "0"]
+        )
+        assert threaded.exit_code == 0
+        assert threaded.stdout == single.stdout
+
+        result = runner.invoke(app, ["hash", "-f", str(sample_file), "--threads", "-2"])
+        assert result.exit_code == 1
+        assert "Thread count" in result.stdout
+
+    def test_compressed_roundtrip(self, runner, temp_dir, sample_password):
+        """Test encrypting with --compress and decrypting without options."""
+        source = temp_dir / "data.json"
+        source.write_text('{"key": "value"}\n' * 5000)
+        result = runner.invoke(
+            app,
+            ["encrypt", "-f", str(source), "-p", sample_password, "-c", "lzma"],
+        )
+        assert result.exit_code == 0
+        source.unlink()
+        result = runner.invoke(
+            app, ["decrypt", "-f", f"{source}.encrypto", "-p", sample_password]
+        )
+        assert result.exit_code == 0
+        assert source.read_text() == '{"key": "value"}\n' * 5000
+
+    def test_encrypt_resume(self, runner, sample_file, sample_password):
+        """Test that --resume encrypts a file and removes its journal."""
+        result = runner.invoke(
+            app,
+            ["encrypt", "-f", str(sample_file), "-p", sample_password, "--resume"],
+        )
+        assert result.exit_code == 0
+        encrypted = sample_file.with_name(f"{sample_file.name}.encrypto")
+        assert encrypted.exists()
+        assert not encrypted.with_name(f"{encrypted.name}.journal").exists()
+
+    def test_encrypt_incremental(self, runner, temp_dir, sample_password):
+        """Test that --incremental keeps a manifest and round trips."""
+        source = temp_dir / "dump.sql"
+        source.write_bytes(b"INSERT INTO t VALUES (1);\n" * 20_000)
+        for _ in range(2):
+            result = runner.invoke(
+                app,
+                ["encrypt", "-f", str(source), "-p", sample_password, "--incremental"],
+            )
+            assert result.exit_code == 0
+        assert (temp_dir / "dump.sql.encrypto.manifest").exists()
+
+        source.unlink()
+        result = runner.invoke(
+            app, ["decrypt", "-f", f"{source}.encrypto", "-p", sample_password]
+        )
+        assert result.exit_code == 0
+        assert source.read_bytes() == b"INSERT INTO t VALUES (1);\n" * 20_000
+
+    def test_rekey_file(self, runner, sample_file, sample_password):
+        """Test that rekey changes the password a file decrypts with."""
+        runner.invoke(app, ["encrypt", "-f", str(sample_file), "-p", sample_password])
+        encrypted = f"{sample_file}.encrypto"
+        result = runner.invoke(
+            app,
+            ["rekey", "-f", encrypted, "-p", sample_password, "--new-password", "new"],
+        )
+        assert result.exit_code == 0
+        assert "Password changed successfully" in result.stdout
+
+        sample_file.unlink()
+        result = runner.invoke(app, ["decrypt", "-f", encrypted, "-p", "new"])
+        assert result.exit_code == 0
+        assert sample_file.exists()
+
+    def test_verify_file(self, runner, sample_file, sample_password):
+        """Test that verify checks a file without writing its plaintext."""
+        runner.invoke(app, ["encrypt", "-f", str(sample_file), "-p", sample_password])
+        sample_file.unlink()
+        encrypted = f"{sample_file}.encrypto"
+        result = runner.invoke(app, ["verify", "-f", encrypted, "-p", sample_password])
+        assert result.exit_code == 0
+        assert "File verified successfully" in result.stdout
+        assert not sample_file.exists()
+
+        result = runner.invoke(app, ["verify", "-f", encrypted, "-p", "wrong"])
+        assert result.exit_code == 1
+
+    def test_verify_directory(self, runner, temp_dir, sample_password):
+        """Test that verify reports every file of a directory."""
+        (temp_dir / "a.txt").write_text("a")
+        runner.invoke(
+            app, ["encrypt", "-d", str(temp_dir), "-p", sample_password, "-j", "2"]
+        )
+        result = runner.invoke(
+            app, ["verify", "-d", str(temp_dir), "-p", sample_password, "-j", "2"]
+        )
+        assert result.exit_code == 0
+        assert "1 succeeded, 0 failed" in result.stdout
+
+    def test_rekey_requires_one_target(self, runner):
+        """Test that rekey needs exactly one of --file or --dir."""
+        result = runner.invoke(app, ["rekey", "-p", "old", "--new-password", "new"])
+        assert result.exit_code == 1
+        assert "exactly one of --file or --dir" in result.stdout
+
+    def test_keyslot_add_list_remove(self, runner, sample_file, sample_password):
+        """Test managing the passwords of a file through key slots."""
+        runner.invoke(app, ["encrypt", "-f", str(sample_file), "-p", sample_password])
+        encrypted = f"{sample_file}.encrypto"
+        result = runner.invoke(
+            app,
+            ["keyslot", "add", "-f", encrypted, "-p", sample_password]
+            + ["--new-password", "recovery", "--kdf-profile", "fast"],
+        )
+        assert result.exit_code == 0
+        assert "Added key slot 1" in result.stdout
+
+        result = runner.invoke(app, ["keyslot", "list", "-f", encrypted])
+        assert result.exit_code == 0
+        assert "1: " in result.stdout and "n=4096" in result.stdout
+
+        result = runner.invoke(
+            app, ["keyslot", "remove", "-f", encrypted, "--slot", "0", "-p", "recovery"]
+        )
+        assert result.exit_code == 0
+        result = runner.invoke(app, ["decrypt", "-f", encrypted, "-p", sample_password])
+        assert result.exit_code == 1
+
+    def test_file_timings(self, runner, sample_file, sample_password):
+        """Test that --timings reports the overlapped key derivation on stderr."""
+        result = runner.invoke(
+            app,
+            ["encrypt", "-f", str(sample_file), "-p", sample_password, "--timings"],
+        )
+        assert result.exit_code == 0
+        assert "Timings: KDF" in result.stderr and "hidden" in result.stderr
+
+        result = runner.invoke(
+            app,
+            ["decrypt", "-f", f"{sample_file}.encrypto", "-p", sample_password]
+            + ["--timings"],
+        )
+        assert result.exit_code == 0
+        assert "Timings: KDF" in result.stderr
+
+    def test_file_digest(self, runner, sample_file, sample_password):
+        """Test that --digest reports the plaintext hash on encrypt and decrypt."""
+        expected = hashlib.sha256(sample_file.read_bytes()).hexdigest()
+        result = runner.invoke(
+            app,
+            ["encrypt", "-f", str(sample_file), "-p", sample_password]
+            + ["--digest", "SHA256"],
+        )
+        assert result.exit_code == 0
+        assert f"Plaintext hash (SHA256): {expected}" in result.stdout
+
+        sample_file.unlink()
+        result = runner.invoke(
+            app, ["decrypt", "-f", f"{sample_file}.encrypto", "-p", sample_password]
+        )
+        assert result.exit_code == 0
+        assert f"Plaintext hash (SHA256): {expected}" in result.stdout
+
+    def test_fsync_policy(self, runner, sample_file, sample_password):
+        """Test that --fsync is accepted and validated."""
+        result = runner.invoke(
+            app,
+            ["encrypt", "-f", str(sample_file), "-p", sample_password]
+            + ["--fsync", "none"],
+        )
+        assert result.exit_code == 0
+        result = runner.invoke(
+            app,
+            ["decrypt", "-f", f"{sample_file}.encrypto", "-p", sample_password]
+            + ["--fsync", "often"],
+        )
+        assert result.exit_code == 1
+        assert "Unknown fsync policy" in result.stdout
+
+    def test_keyfile_roundtrip(self, runner, sample_file, sample_keyfile):
+        """Test that --keyfile encrypts and decrypts without a password prompt."""
+        result = runner.invoke(
+            app, ["encrypt", "-f", str(sample_file), "--keyfile", str(sample_keyfile)]
+        )
+        assert result.exit_code == 0
+        sample_file.unlink()
+        result = runner.invoke(
+            app,
+            [
+                "decrypt",
+                "-f",
+                f"{sample_file}.encrypto",
+                "--keyfile",
+                str(sample_keyfile),
+            ],
+        )
+        assert result.exit_code == 0
+        assert sample_file.read_text() == "Sample file content for testing."
+
+    def test_encrypt_unknown_compression(self, runner, sample_file):
+        """Test that an unknown compression is rejected."""
+        result = runner.invoke(
+            app, ["encrypt", "-f", str(sample_file), "-p", "pw", "-c", "brotli"]
+        )
+        assert result.exit_code != 0
+        assert "Unknown compression" in result.stdout
+
+    def test_directory_roundtrip(self, runner, temp_dir, sample_password):
+        """Test encrypting and decrypting a directory tree."""
+        (temp_dir / "sub").mkdir()
+        (temp_dir / "a.txt").write_text("a")
+        (temp_dir / "sub" / "b.txt").write_text("b")
+        result = runner.invoke(
+            app,
+            ["encrypt", "--dir", str(temp_dir), "-p", sample_password, "-j", "2"],
+        )
+        assert result.exit_code == 0
+        assert "2 succeeded, 0 failed" in result.stdout
+
+        (temp_dir / "a.txt").unlink()
+        (temp_dir / "sub" / "b.txt").unlink()
+        result = runner.invoke(
+            app, ["decrypt", "--dir", str(temp_dir), "-p", sample_password]
+        )
+        assert result.exit_code == 0
+        assert (temp_dir / "sub" / "b.txt").read_text() == "b"
+
+    def test_directory_failure_exit_code(self, runner, temp_dir):
+        """Test that a failed file is reported and sets the exit code."""
+        (temp_dir / "bad.encrypto").write_bytes(b"garbage")
+        result = runner.invoke(app, ["decrypt", "--dir", str(temp_dir), "-p", "pw"])
+        assert result.exit_code == 1
+        assert "0 succeeded, 1 failed" in result.stdout
+
+    def test_encrypt_unknown_kdf_profile(self, runner):
+        """Test that an unknown KDF profile fails via CLI."""
+        result = runner.invoke(
+            app,
+            ["encrypt", "--text", "secret", "-p", "pass123", "--kdf-profile", "x"],
+        )
+        assert result.exit_code != 0
+        assert "Unknown KDF profile" in result.stdout
+
     def test_decrypt_text_aes(self, runner, sample_text, sample_password):
         """Test decrypting text via CLI."""
         from encryptocli.services import EncryptionService
@@ -1,5 +1,7 @@
 """Tests for decryption service."""
 
+import shutil
+
 import pytest
 from hypothesis import given, strategies as st
 
@@ -50,6 +52,103 @@ class TestDecryptionService:
         decrypted = service.decrypt_text(encrypted, sample_password)
         assert decrypted == sample_text
 
+    def test_decrypt_records_jsonl(self, service, enc_service, sample_password):
+        """Test a JSONL record roundtrip that keeps other fields."""
+        lines = ['{"id": 1, "value": "a"}', '"b"']
+        encrypted = enc_service.encrypt_records(
+            lines, sample_password, record_format="jsonl", kdf_profile="fast"
+        )
+        decrypted = service.decrypt_records(
+            encrypted, sample_password, record_format="jsonl"
+        )
+        assert list(decrypted) == ['{"id": 1, "value": "a"}', '"b"']
+
+    def test_directory_roundtrip(self, service, enc_service, temp_dir, monkeypatch):
+        """Test encrypting and decrypting a tree with one key derivation."""
+        import encryptocli.util.key_gen as key_gen_module
+
+        for name in ["a.txt", "b.txt", "sub/c.txt"]:
+            path = temp_dir / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(name)
+        (temp_dir / "skip.bin").write_text("skip")
+
+        derivations = []
+        scrypt = key_gen_module.scrypt
+        monkeypatch.setattr(
+            key_gen_module,
+            "scrypt",
+            lambda *args, **kwargs: derivations.append(1) or scrypt(*args, **kwargs),
+        )
+        results = enc_service.encrypt_directory(
+            str(temp_dir), "pw", include=["*.txt"], jobs=3, kdf_profile="fast"
+        )
+        assert [error for _, error in results] == [None] * 3
+        assert (temp_dir / "sub/c.txt.encrypto").exists()
+        assert not (temp_dir / "skip.bin.encrypto").exists()
+
+        for name in ["a.txt", "b.txt", "sub/c.txt"]:
+            (temp_dir / name).unlink()
+        results = service.decrypt_directory(str(temp_dir), "pw", jobs=3)
+        assert [error for _, error in results] == [None] * 3
+        assert (temp_dir / "sub/c.txt").read_text() == "sub/c.txt"
+        assert len(derivations) == 2
+
+    def test_pgp_directory_roundtrip(self, service, enc_service, temp_dir):
+        """Test that parallel PGP workers keep each file's output apart."""
+        pytest.importorskip("gnupg", reason="GPG not installed")
+        if shutil.which("gpg") is None:
+            pytest.skip("GPG not installed")
+        from encryptocli.encryption.pgp import PGPCipher
+
+        email = "test@encryptocli.test"
+        PGPCipher().generate_key_pair("Test User", email, "test_passphrase_123")
+        contents = {f"f{index:02}.txt": f"file {index} " * 200 for index in range(12)}
+        for name, text in contents.items():
+            (temp_dir / name).write_text(text)
+
+        results = enc_service.encrypt_directory(
+            str(temp_dir), "", method="pgp", jobs=8, recipient_email=email
+        )
+        assert [error for _, error in results] == [None] * 12
+
+        output_dir = temp_dir / "out"
+        output_dir.mkdir()
+        results = service.decrypt_directory(
+            str(temp_dir),
+            "test_passphrase_123",
+            method="pgp",
+            jobs=8,
+            output_dir=str(output_dir),
+        )
+        assert [error for _, error in results] == [None] * 12
+        for name, text in contents.items():
+            assert (output_dir / f"decrypted_{name}").read_text() == text
+
+    def test_directory_reports_bad_files(self, service, temp_dir):
+        """Test that a corrupt file fails alone."""
+        (temp_dir / "bad.encrypto").write_bytes(b"not encrypted")
+        results = service.decrypt_directory(str(temp_dir), "pw")
+        assert len(results) == 1
+        assert results[0][1] is not None
+
+    def test_verify_directory(self, service, enc_service, temp_dir):
+        """Test that a tree is verified in place and a damaged file fails alone."""
+        for name in ["a.txt", "sub/b.txt"]:
+            path = temp_dir / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(name * 1000)
+        enc_service.encrypt_directory(str(temp_dir), "pw", jobs=2, kdf_profile="fast")
+        (temp_dir / "bad.encrypto").write_bytes(b"not encrypted")
+
+        results = dict(service.verify_directory(str(temp_dir), "pw", jobs=2))
+        assert results[str(temp_dir / "a.txt.encrypto")] is None
+        assert results[str(temp_dir / "sub/b.txt.encrypto")] is None
+        assert results[str(temp_dir / "bad.encrypto")] is not None
+        assert service.verify_file(str(temp_dir / "a.txt.encrypto"), "pw") == (
+            "File verified successfully"
+        )
+
     @given(text=st.text(min_size=1, max_size=500))
     def test_roundtrip_any_text(self, text):
         """Property test: encrypt then decrypt returns original for any text."""
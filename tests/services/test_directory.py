@@ -0,0 +1,80 @@
+"""Tests for directory file selection and batch processing."""
+
+import threading
+
+import pytest
+
+from encryptocli.encryption.aes import AESCipher
+from encryptocli.services.directory import (
+    per_thread,
+    run_batch,
+    select_files,
+    shared_key_cache,
+)
+from encryptocli.util.exceptions import FatalError
+from encryptocli.util.key_gen import KeyCache
+
+
+class TestDirectory:
+    """Test glob selection, the worker pool and key sharing."""
+
+    @pytest.fixture
+    def tree(self, temp_dir):
+        """Create a small directory tree."""
+        for name in ["a.log", "b.txt", "sub/c.log", "sub/deep/d.log", "e.encrypto"]:
+            path = temp_dir / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(name)
+        return temp_dir
+
+    def _names(self, root, paths):
+        """Make selected paths relative for comparison."""
+        return [str(p)[len(str(root)) + 1 :].replace("\\", "/") for p in paths]
+
+    def test_select_all(self, tree):
+        """Test that every file is selected by default."""
+        assert len(select_files(str(tree))) == 5
+
+    def test_select_include_exclude(self, tree):
+        """Test name and path globs."""
+        selected = select_files(str(tree), ["*.log"], ["sub/deep/*"])
+        assert self._names(tree, selected) == ["a.log", "sub/c.log"]
+
+    def test_select_missing_directory(self, temp_dir):
+        """Test that a missing directory is an error."""
+        with pytest.raises(FatalError, match="Directory not found"):
+            select_files(str(temp_dir / "missing"))
+
+    def test_run_batch_reports_failures(self):
+        """Test that one failure does not stop the batch."""
+
+        def action(path):
+            if path == "bad":
+                raise FatalError("boom")
+
+        results = run_batch(["a", "bad", "c"], action, 2)
+        assert results == [("a", None), ("bad", "boom"), ("c", None)]
+
+    def test_per_thread(self):
+        """Test that each thread gets one object of its own."""
+        get = per_thread(object)
+        assert get() is get()
+
+        seen = []
+        thread = threading.Thread(target=lambda: seen.append(get()))
+        thread.start()
+        thread.join()
+        assert seen[0] is not get()
+
+    def test_shared_key_cache(self):
+        """Test that a temporary cache is installed and then removed."""
+        cipher = AESCipher()
+        with shared_key_cache(cipher) as cache:
+            assert cipher.key_cache is cache
+        assert cipher.key_cache is None
+
+        existing = KeyCache()
+        cipher = AESCipher(existing)
+        with shared_key_cache(cipher) as cache:
+            assert cache is existing
+        assert cipher.key_cache is existing
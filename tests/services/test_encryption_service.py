@@ -32,6 +32,52 @@ class TestEncryptionService:
         encrypted = service.encrypt_text(sample_text, sample_password)
         assert encrypted != sample_text
 
+    def test_encrypt_records_aes(self, service, sample_password):
+        """Test that records encrypt one output per input."""
+        records = list(service.encrypt_records(["a", "b"], sample_password))
+        assert len(records) == 2
+        assert all(r.startswith("$encrypto$") for r in records)
+
+    def test_rekey_directory(self, service, temp_dir):
+        """Test that every encrypted file under a directory gets the new password."""
+        (temp_dir / "sub").mkdir()
+        (temp_dir / "a.txt").write_text("a")
+        (temp_dir / "sub" / "b.txt").write_text("b")
+        service.encrypt_directory(str(temp_dir), "old", kdf_profile="fast")
+
+        results = service.rekey_directory(str(temp_dir), "old", "new", jobs=2)
+        assert [error for _, error in results] == [None, None]
+        (temp_dir / "a.txt").unlink()
+        service.aes_cipher.decrypt_file(str(temp_dir / "a.txt.encrypto"), "new")
+        assert (temp_dir / "a.txt").read_text() == "a"
+
+    def test_directory_workers_own_ciphers(self, service, temp_dir, monkeypatch):
+        """Test that batch threads never share a cipher, only the key cache."""
+        import threading
+
+        from encryptocli.encryption.aes import AESCipher
+
+        for index in range(8):
+            (temp_dir / f"{index}.txt").write_text(str(index))
+        calls = []
+        encrypt_file = AESCipher.encrypt_file
+
+        def record(cipher, *args, **kwargs):
+            calls.append((cipher, threading.get_ident(), cipher.key_cache))
+            return encrypt_file(cipher, *args, **kwargs)
+
+        monkeypatch.setattr(AESCipher, "encrypt_file", record)
+        results = service.encrypt_directory(
+            str(temp_dir), "pw", jobs=4, kdf_profile="fast", digest_algorithm="SHA256"
+        )
+        assert [error for _, error in results] == [None] * 8
+        assert all(cipher is not service.aes_cipher for cipher, _, _ in calls)
+        threads_by_cipher = {}
+        for cipher, thread, _ in calls:
+            threads_by_cipher.setdefault(cipher, set()).add(thread)
+        assert all(len(threads) == 1 for threads in threads_by_cipher.values())
+        assert len({id(cache) for _, _, cache in calls}) == 1
+
     @given(text=st.text(min_size=1, max_size=500))
     def test_encrypt_text_any_input(self, text):
         """Property test: service can encrypt any text."""
@@ -1,5 +1,7 @@
 """Tests for hashing service."""
 
+import os
+
 import pytest
 
 from encryptocli.services.hashing_service import HashingService
@@ -108,3 +110,128 @@ class TestHashingService:
         expected = "2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824"
         result = service.hash_text(text, "SHA256")
         assert result == expected
+
+    def test_hash_stream_matches_file(self, service, sample_file):
+        """Test that hashing a stream matches hashing the file."""
+        with open(sample_file, "rb") as stream:
+            result = service.hash_stream(stream, "SHA256")
+        assert result == service.hash_file(str(sample_file), "SHA256")
+
+    @pytest.mark.parametrize("algorithm", ["SHA256", "BLAKE3"])
+    def test_hash_mapped_file(self, service, temp_dir, algorithm):
+        """Test hashing a file large enough to be memory-mapped."""
+        data = os.urandom(3 * 1024 * 1024 + 17)
+        path = temp_dir / "large.bin"
+        path.write_bytes(data)
+        expected = service.ALGORITHMS[algorithm](data).hexdigest()
+        assert service.hash_file(str(path), algorithm) == expected
+
+    def test_hash_file_multi(self, service, temp_dir):
+        """Test hashing a file with several algorithms in one read."""
+        data = os.urandom(2 * 1024 * 1024 + 5)
+        path = temp_dir / "artifact.bin"
+        path.write_bytes(data)
+        algorithms = ["SHA256", "SHA512", "BLAKE3", "SHA256"]
+        result = service.hash_file_multi(str(path), algorithms)
+        assert list(result) == ["SHA256", "SHA512", "BLAKE3"]
+        for algorithm, digest in result.items():
+            assert digest == service.ALGORITHMS[algorithm](data).hexdigest()
+
+    def test_hash_stream_multi(self, service, sample_file):
+        """Test that multi-algorithm stream hashing matches single hashes."""
+        with open(sample_file, "rb") as stream:
+            result = service.hash_stream_multi(stream, ["MD5", "SHA3_256"])
+        for algorithm, digest in result.items():
+            assert digest == service.hash_file(str(sample_file), algorithm)
+
+    def test_hash_multi_invalid_algorithms(self, service, sample_file):
+        """Test that unknown or missing algorithms are rejected."""
+        with pytest.raises(ValueError, match="Unsupported algorithm"):
+            service.hash_file_multi(str(sample_file), ["SHA256", "INVALID"])
+        with pytest.raises(ValueError, match="No hashing algorithm"):
+            service.hash_file_multi(str(sample_file), [])
+
+    def test_buffer_size(self, sample_file):
+        """Test that a small buffer gives the same digest and bad sizes fail."""
+        small = HashingService(buffer_size=7)
+        with open(sample_file, "rb") as stream:
+            assert small.hash_stream(stream, "SHA256") == HashingService().hash_file(
+                str(sample_file), "SHA256"
+            )
+        with pytest.raises(ValueError, match="Buffer size"):
+            HashingService(buffer_size=0)
+
+    @pytest.mark.parametrize("threads", [0, 4])
+    def test_blake3_threads(self, service, temp_dir, threads):
+        """Test that multithreaded BLAKE3 matches the single-threaded digest."""
+        data = os.urandom(20 * 1024 * 1024 + 3)
+        path = temp_dir / "image.bin"
+        path.write_bytes(data)
+        threaded = HashingService(threads=threads)
+        assert threaded.hash_file(str(path), "BLAKE3") == service.hash_file(
+            str(path), "BLAKE3"
+        )
+        with open(path, "rb") as stream:
+            result = threaded.hash_stream_multi(stream, ["BLAKE3", "SHA256"])
+        assert result["SHA256"] == service.hash_file(str(path), "SHA256")
+        assert result["BLAKE3"] == service.ALGORITHMS["BLAKE3"](data).hexdigest()
+
+    def test_invalid_threads(self):
+        """Test that a negative thread count is rejected."""
+        with pytest.raises(ValueError, match="Thread count"):
+            HashingService(threads=-1)
+
+    @pytest.mark.parametrize("processes", [False, True])
+    def test_hash_directory(self, service, temp_dir, processes):
+        """Test hashing a tree with filters, in sorted path order."""
+        (temp_dir / "sub").mkdir()
+        (temp_dir / "b.txt").write_bytes(b"b")
+        (temp_dir / "sub" / "a.txt").write_bytes(b"a")
+        (temp_dir / "skip.log").write_bytes(b"log")
+        (temp_dir / "SUMS").write_bytes(b"old manifest")
+        entries = service.hash_directory(
+            str(temp_dir),
+            ["SHA256"],
+            exclude=["*.log"],
+            jobs=2,
+            processes=processes,
+            skip=[str(temp_dir / "SUMS")],
+        )
+        root = temp_dir.as_posix()
+        assert entries == [
+            (f"{root}/b.txt", {"SHA256": service.hash_text("b", "SHA256")}, None),
+            (f"{root}/sub/a.txt", {"SHA256": service.hash_text("a", "SHA256")}, None),
+        ]
+
+    def test_hash_directory_unreadable_file(self, service, temp_dir):
+        """Test that a file that can not be read is reported, not fatal."""
+        (temp_dir / "ok.txt").write_bytes(b"ok")
+        (temp_dir / "dangling").symlink_to(temp_dir / "missing")
+        entries = service.hash_directory(str(temp_dir), ["MD5"])
+        root = temp_dir.as_posix()
+        assert entries[0][0] == f"{root}/dangling"
+        assert entries[0][1] is None and entries[0][2]
+        assert entries[1] == (
+            f"{root}/ok.txt",
+            {"MD5": service.hash_text("ok", "MD5")},
+            None,
+        )
+
+    @pytest.mark.parametrize("processes", [False, True])
+    def test_check_manifest(self, service, temp_dir, processes):
+        """Test verifying matching, changed, missing and unsupported entries."""
+        (temp_dir / "good.bin").write_bytes(os.urandom(2 * 1024 * 1024))
+        (temp_dir / "changed.txt").write_bytes(b"changed")
+        (temp_dir / "other.txt").write_bytes(b"other")
+        good = service.hash_file(str(temp_dir / "good.bin"), "SHA256")
+        entries = [
+            (str(temp_dir / "good.bin"), "SHA256", good.upper()),
+            (str(temp_dir / "changed.txt"), "MD5", service.hash_text("old", "MD5")),
+            (str(temp_dir / "missing.txt"), "SHA256", good),
+            (str(temp_dir / "other.txt"), "WHIRLPOOL", good),
+        ]
+        results = dict(service.check_manifest(entries, jobs=2, processes=processes))
+        assert results[str(temp_dir / "good.bin")] is None
+        assert results[str(temp_dir / "changed.txt")] == "Checksum does not match"
+        assert "not found" in results[str(temp_dir / "missing.txt")]
+        assert "Unsupported algorithm" in results[str(temp_dir / "other.txt")]
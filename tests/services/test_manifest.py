@@ -0,0 +1,79 @@
+"""Tests for checksum manifest formatting."""
+
+import pytest
+
+from encryptocli.services import manifest
+
+
+class TestManifest:
+    """Test GNU and BSD manifest lines."""
+
+    def test_format_line(self):
+        """Test the line layout of each format."""
+        assert manifest.format_line("gnu", "a/b.txt", "SHA256", "ab12") == (
+            "ab12  a/b.txt"
+        )
+        assert manifest.format_line("bsd", "a/b.txt", "SHA256", "ab12") == (
+            "SHA256 (a/b.txt) = ab12"
+        )
+        assert manifest.format_line("bsd", "b.txt", "SHA3_256", "ab12") == (
+            "SHA3-256 (b.txt) = ab12"
+        )
+        assert manifest.format_line("bsd", "b.txt", "BLAKE2B", "ab12") == (
+            "BLAKE2b (b.txt) = ab12"
+        )
+
+    def test_format_line_escapes_paths(self):
+        """Test the coreutils escaping of backslashes and newlines."""
+        assert manifest.format_line("gnu", "a\\b\nc", "MD5", "ff") == (
+            "\\ff  a\\\\b\\nc"
+        )
+        assert manifest.format_line("bsd", "a\\b", "MD5", "ff") == (
+            "\\MD5 (a\\\\b) = ff"
+        )
+
+    def test_check_format(self):
+        """Test that GNU manifests are limited to one algorithm."""
+        manifest.check_format("gnu", ["SHA256"])
+        manifest.check_format("bsd", ["SHA256", "BLAKE3"])
+        with pytest.raises(ValueError, match="single algorithm"):
+            manifest.check_format("gnu", ["SHA256", "BLAKE3"])
+        with pytest.raises(ValueError, match="Unknown manifest format"):
+            manifest.check_format("json", ["SHA256"])
+
+    @pytest.mark.parametrize("manifest_format", ["gnu", "bsd"])
+    def test_parse_line_roundtrip(self, manifest_format):
+        """Test that formatted lines parse back, escaped paths included."""
+        for path in ["a/b.txt", "we\\ird\nname", "x) = y"]:
+            line = manifest.format_line(manifest_format, path, "SHA3_256", "AB12")
+            expected_algorithm = "SHA3_256" if manifest_format == "bsd" else "MD5"
+            assert manifest.parse_line(line, "MD5") == (
+                path,
+                expected_algorithm,
+                "ab12",
+            )
+
+    def test_parse_line_variants(self):
+        """Test binary-mode GNU lines and lines that are not checksums."""
+        assert manifest.parse_line("ab *tool.exe", "SHA1") == (
+            "tool.exe",
+            "SHA1",
+            "ab",
+        )
+        assert manifest.parse_line("BLAKE2b (x) = ff", "SHA1") == (
+            "x",
+            "BLAKE2B",
+            "ff",
+        )
+        assert manifest.parse_line("not a checksum", "SHA1") is None
+        assert manifest.parse_line("\\ab  bad\\escape", "SHA1") is None
+
+    @pytest.mark.parametrize("newline", [b"\n", b"\r\n"])
+    def test_read_manifest(self, temp_dir, newline):
+        """Test that paths stay as written and junk is counted."""
+        sums = temp_dir / "SUMS"
+        lines = [b"ab  a.txt", b"", b"SHA512 (sub/b.txt) = cd", b"junk", b""]
+        sums.write_bytes(newline.join(lines))
+        entries, malformed = manifest.read_manifest(str(sums), "SHA256")
+        assert entries == [("a.txt", "SHA256", "ab"), ("sub/b.txt", "SHA512", "cd")]
+        assert malformed == 1
@@ -0,0 +1,58 @@
+"""Tests for batch record framing."""
+
+import json
+
+import pytest
+
+from encryptocli.services.records import transform_records
+from encryptocli.util.exceptions import FatalError
+
+
+def upper(values):
+    """Batch transform used by the tests."""
+    return (value.upper() for value in values)
+
+
+class TestTransformRecords:
+    """Test line and JSONL record transforms."""
+
+    def test_lines(self):
+        """Test that every line, including blank ones, maps to one output."""
+        lines = ["a\n", "\n", "b\r\n"]
+        assert list(transform_records(lines, upper)) == ["A", "", "B"]
+
+    def test_jsonl_strings_and_objects(self):
+        """Test that JSONL strings and object fields are transformed."""
+        lines = ['"a"\n', "\n", '{"id": 1, "value": "b"}\n']
+        output = list(transform_records(lines, upper, "jsonl"))
+        assert [json.loads(o) for o in output] == ["A", {"id": 1, "value": "B"}]
+
+    def test_jsonl_custom_field(self):
+        """Test transforming a named field."""
+        output = transform_records(['{"secret": "x"}'], upper, "jsonl", "secret")
+        assert json.loads(next(output)) == {"secret": "X"}
+
+    def test_jsonl_streams(self):
+        """Test that records are transformed without reading all input first."""
+        read = []
+
+        def lines():
+            for value in ("a", "b", "c"):
+                read.append(value)
+                yield json.dumps(value)
+
+        output = transform_records(lines(), upper, "jsonl")
+        assert next(output) == '"A"'
+        assert len(read) == 1
+
+    def test_jsonl_invalid(self):
+        """Test that malformed records are rejected with their line number."""
+        with pytest.raises(FatalError, match="line 2"):
+            list(transform_records(['"a"', "{"], upper, "jsonl"))
+        with pytest.raises(FatalError, match="string 'value'"):
+            list(transform_records(['{"value": 1}'], upper, "jsonl"))
+
+    def test_unknown_format(self):
+        """Test that an unknown format is rejected up front."""
+        with pytest.raises(ValueError, match="Unknown record format"):
+            transform_records([], upper, "csv")
@@ -1,49 +1,122 @@
 """Tests for file handling utilities."""
 
+import io
+import os
+import threading
+
 import pytest
 
-from encryptocli.util.file_handling import get_file
 from encryptocli.util.exceptions import FatalError
+from encryptocli.util.file_handling import (
+    MMAP_THRESHOLD,
+    InputFile,
+    iter_stream_views,
+    open_input,
+)
 
 
 class TestFileHandling:
-    """Test file handling utilities."""
-
-    def test_get_file_success(self, sample_file):
-        """Test successfully opening a file."""
-        file = get_file(str(sample_file))
-        assert file is not None
-        assert file.readable()
-        content = file.read()
-        assert b"Sample file content" in content
-        file.close()
-
-    def test_get_file_nonexistent(self):
+    """Test the input file layer."""
+
+    @pytest.fixture
+    def mapped_file(self, temp_dir):
+        """Create a file large enough to be memory-mapped."""
+        path = temp_dir / "large.bin"
+        path.write_bytes(os.urandom(MMAP_THRESHOLD + 4096))
+        return path
+
+    def test_open_input_success(self, sample_file):
+        """Test successfully opening and reading a small file."""
+        with open_input(str(sample_file)) as file:
+            assert file.readable()
+            assert not file.mapped
+            assert file.name == str(sample_file)
+            assert b"Sample file content" in file.read()
+        assert file._file.closed
+
+    def test_open_input_nonexistent(self):
         """Test opening non-existent file raises error."""
-        with pytest.raises((FatalError, FileNotFoundError)):
-            get_file("/nonexistent/file.txt")
-
-    def test_get_file_too_large(self, temp_dir):
-        """Test that files larger than 1GB raise FatalError."""
-        # Create a file slightly over 1GB
-        large_file = temp_dir / "large.bin"
-        size_1gb = 1073741824
-        size_over = size_1gb + 1024  # 1GB + 1KB
-
-        with open(large_file, "wb") as f:
-            # Write in chunks to avoid memory issues
-            chunk_size = 1024 * 1024  # 1MB
-            written = 0
-            while written < size_over:
-                to_write = min(chunk_size, size_over - written)
-                f.write(b"x" * to_write)
-                written += to_write
+        with pytest.raises(FileNotFoundError):
+            open_input("/nonexistent/file.txt")
 
+    def test_open_input_size_limit(self, sample_file):
+        """Test that an explicit size limit is enforced; none applies by default."""
         with pytest.raises(FatalError, match="File too large"):
-            get_file(str(large_file))
+            open_input(str(sample_file), size_limit=4)
+        with open_input(str(sample_file)) as file:
+            assert file.size == sample_file.stat().st_size
+
+    def test_mapped_file_behaves_like_a_file(self, mapped_file):
+        """Test read, seek and tell on a memory-mapped file."""
+        data = mapped_file.read_bytes()
+        with open_input(str(mapped_file)) as file:
+            assert file.mapped
+            assert file.read(10) == data[:10]
+            assert file.tell() == 10
+            assert file.seek(-5, os.SEEK_END) == len(data) - 5
+            assert file.read() == data[-5:]
+            assert file.read(10) == b""
+            file.seek(0)
+            buffer = bytearray(100)
+            assert file.readinto(buffer) == 100
+            assert bytes(buffer) == data[:100]
+            assert file.read() == data[100:]
+
+    def test_mapped_views_do_not_copy(self, mapped_file):
+        """Test that views of a mapped file are slices of the mapping."""
+        data = mapped_file.read_bytes()
+        with open_input(str(mapped_file)) as file:
+            views = list(file.iter_views(1024 * 1024))
+            assert all(view.obj is file._map for view in views)
+            assert b"".join(views) == data
+        # Views outliving the input do not stop it from closing
+        assert file._file.closed
+
+    def test_buffered_views_reuse_one_buffer(self, temp_dir):
+        """Test that unmapped files are read into a single reused buffer."""
+        data = os.urandom(10_000)
+        path = temp_dir / "small.bin"
+        path.write_bytes(data)
+        chunks, buffers = [], set()
+        with InputFile(str(path)) as file:
+            for view in file.iter_views(4096):
+                buffers.add(id(view.obj))
+                chunks.append(bytes(view))
+        assert b"".join(chunks) == data
+        assert [len(chunk) for chunk in chunks] == [4096, 4096, 1808]
+        assert len(buffers) == 1
+
+    def test_pipe_input(self, temp_dir):
+        """Test reading a named pipe, which can be neither sized nor mapped."""
+        path = str(temp_dir / "pipe")
+        os.mkfifo(path)
+        data = os.urandom(300_000)
+
+        def feed():
+            with open(path, "wb") as pipe:
+                pipe.write(data)
+
+        writer = threading.Thread(target=feed)
+        writer.start()
+        with open_input(path, size_limit=10) as file:
+            assert file.size is None
+            assert not file.mapped
+            received = b"".join(bytes(view) for view in file.iter_views(65536))
+        writer.join()
+        assert received == data
+
+    def test_iter_stream_views(self):
+        """Test chunked stream reads through one buffer, with or without readinto."""
+        data = os.urandom(10_000)
+        views = list(iter_stream_views(io.BufferedReader(io.BytesIO(data)), 4096))
+        assert len({id(view.obj) for view in views}) == 1
+
+        class ReadOnly:
+            def __init__(self):
+                self._stream = io.BytesIO(data)
+
+            def read(self, size):
+                return self._stream.read(size)
 
-    def test_get_file_binary_mode(self, sample_file):
-        """Test that file is opened in binary mode."""
-        file = get_file(str(sample_file))
-        assert "b" in file.mode
-        file.close()
+        chunks = [bytes(view) for view in iter_stream_views(ReadOnly(), 4096)]
+        assert b"".join(chunks) == data
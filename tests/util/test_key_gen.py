@@ -3,7 +3,18 @@
 import pytest
 from hypothesis import given, strategies as st
 
-from encryptocli.util.key_gen import key_gen
+from encryptocli.util.exceptions import FatalError
+from encryptocli.util.key_gen import (
+    KDF_PROFILES,
+    KEYFILE_KDF,
+    KeyCache,
+    derive_key,
+    derive_keyfile_key,
+    key_gen,
+    new_kdf_params,
+    new_keyfile_params,
+    read_keyfile,
+)
 
 
 class TestKeyGeneration:
@@ -50,3 +61,183 @@ class TestKeyGeneration:
             key.decode("ascii")
         except UnicodeDecodeError:
             pytest.fail("Key is not valid ASCII/base64")
+
+
+class TestKDFParams:
+    """Test stored KDF parameters and cost profiles."""
+
+    @pytest.mark.parametrize("profile", sorted(KDF_PROFILES))
+    def test_new_kdf_params_profiles(self, profile):
+        """Test that each profile records its scrypt cost."""
+        kdf = new_kdf_params(profile)
+        assert kdf["algorithm"] == "scrypt"
+        assert kdf["n"] == KDF_PROFILES[profile]["n"]
+
+    def test_new_kdf_params_random_salt(self):
+        """Test that every call gets a fresh salt."""
+        assert new_kdf_params()["salt"] != new_kdf_params()["salt"]
+
+    def test_new_kdf_params_unknown_profile(self):
+        """Test that an unknown profile raises ValueError."""
+        with pytest.raises(ValueError, match="Unknown KDF profile"):
+            new_kdf_params("glacial")
+
+    def test_derive_key_depends_on_salt(self, sample_password):
+        """Test that the same password with different salts gives different keys."""
+        kdf = new_kdf_params("fast")
+        assert derive_key(sample_password, kdf) == derive_key(sample_password, kdf)
+        assert derive_key(sample_password, kdf) != derive_key(
+            sample_password, new_kdf_params("fast")
+        )
+
+    @pytest.mark.parametrize(
+        "override",
+        [
+            {"algorithm": "argon2id"},
+            {"n": 2**30},
+            {"n": 1000},
+            {"r": 64},
+            {"salt": None},
+        ],
+    )
+    def test_derive_key_rejects_bad_params(self, sample_password, override):
+        """Test that untrusted parameters are bounded before deriving."""
+        kdf = {**new_kdf_params("fast"), **override}
+        with pytest.raises(FatalError):
+            derive_key(sample_password, kdf)
+
+
+class TestKeyfile:
+    """Test keys derived from keyfiles."""
+
+    def test_read_keyfile(self, sample_keyfile):
+        """Test that the key material is read back."""
+        assert read_keyfile(str(sample_keyfile)) == sample_keyfile.read_bytes()
+
+    def test_read_keyfile_too_short(self, temp_dir):
+        """Test that a keyfile without enough key material is rejected."""
+        short = temp_dir / "short.key"
+        short.write_bytes(b"x" * 31)
+        with pytest.raises(FatalError, match="at least 32 bytes"):
+            read_keyfile(str(short))
+        with pytest.raises(FatalError, match="reading keyfile"):
+            read_keyfile(str(temp_dir / "missing.key"))
+
+    def test_derive_keyfile_key_depends_on_salt(self):
+        """Test that HKDF keys are deterministic per salt."""
+        kdf = new_keyfile_params()
+        assert kdf["algorithm"] == KEYFILE_KDF
+        material = b"k" * 32
+        key = derive_keyfile_key(material, kdf)
+        assert derive_keyfile_key(material, kdf) == key
+        assert derive_keyfile_key(material, new_keyfile_params()) != key
+        assert derive_keyfile_key(b"j" * 32, kdf) != key
+
+    def test_derive_keyfile_key_rejects_bad_params(self):
+        """Test that malformed keyfile parameters are rejected."""
+        with pytest.raises(FatalError):
+            derive_keyfile_key(b"k" * 32, {"algorithm": KEYFILE_KDF})
+        with pytest.raises(FatalError, match="Unsupported KDF"):
+            derive_keyfile_key(b"k" * 32, {**new_keyfile_params(), "algorithm": "x"})
+
+
+class TestKeyCache:
+    """Test the opt-in derived-key cache."""
+
+    def test_cache_hit_returns_same_key(self, sample_password):
+        """Test that a repeated derivation is served from the cache."""
+        cache = KeyCache()
+        key1 = key_gen(sample_password, cache)
+        key2 = key_gen(sample_password, cache)
+        assert key1 == key2 == key_gen(sample_password)
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_cache_keys_on_password(self):
+        """Test that different passwords get separate entries."""
+        cache = KeyCache()
+        assert key_gen("password1", cache) != key_gen("password2", cache)
+        assert cache.misses == 2
+        assert len(cache) == 2
+
+    def test_cache_lru_bound(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = KeyCache(max_entries=2)
+        cache.get_or_derive("a", (), lambda: b"key-a")
+        cache.get_or_derive("b", (), lambda: b"key-b")
+        cache.get_or_derive("a", (), lambda: b"unused")
+        cache.get_or_derive("c", (), lambda: b"key-c")
+        assert len(cache) == 2
+        assert cache.get_or_derive("a", (), lambda: b"new-a") == b"key-a"
+        assert cache.get_or_derive("b", (), lambda: b"new-b") == b"new-b"
+
+    def test_cache_ttl_expiry(self):
+        """Test that entries expire after the TTL."""
+        now = [0.0]
+        cache = KeyCache(ttl=10.0, clock=lambda: now[0])
+        cache.get_or_derive("a", (), lambda: b"old")
+        now[0] = 5.0
+        assert cache.get_or_derive("a", (), lambda: b"new") == b"old"
+        now[0] = 11.0
+        assert cache.get_or_derive("a", (), lambda: b"new") == b"new"
+        assert (cache.hits, cache.misses) == (1, 2)
+
+    def test_cache_failed_derivation(self):
+        """Test that a failed derivation is not cached and is retried."""
+        cache = KeyCache()
+
+        def fail():
+            raise MemoryError("scrypt")
+
+        with pytest.raises(MemoryError):
+            cache.get_or_derive("a", (), fail)
+        assert cache._pending == {}
+        assert len(cache) == 0
+        assert cache.get_or_derive("a", (), lambda: b"key") == b"key"
+        assert cache._pending == {}
+        assert cache.misses == 2
+
+    def test_cache_wipe(self):
+        """Test that wiping empties the cache."""
+        cache = KeyCache()
+        cache.get_or_derive("a", (), lambda: b"key")
+        cache.wipe()
+        assert len(cache) == 0
+        assert cache.get_or_derive("a", (), lambda: b"fresh") == b"fresh"
+
+    def test_cache_reuses_params_per_password(self):
+        """Test that encryption parameters are shared within a cache."""
+        cache = KeyCache()
+        kdf = cache.get_or_create_params("a", "fast", lambda: new_kdf_params("fast"))
+        again = cache.get_or_create_params("a", "fast", lambda: {})
+        other = cache.get_or_create_params("b", "fast", lambda: {})
+        assert again is kdf
+        assert other == {}
+
+    def test_cache_rejects_empty_bound(self):
+        """Test that a cache must hold at least one entry."""
+        with pytest.raises(ValueError):
+            KeyCache(max_entries=0)
+
+    def test_cache_concurrent_misses_derive_once(self):
+        """Test that threads missing on one entry share a single derivation."""
+        from concurrent.futures import ThreadPoolExecutor
+        import threading
+        import time
+
+        cache = KeyCache()
+        calls = []
+        lock = threading.Lock()
+
+        def derive():
+            with lock:
+                calls.append(1)
+            time.sleep(0.05)
+            return b"key"
+
+        with ThreadPoolExecutor(8) as pool:
+            keys = list(
+                pool.map(lambda _: cache.get_or_derive("a", (), derive), range(8))
+            )
+        assert keys == [b"key"] * 8
+        assert len(calls) == cache.misses == 1
+        assert cache.hits == 7
@@ -0,0 +1,84 @@
+"""Tests for the atomic output writer."""
+
+import os
+
+import pytest
+
+from encryptocli.util import output
+from encryptocli.util.exceptions import FatalError
+from encryptocli.util.output import AtomicWriter, parse_fsync_policy
+
+
+class TestAtomicWriter:
+    """Test temp-file-and-rename output and fsync policies."""
+
+    @pytest.fixture
+    def fsyncs(self, monkeypatch):
+        """Count calls to os.fsync."""
+        calls = []
+        fsync = os.fsync
+        monkeypatch.setattr(
+            output.os, "fsync", lambda fd: calls.append(fd) or fsync(fd)
+        )
+        return calls
+
+    def test_commit_replaces_file(self, temp_dir):
+        """Test that output appears at its path only once committed."""
+        path = temp_dir / "out.bin"
+        path.write_bytes(b"old")
+        with AtomicWriter(str(path)) as writer:
+            writer.write(b"new ")
+            writer.write(b"data")
+            assert writer.tell() == 8
+            assert path.read_bytes() == b"old"
+        assert path.read_bytes() == b"new data"
+        assert os.listdir(temp_dir) == ["out.bin"]
+
+    def test_failure_keeps_existing_file(self, temp_dir):
+        """Test that an exception discards the output and its temp file."""
+        path = temp_dir / "out.bin"
+        path.write_bytes(b"old")
+        with pytest.raises(RuntimeError):
+            with AtomicWriter(str(path)) as writer:
+                writer.write(b"partial")
+                raise RuntimeError("interrupted")
+        assert path.read_bytes() == b"old"
+        assert os.listdir(temp_dir) == ["out.bin"]
+
+    def test_concurrent_writers_do_not_interleave(self, temp_dir):
+        """Test that writers of one path use separate temp files."""
+        path = str(temp_dir / "encrypto.png")
+        first, second = AtomicWriter(path), AtomicWriter(path)
+        assert first.temp_path != second.temp_path
+        first.write(b"first")
+        second.write(b"second")
+        second.commit()
+        first.commit()
+        assert (temp_dir / "encrypto.png").read_bytes() == b"first"
+
+    @pytest.mark.parametrize(
+        "policy, expected",
+        [("none", 0), ("end", 2), ("1MB", 5)],
+    )
+    def test_fsync_policy(self, temp_dir, fsyncs, policy, expected):
+        """Test how often each policy syncs a 3 MiB output."""
+        with AtomicWriter(str(temp_dir / "out.bin"), policy) as writer:
+            for _ in range(3):
+                writer.write(b"x" * 1024 * 1024)
+        # Per-interval syncs, the final file sync and the directory sync
+        assert len(fsyncs) == expected
+
+    def test_parse_fsync_policy(self):
+        """Test the accepted policy spellings."""
+        assert parse_fsync_policy("none") is None
+        assert parse_fsync_policy("END") == 0
+        assert parse_fsync_policy("64MB") == 64 * 1024 * 1024
+        assert parse_fsync_policy("8") == 8 * 1024 * 1024
+        for policy in ["always", "0MB", "-1", "1GB"]:
+            with pytest.raises(ValueError, match="Unknown fsync policy"):
+                parse_fsync_policy(policy)
+
+    def test_missing_directory(self, temp_dir):
+        """Test that an unwritable destination is reported."""
+        with pytest.raises(FatalError, match="creating"):
+            AtomicWriter(str(temp_dir / "missing" / "out.bin"))